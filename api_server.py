@@ -0,0 +1,446 @@
+"""
+Local HTTP/JSON API over the expense tracker database.
+
+An asyncio server (standard library only) accepts connections and parses
+requests; every database call runs on a bounded pool of worker threads,
+each borrowing a connection from a pool.ConnectionPool of the same size,
+so the event loop never blocks on SQLite and at most `workers` queries
+run at once. List endpoints use keyset pagination on the primary key.
+
+Endpoints:
+    GET  /health
+    GET  /expenses?after_id=0&limit=100        POST /expenses  {"category", "item_name", "amount", "date"}
+    GET  /income?after_id=0&limit=100          POST /income    {"item_name", "amount", "category", "date"}
+    GET  /expenses/by-category?from=&to=       GET  /income/by-category?from=&to=
+    GET  /budgets?category=&on=                POST /budgets   {"category", "amount", "period"}
+    GET  /goals                                POST /goals     {"goal_name", "target_amount", "current_amount"}
+    GET  /goals/progress                       POST /goals/contribute  {"goal_id", "amount"}
+
+Usage:
+    python api_server.py [--host 127.0.0.1] [--port 8080] [--workers 4]
+"""
+
+# Importing necessary modules
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import parse_qsl, urlsplit
+
+import goal_analytics
+import migrations
+import periods
+import pool
+import query_cache
+import totals
+from money import Money
+from repository import BudgetRepository, ExpenseRepository, GoalRepository, IncomeRepository
+
+
+DEFAULT_WORKERS = 4
+MAX_PAGE_SIZE = 1000
+MAX_BODY_SIZE = 1024 * 1024
+
+REPOSITORIES = {"expenses": ExpenseRepository, "income": IncomeRepository}
+
+# JSON types accepted for request body fields, and how errors describe them.
+# Amounts may be strings so clients can send exact decimals.
+TEXT = ((str,), "a string")
+AMOUNT = ((int, float, str), "a number")
+ID = ((int,), "an integer")
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+
+class HTTPError(Exception):
+    """
+    An error that is sent to the client with a status code.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+
+def to_json(value):
+    """
+    Convert query results for json.dumps: named tuples become objects, Money a
+    decimal number and dates "YYYY-MM-DD" strings.
+    """
+    if isinstance(value, Money):
+        return float(value.to_decimal())
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, "_asdict"):
+        return dict((key, to_json(item)) for key, item in value._asdict().items())
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, dict):
+        return dict((key, to_json(item)) for key, item in value.items())
+    return value
+
+
+
+def query_int(query, name, default, minimum=0, maximum=None):
+    """
+    Read an integer query parameter.
+
+    Raises:
+    - HTTPError: 400 if the value is not an integer in range.
+    """
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise HTTPError(400, "{} must be an integer".format(name))
+    if value < minimum or (maximum is not None and value > maximum):
+        raise HTTPError(400, "{} must be between {} and {}".format(name, minimum, maximum))
+    return value
+
+
+
+def checked(name, value, kind):
+    """
+    Check the JSON type of a request body field.
+
+    Raises:
+    - HTTPError: 400 if the value is not of the kind (TEXT, AMOUNT or ID).
+    """
+    types, description = kind
+    # JSON true and false arrive as bool, which is a kind of int
+    if not isinstance(value, types) or isinstance(value, bool):
+        raise HTTPError(400, "field {!r} must be {}".format(name, description))
+    return value
+
+
+
+def required(body, name, kind):
+    """
+    Read a required field of a JSON request body.
+
+    Raises:
+    - HTTPError: 400 if the field is missing or of the wrong type.
+    """
+    if name not in body:
+        raise HTTPError(400, "missing field {!r}".format(name))
+    return checked(name, body[name], kind)
+
+
+
+def optional(body, name, kind, default):
+    """
+    Read an optional field of a JSON request body; null is the same as leaving it out.
+
+    Raises:
+    - HTTPError: 400 if the field is of the wrong type.
+    """
+    value = body.get(name)
+    return default if value is None else checked(name, value, kind)
+
+
+
+class BudgetAPI:
+    """
+    Route requests to repository calls run on a bounded thread pool.
+    """
+
+    def __init__(self, database_name, workers=DEFAULT_WORKERS):
+        """
+        Parameters:
+        - database_name (str): The name of the SQLite database.
+        - workers (int): Number of worker threads, and so of pooled connections.
+        """
+        self.database_name = database_name
+        self.pool = pool.ConnectionPool(database_name, max_size=workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/expenses"): lambda connection, query, body: self.list_transactions(connection, "expenses", query),
+            ("POST", "/expenses"): lambda connection, query, body: self.add_transaction(connection, "expenses", body),
+            ("GET", "/income"): lambda connection, query, body: self.list_transactions(connection, "income", query),
+            ("POST", "/income"): lambda connection, query, body: self.add_transaction(connection, "income", body),
+            ("GET", "/expenses/by-category"): lambda connection, query, body: self.by_category(connection, "expenses", query),
+            ("GET", "/income/by-category"): lambda connection, query, body: self.by_category(connection, "income", query),
+            ("GET", "/budgets"): self.budget_report,
+            ("POST", "/budgets"): self.set_budget,
+            ("GET", "/goals"): self.list_goals,
+            ("POST", "/goals"): self.add_goal,
+            ("GET", "/goals/progress"): self.goal_progress,
+            ("POST", "/goals/contribute"): self.contribute,
+        }
+
+    def call(self, handler, query, body):
+        """
+        Worker thread: run a handler with a pooled connection.
+        """
+        with self.pool.connection() as connection:
+            return handler(connection, query, body)
+
+    async def dispatch(self, method, path, query, body):
+        """
+        Run the handler for a request on the thread pool.
+
+        Returns:
+        - response (tuple): (status, payload).
+
+        Raises:
+        - HTTPError: For unknown routes and bad requests, and with status 500 for any other error.
+        """
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _method, route_path in self.routes):
+                raise HTTPError(405, "method {} not allowed on {}".format(method, path))
+            raise HTTPError(404, "no such endpoint: {}".format(path))
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, self.call, handler, query, body)
+        except HTTPError:
+            raise
+        except ValueError as e:
+            # Values from the client that do not parse, such as dates and amounts; missing
+            # and mistyped fields are HTTPErrors already (see required and optional)
+            raise HTTPError(400, str(e))
+        except sqlite3.Error as e:
+            raise HTTPError(500, "database error: {}".format(e))
+        except Exception as e:
+            # A bug in a handler still gets an answer, and its traceback goes to the server's log
+            print("Error handling {} {}:".format(method, path), file=sys.stderr)
+            traceback.print_exception(e)
+            raise HTTPError(500, "internal error: {}".format(type(e).__name__))
+        return (201 if method == "POST" else 200), result
+
+    def close(self):
+        """
+        Stop the worker threads and close the pooled connections.
+        """
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+    # Handlers run in a worker thread and return the JSON payload
+
+    def health(self, connection, query, body):
+        """
+        Check that the database answers.
+        """
+        connection.execute("SELECT 1").fetchone()
+        return {"status": "ok", "schema_version": migrations.get_schema_version(connection), "pool": self.pool.stats(),
+                "cache": query_cache.stats(connection)}
+
+    def list_transactions(self, connection, table, query):
+        """
+        One keyset page of expenses or income.
+        """
+        after_id = query_int(query, "after_id", 0)
+        limit = query_int(query, "limit", 100, 1, MAX_PAGE_SIZE)
+        items = REPOSITORIES[table](connection).page(after_id=after_id, limit=limit)
+        return {"items": items, "next_after_id": items[-1].id if len(items) == limit else None}
+
+    def add_transaction(self, connection, table, body):
+        """
+        Add an expense or income entry.
+        """
+        category = optional(body, "category", TEXT, "") if table == "income" else required(body, "category", TEXT)
+        occurred_at = periods.parse_day(optional(body, "date", TEXT, ""))
+        row_id = REPOSITORIES[table](connection).add(category, required(body, "item_name", TEXT),
+                                                     required(body, "amount", AMOUNT), occurred_at)
+        return {"id": row_id}
+
+    def by_category(self, connection, table, query):
+        """
+        Totals per category, all time or for a date range (to is included).
+        """
+        if "from" in query or "to" in query:
+            start = periods.to_date(query["from"]).isoformat() if "from" in query else ""
+            end = (periods.to_date(query["to"]) + timedelta(days=1)).isoformat() if "to" in query else "9999-12-31"
+            rows = REPOSITORIES[table](connection).period_totals(start, end)
+        else:
+            rows = totals.category_totals(connection, table)
+        return [{"category": category, "total": total, "entries": entries} for category, total, entries in rows]
+
+    def budget_report(self, connection, query, body):
+        """
+        Budget against this period's expenses (see reports.budget_report).
+        """
+        return BudgetRepository(connection).report(query.get("category"), query.get("on"))
+
+    def set_budget(self, connection, query, body):
+        """
+        Set the budget of a category and return its report line.
+        """
+        budgets = BudgetRepository(connection)
+        category = required(body, "category", TEXT)
+        budgets.set(category, required(body, "amount", AMOUNT), optional(body, "period", TEXT, periods.DEFAULT_PERIOD))
+        return budgets.report(category)
+
+    def list_goals(self, connection, query, body):
+        """
+        Every financial goal.
+        """
+        return GoalRepository(connection).all()
+
+    def add_goal(self, connection, query, body):
+        """
+        Add a financial goal.
+        """
+        goal_id = GoalRepository(connection).add(required(body, "goal_name", TEXT), required(body, "target_amount", AMOUNT),
+                                                 optional(body, "current_amount", AMOUNT, 0))
+        return {"id": goal_id}
+
+    def goal_progress(self, connection, query, body):
+        """
+        Progress towards all financial goals together and per goal (see goal_analytics).
+        """
+        goals = GoalRepository(connection).progress(query.get("on"))
+        current, target, progress = goal_analytics.overall_progress(goals)
+        return {"current_amount": current, "target_amount": target, "progress_percent": progress, "goals": goals}
+
+    def contribute(self, connection, query, body):
+        """
+        Add an amount saved to a financial goal.
+        """
+        goal_id = required(body, "goal_id", ID)
+        if not GoalRepository(connection).contribute(goal_id, required(body, "amount", AMOUNT)):
+            raise HTTPError(404, "no goal with id {}".format(goal_id))
+        return {"id": goal_id}
+
+
+
+async def read_request(reader):
+    """
+    Read one HTTP/1.1 request.
+
+    Returns:
+    - request (tuple): (method, target, version, headers, body), or None at end of stream.
+
+    Raises:
+    - HTTPError: If the request is malformed or the body is too large.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(400, "malformed Content-Length")
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version, headers, body
+
+
+
+def write_response(writer, status, payload, keep_alive):
+    """
+    Queue a JSON response on the stream.
+    """
+    data = json.dumps(to_json(payload)).encode("utf-8")
+    head = ("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n".format(
+        status, STATUS_TEXT.get(status, ""), len(data), "keep-alive" if keep_alive else "close"))
+    writer.write(head.encode("latin-1") + data)
+
+
+
+async def handle_connection(api, reader, writer):
+    """
+    Serve requests on one client connection until it is closed.
+    """
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except HTTPError as e:
+                write_response(writer, e.status, {"error": str(e)}, False)
+                break
+            if request is None:
+                break
+            method, target, version, headers, raw_body = request
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            url = urlsplit(target)
+            try:
+                body = json.loads(raw_body) if raw_body else {}
+                if not isinstance(body, dict):
+                    raise HTTPError(400, "request body must be a JSON object")
+                status, payload = await api.dispatch(method, url.path.rstrip("/") or "/", dict(parse_qsl(url.query)), body)
+            except json.JSONDecodeError as e:
+                status, payload = 400, {"error": "invalid JSON: {}".format(e)}
+            except HTTPError as e:
+                status, payload = e.status, {"error": str(e)}
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+
+async def serve(database_name, host, port, workers=DEFAULT_WORKERS, ready=None):
+    """
+    Run the API server until it is cancelled.
+
+    Parameters:
+    - database_name (str): The name of the SQLite database.
+    - host (str): Address to listen on.
+    - port (int): Port to listen on.
+    - workers (int): Size of the database thread pool.
+    - ready (callable, optional): Called with the listening port once the server is up.
+    """
+    api = BudgetAPI(database_name, workers)
+    try:
+        with api.pool.connection() as connection:
+            migrations.migrate(connection)
+        server = await asyncio.start_server(lambda reader, writer: handle_connection(api, reader, writer), host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.close()
+
+
+
+def main(argv=None):
+    """
+    Start the API server from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Serve the expense tracker database over HTTP/JSON.")
+    parser.add_argument("--database", default="expense_tracker.db", help="SQLite database file")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Database worker threads")
+    args = parser.parse_args(argv)
+
+    def ready(port):
+        print("Serving {} on http://{}:{}/".format(args.database, args.host, port), flush=True)
+
+    try:
+        asyncio.run(serve(args.database, args.host, args.port, args.workers, ready))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print("Error starting server:", e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,504 @@
+"""
+Archiving closed years of transactions into one file per year.
+
+The expenses and income of a year that is over can be moved out of the
+main database into a file of their own next to it, e.g.
+expense_tracker_2023.db for expense_tracker.db. The main database then
+only holds recent rows, so scans and range queries over it stay fast. What
+the archived rows added up to is kept in the archived_summaries table (see
+migrations.add_archives): category totals, monthly trends and their rebuilds
+still include archived years. Afterwards the main database is vacuumed, so
+the file actually shrinks, and analyzed.
+
+Archived rows can still be read on demand: transactions_between attaches
+the archive files a date range needs (ATTACH DATABASE) and reads the live
+and archived rows in one query, and attached() makes all_expenses and
+all_income views over every file for other queries. Search only covers
+the live rows.
+
+SQLite does not make a transaction over two files atomic in WAL mode, so
+each transaction of archive_year writes to one file only. The rows are
+first copied to the archive file under a new run number and committed;
+only then are they deleted from the main database and summarized, in a
+second transaction that also records the run as done (archives.last_run).
+A crash in between leaves the rows in both files, never in neither. The
+copies of a run that did not finish are dropped and made again the next
+time the year is archived, so nothing is duplicated.
+
+Usage:
+    python archive.py [--before 2025] [--no-compact] [--database expense_tracker.db]
+    python archive.py --list
+"""
+
+# Importing necessary modules
+import argparse
+import os
+import sqlite3
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date
+
+import database
+import migrations
+import periods
+import query_cache
+from reports import check_transaction_table
+
+
+# One archived year: its file name (next to the main database) and how many rows it holds
+Archive = namedtuple("Archive", ["year", "file_name", "expenses", "income", "archived_at"])
+
+TRANSACTION_TABLES = ("expenses", "income")
+
+# Triggers that must not fire while rows move to an archive: the rows still
+# count in category_totals and monthly_rollups through their summaries
+ARCHIVE_SUSPENDED_TRIGGERS = ("{}_totals_delete", "{}_rollups_delete")
+
+# Archive files hold category names rather than ids, so each file can be read on its own.
+# Rows get ids of their own: the main database reuses the ids of deleted rows,
+# so source_id, the id a row had there, can repeat within a file. run is the
+# archive_year call that copied the row (0 for files written before runs).
+ARCHIVE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS {schema}.{table} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        source_id INTEGER NOT NULL,
+                        category TEXT,
+                        item_name TEXT,
+                        amount INTEGER,
+                        occurred_at TEXT,
+                        run INTEGER NOT NULL DEFAULT 0)'''
+
+# The rows of the main database copied by a run and unchanged since. Only
+# these are summarized and deleted; a row added or edited in the meantime
+# stays in the main database until the year is archived again.
+ARCHIVED_ROWS_FILTER = '''occurred_at >= ? AND occurred_at < ? AND EXISTS (
+    SELECT 1 FROM {schema}.{table} AS a
+    WHERE a.run = ? AND a.source_id = main.{table}.id AND a.amount IS main.{table}.amount
+      AND a.item_name IS main.{table}.item_name AND a.occurred_at IS main.{table}.occurred_at
+      AND a.category = (SELECT name FROM main.categories WHERE id = main.{table}.category_id))'''
+
+# Adds a year's rows to the summaries; a month already summarized (rows added
+# to an archived year later) is merged with what it had
+ARCHIVE_SUMMARY_SQL = '''
+    INSERT INTO archived_summaries (kind, period, category_id, total, entries, min_amount, max_amount)
+    SELECT '{table}', substr(occurred_at, 1, 7), category_id,
+           COALESCE(SUM(amount), 0), COUNT(*), MIN(amount), MAX(amount)
+    FROM main.{table}
+    WHERE {filter}
+    GROUP BY substr(occurred_at, 1, 7), category_id
+    ON CONFLICT (kind, period, category_id) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries,
+        min_amount = MIN(COALESCE(min_amount, excluded.min_amount), COALESCE(excluded.min_amount, min_amount)),
+        max_amount = MAX(COALESCE(max_amount, excluded.max_amount), COALESCE(excluded.max_amount, max_amount))'''
+
+ARCHIVE_INDEX_SQL = ("CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_occurred_at "
+                     "ON {table} (occurred_at, category, amount)")
+ARCHIVE_RUN_INDEX_SQL = "CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_run ON {table} (run, source_id)"
+
+ARCHIVE_COPY_SQL = '''
+    INSERT INTO {schema}.{table} (source_id, category, item_name, amount, occurred_at, run)
+    SELECT t.id, c.name, t.item_name, t.amount, t.occurred_at, ? FROM main.{table} AS t
+    JOIN main.categories AS c ON c.id = t.category_id
+    WHERE t.occurred_at >= ? AND t.occurred_at < ?'''
+
+
+
+def database_file(connection):
+    """
+    The file of the main database of a connection.
+
+    Raises:
+    - ValueError: If the database is in memory or temporary.
+    """
+    for _seq, name, path in connection.execute("PRAGMA database_list"):
+        if name == "main":
+            if not path:
+                raise ValueError("An in-memory database cannot be archived")
+            return path
+    raise ValueError("The connection has no main database")
+
+
+
+def archive_file_name(connection, year):
+    """
+    The file name of a year's archive, e.g. expense_tracker_2023.db.
+    """
+    stem, extension = os.path.splitext(os.path.basename(database_file(connection)))
+    return "{}_{}{}".format(stem, year, extension or ".db")
+
+
+
+def archive_path(connection, file_name):
+    """
+    The path of an archive file, which lives next to the main database.
+    """
+    return os.path.join(os.path.dirname(database_file(connection)), file_name)
+
+
+
+def schema_name(year):
+    return "archive_{:d}".format(year)
+
+
+
+def year_range(year):
+    """
+    The first day of a year and of the next one, as "YYYY-MM-DD".
+    """
+    return "{:04d}-01-01".format(year), "{:04d}-01-01".format(year + 1)
+
+
+
+def list_archives(connection):
+    """
+    List the archived years.
+
+    Returns:
+    - archives (list): Archive tuples, oldest year first.
+
+    Raises:
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    cursor = connection.execute("SELECT year, file_name, expenses, income, archived_at FROM archives ORDER BY year")
+    return [Archive(*row) for row in cursor]
+
+
+
+def closed_years(connection, before=None):
+    """
+    Find the years that have transactions and ended before a year.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - before (int, optional): Only years before this one. Defaults to the current year,
+      and cannot be later than it.
+
+    Returns:
+    - years (list): The years, oldest first.
+
+    Raises:
+    - ValueError: If before is later than the current year.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    current_year = date.today().year
+    before = current_year if before is None else before
+    if before > current_year:
+        raise ValueError("Only years that are over can be archived; {} is not over yet".format(before - 1))
+    years = set()
+    for table in TRANSACTION_TABLES:
+        # Each step is one seek on the occurred_at index
+        query = "SELECT MIN(occurred_at) FROM {} WHERE occurred_at >= ? AND occurred_at < ?".format(table)
+        start = "0000-01-01"
+        while True:
+            first = connection.execute(query, (start, year_range(before)[0])).fetchone()[0]
+            if first is None:
+                break
+            year = int(first[:4])
+            years.add(year)
+            start = year_range(year)[1]
+    return sorted(years)
+
+
+
+def archive_columns(connection, schema, table):
+    """
+    The columns of a table in an attached archive file.
+    """
+    return [row[1] for row in connection.execute("PRAGMA {}.table_info({})".format(schema, table))]
+
+
+
+def create_archive_table(cursor, schema, table):
+    """
+    Create a table of an archive file, or bring one written by an older version up to date.
+
+    Files archived before rows had ids of their own used the row's id in
+    the main database as the key; it is kept as their source_id, and their
+    rows belong to run 0.
+
+    Parameters:
+    - cursor (sqlite3.Cursor): Cursor inside the archiving transaction.
+    - schema (str): Name the archive file is attached as.
+    - table (str): "expenses" or "income".
+
+    Returns:
+    - None
+    """
+    cursor.execute(ARCHIVE_TABLE_SQL.format(schema=schema, table=table))
+    columns = archive_columns(cursor.connection, schema, table)
+    if "run" not in columns:
+        cursor.execute(ARCHIVE_TABLE_SQL.format(schema=schema, table=table + "_new"))
+        cursor.execute("INSERT INTO {0}.{1}_new (id, source_id, category, item_name, amount, occurred_at) "
+                       "SELECT id, {2}, category, item_name, amount, occurred_at FROM {0}.{1}"
+                       .format(schema, table, "source_id" if "source_id" in columns else "id"))
+        cursor.execute("DROP TABLE {}.{}".format(schema, table))
+        cursor.execute("ALTER TABLE {0}.{1}_new RENAME TO {1}".format(schema, table))
+    cursor.execute(ARCHIVE_INDEX_SQL.format(schema=schema, table=table))
+    cursor.execute(ARCHIVE_RUN_INDEX_SQL.format(schema=schema, table=table))
+
+
+
+def archive_year(connection, year):
+    """
+    Move a year's expenses and income into its archive file, leaving their summaries behind.
+
+    The rows are copied and committed to the archive file first, then
+    deleted from the main database in a transaction of its own (see the
+    module docstring).
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - year (int): The year to archive.
+
+    Returns:
+    - counts (dict): Rows moved per table.
+
+    Raises:
+    - ValueError: If the database is in memory.
+    - sqlite3.Error: If the rows cannot be moved. They stay in the main database, and
+      any copies already made are replaced the next time the year is archived.
+    """
+    file_name = archive_file_name(connection, year)
+    schema = schema_name(year)
+    start, end = year_range(year)
+    counts = {}
+    found = connection.execute("SELECT last_run FROM archives WHERE year = ?", (year,)).fetchone()
+    run = (found[0] if found else 0) + 1
+    # ATTACH is not allowed inside a transaction
+    connection.execute("ATTACH DATABASE ? AS {}".format(schema), (archive_path(connection, file_name),))
+    try:
+        cursor = connection.cursor()
+        # First transaction, archive file only: drop what an interrupted run copied and copy the rows
+        cursor.execute("BEGIN")
+        try:
+            for table in TRANSACTION_TABLES:
+                create_archive_table(cursor, schema, table)
+                cursor.execute("DELETE FROM {}.{} WHERE run >= ?".format(schema, table), (run,))
+                cursor.execute(ARCHIVE_COPY_SQL.format(schema=schema, table=table), (run, start, end))
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+
+        # Second transaction, main database only: summarize and delete the copied rows
+        cursor.execute("BEGIN")
+        try:
+            suspended = [trigger.format(table) for table in TRANSACTION_TABLES for trigger in ARCHIVE_SUSPENDED_TRIGGERS]
+            triggers = cursor.execute("SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger' AND name IN ({})"
+                                      .format(", ".join("?" * len(suspended))), suspended).fetchall()
+            for name, _sql in triggers:
+                cursor.execute("DROP TRIGGER {}".format(name))
+            for table in TRANSACTION_TABLES:
+                archived = ARCHIVED_ROWS_FILTER.format(schema=schema, table=table)
+                cursor.execute(ARCHIVE_SUMMARY_SQL.format(table=table, filter=archived), (start, end, run))
+                counts[table] = cursor.execute("DELETE FROM main.{} WHERE {}".format(table, archived),
+                                               (start, end, run)).rowcount
+            for _name, sql in triggers:
+                cursor.execute(sql)
+            cursor.execute('''INSERT INTO archives (year, file_name, expenses, income, archived_at, last_run)
+                           VALUES (?, ?, (SELECT COUNT(*) FROM {0}.expenses), (SELECT COUNT(*) FROM {0}.income),
+                                   {1}, ?)
+                           ON CONFLICT (year) DO UPDATE
+                           SET file_name = excluded.file_name, expenses = excluded.expenses, income = excluded.income,
+                               archived_at = excluded.archived_at, last_run = excluded.last_run'''.format(schema, periods.NOW_SQL),
+                           (year, file_name, run))
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            query_cache.invalidate(connection)
+        # Statistics for queries on the archive; the file does not change again
+        connection.execute("ANALYZE {}".format(schema))
+    finally:
+        connection.execute("DETACH DATABASE {}".format(schema))
+    return counts
+
+
+
+def compact(connection):
+    """
+    Shrink the main database file and refresh the query planner's statistics.
+
+    VACUUM rewrites the whole file without its free pages; in WAL mode a
+    checkpoint then copies it back into the main file and truncates the log.
+
+    Raises:
+    - sqlite3.Error: If another connection is using the database.
+    """
+    connection.execute("VACUUM")
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    connection.execute("ANALYZE")
+
+
+
+def archive(connection, before=None, compact_after=True):
+    """
+    Archive every closed year that still has transactions in the main database.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - before (int, optional): Archive years before this one. Defaults to the current year.
+    - compact_after (bool): Vacuum and analyze the main database when something was archived.
+
+    Returns:
+    - archived (list): (year, counts) tuples, counts as in archive_year.
+
+    Raises:
+    - ValueError: If before is later than the current year or the database is in memory.
+    - sqlite3.Error: If a year cannot be archived. Years archived before it stay archived.
+    """
+    archived = [(year, archive_year(connection, year)) for year in closed_years(connection, before)]
+    if archived and compact_after:
+        compact(connection)
+    return archived
+
+
+
+def attach_archives(connection, years=None):
+    """
+    Attach archive files and create TEMP views all_expenses and all_income over them and the main database.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - years (iterable, optional): Only attach these archived years. Defaults to all of them.
+
+    Returns:
+    - schemas (list): Names of the attached databases, e.g. "archive_2023".
+
+    Raises:
+    - FileNotFoundError: If an archive file is missing.
+    - ValueError: If more archives are needed than SQLite can attach at once.
+    - sqlite3.Error: If a file cannot be attached, or the connection is in a transaction.
+    """
+    archives = [archive for archive in list_archives(connection) if years is None or archive.year in years]
+    limit = connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(archives) > limit:
+        raise ValueError("{} archives are needed but SQLite can only attach {} at once".format(len(archives), limit))
+    schemas = []
+    try:
+        for archive in archives:
+            path = archive_path(connection, archive.file_name)
+            # ATTACH would create an empty database in place of a missing file
+            if not os.path.exists(path):
+                raise FileNotFoundError("Archive of {} is missing: {}".format(archive.year, path))
+            connection.execute("ATTACH DATABASE ? AS {}".format(schema_name(archive.year)), (path,))
+            schemas.append(schema_name(archive.year))
+        for table in TRANSACTION_TABLES:
+            connection.execute("CREATE TEMP VIEW IF NOT EXISTS all_{0} AS {1}".format(table, " UNION ALL ".join(
+                ["SELECT t.id, c.name AS category, t.item_name, t.amount, t.occurred_at FROM main.{} AS t "
+                 "JOIN main.categories AS c ON c.id = t.category_id".format(table)]
+                + ["SELECT {}, category, item_name, amount, occurred_at FROM {}.{}".format(
+                    "source_id AS id" if "source_id" in archive_columns(connection, schema, table) else "id",
+                    schema, table) for schema in schemas])))
+    except BaseException:
+        detach_archives(connection, schemas)
+        raise
+    return schemas
+
+
+
+def detach_archives(connection, schemas):
+    """
+    Drop the all_expenses and all_income views and detach archive files.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - schemas (list): Names returned by attach_archives.
+
+    Returns:
+    - None
+    """
+    for table in TRANSACTION_TABLES:
+        connection.execute("DROP VIEW IF EXISTS temp.all_{}".format(table))
+    for schema in schemas:
+        connection.execute("DETACH DATABASE {}".format(schema))
+
+
+
+@contextmanager
+def attached(connection, years=None):
+    """
+    Attach archive files for a with block (see attach_archives).
+
+    Returns:
+    - context manager yielding the names of the attached databases.
+    """
+    schemas = attach_archives(connection, years)
+    try:
+        yield schemas
+    finally:
+        detach_archives(connection, schemas)
+
+
+
+def transactions_between(connection, table, start, end, category=None):
+    """
+    Read the transactions of a date range from the main database and the archives it overlaps.
+
+    Only the archive files of years in the range are attached, and only
+    for the length of the query.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): "expenses" or "income".
+    - start (str): First day of the range, "YYYY-MM-DD" (included).
+    - end (str): Day after the range, "YYYY-MM-DD" (excluded).
+    - category (str, optional): Only read this category.
+
+    Returns:
+    - rows (list): (id, category, item_name, amount, occurred_at) tuples, oldest first.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - FileNotFoundError: If an archive file is missing.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    years = {archive.year for archive in list_archives(connection)
+             if year_range(archive.year)[0] < end and start < year_range(archive.year)[1]}
+    query = "SELECT id, category, item_name, amount, occurred_at FROM all_{} WHERE occurred_at >= ? AND occurred_at < ?"
+    params = (start, end)
+    if category is not None:
+        query += " AND category = ?"
+        params += (category,)
+    with attached(connection, years):
+        return connection.execute((query + " ORDER BY occurred_at, id").format(table), params).fetchall()
+
+
+
+def main(argv=None):
+    """
+    Archive closed years, or list the archives, from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Move closed years of transactions into per-year archive files.")
+    parser.add_argument("--database", default="expense_tracker.db", help="SQLite database file")
+    parser.add_argument("--before", type=int, help="Archive years before this one (default: the current year)")
+    parser.add_argument("--no-compact", action="store_true", help="Do not VACUUM and ANALYZE afterwards")
+    parser.add_argument("--list", action="store_true", help="List the archived years and do nothing else")
+    args = parser.parse_args(argv)
+
+    connection = database.connect(args.database)
+    try:
+        migrations.migrate(connection)
+        if not args.list:
+            size = os.path.getsize(args.database)
+            archived = archive(connection, args.before, compact_after=not args.no_compact)
+            for year, counts in archived:
+                print("Archived {}: {:,} expenses, {:,} income entries.".format(year, counts["expenses"], counts["income"]))
+            if not archived:
+                print("Nothing to archive.")
+            elif not args.no_compact:
+                print("Database size {:,} -> {:,} bytes.".format(size, os.path.getsize(args.database)))
+        for entry in list_archives(connection):
+            print("{}  {}  {:,} expenses, {:,} income entries, archived {}".format(
+                entry.year, entry.file_name, entry.expenses, entry.income, entry.archived_at))
+        return 0
+    except (sqlite3.Error, ValueError, OSError) as e:
+        print("Error archiving:", e)
+        return 1
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark the query cache on the budget and goal screens.
+
+Runs the queries behind view_budget, set_budget's message and
+view_progress repeatedly, first on a plain sqlite3 connection (never
+cached) and then on a database.connect connection (cached), with an
+expense added every few reads so the cache is invalidated as in real use.
+
+Usage:
+    python benchmarks/bench_cache.py [rows] [reads] [reads_per_write]    (default 500,000 / 2,000 / 20)
+"""
+
+# Importing necessary modules
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database
+import migrations
+import query_cache
+from repository import BudgetRepository, ExpenseRepository, GoalRepository
+
+
+
+def build_database(path, rows, seed=42):
+    """
+    Create a migrated database with rows expenses over the last year, 50 budgets and 20 goals.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    migrations.migrate(connection)
+    connection.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", (("Category {}".format(i),) for i in range(50)))
+    connection.executemany(
+        "INSERT INTO expenses (category_id, item_name, amount, occurred_at) "
+        "VALUES ((SELECT id FROM categories WHERE name = ?), ?, ?, datetime('now', ?))",
+        (("Category {}".format(rng.randrange(50)), "Item {}".format(i), rng.randint(100, 50000),
+          "-{} hours".format(rng.randrange(24 * 365))) for i in range(rows)))
+    connection.executemany("INSERT INTO budgets (category_id, budget, period) VALUES ((SELECT id FROM categories WHERE name = ?), ?, ?)",
+                           (("Category {}".format(i), 100000, ("monthly", "weekly")[i % 2]) for i in range(50)))
+    connection.executemany("INSERT INTO financial_goals (goal_name, target_amount, current_amount) VALUES (?, ?, ?)",
+                           (("Goal {}".format(i), 1000000, 250000) for i in range(20)))
+    connection.commit()
+    connection.close()
+
+
+
+def run_screens(connection, reads, reads_per_write):
+    """
+    Open the budget and goal screens reads times, adding an expense every reads_per_write reads.
+    """
+    budgets = BudgetRepository(connection)
+    goals = GoalRepository(connection)
+    expenses = ExpenseRepository(connection)
+    start = time.perf_counter()
+    for i in range(reads):
+        budgets.report()
+        budgets.report("Category {}".format(i % 50))
+        goals.totals()
+        if reads_per_write and i % reads_per_write == reads_per_write - 1:
+            expenses.add("Category 1", "bench", 1)
+    return time.perf_counter() - start
+
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    reads = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    reads_per_write = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.db")
+        build_database(path, rows)
+        print("{:,} expenses, {:,} screen refreshes, one write every {} refreshes".format(rows, reads, reads_per_write))
+        print("{:<10} {:>10} {:>14}".format("cache", "seconds", "refreshes/s"))
+        for name, connection in (("off", sqlite3.connect(path)), ("on", database.connect(path))):
+            seconds = run_screens(connection, reads, reads_per_write)
+            print("{:<10} {:>10.2f} {:>14,.0f}".format(name, seconds, reads / seconds))
+            if name == "on":
+                print("cache stats:", query_cache.stats(connection))
+            connection.close()
+
+
+if __name__ == "__main__":
+    main()
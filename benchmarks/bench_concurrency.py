@@ -0,0 +1,135 @@
+"""
+Measure reader and writer throughput with two processes sharing the database.
+
+One process plays the text UI adding expenses (an INSERT and commit per
+item); the other plays the Tkinter app refreshing the budget screen. Each
+connection profile from database.PROFILES is run in turn.
+
+Usage:
+    python benchmarks/bench_concurrency.py [seconds]
+"""
+
+# Importing necessary modules
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database
+import migrations
+import reports
+
+
+# Seconds past the run length to wait for a process's result before giving up on it
+RESULT_GRACE = 30
+
+
+
+def writer(path, profile_name, seconds, results):
+    """
+    Add expenses one at a time, committing each, like add_expense_category.
+    """
+    done = errors = 0
+    try:
+        connection = database.connect(path, profile_name)
+    except sqlite3.OperationalError:
+        # Could not even open the database: the whole run counts as one error
+        results.put(("writer", done, errors + 1))
+        return
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            connection.execute("INSERT INTO expenses (category_id, item_name, amount) VALUES ((SELECT id FROM categories WHERE name = ?), ?, ?)",
+                               ("Food and Dining", "Item {}".format(done), 1250))
+            connection.commit()
+            done += 1
+        except sqlite3.OperationalError:
+            connection.rollback()
+            errors += 1
+    connection.close()
+    results.put(("writer", done, errors))
+
+
+
+def reader(path, profile_name, seconds, results):
+    """
+    Refresh the budget report in a loop, like the budget screen.
+    """
+    done = errors = 0
+    try:
+        connection = database.connect(path, profile_name)
+    except sqlite3.OperationalError:
+        results.put(("reader", done, errors + 1))
+        return
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            reports.budget_report(connection)
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    connection.close()
+    results.put(("reader", done, errors))
+
+
+
+def run_profile(profile_name, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "concurrency.db")
+        connection = database.connect(path, profile_name)
+        migrations.migrate(connection)
+        connection.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", (("Category {}".format(i),) for i in range(50)))
+        connection.executemany("INSERT INTO expenses (category_id, item_name, amount) VALUES ((SELECT id FROM categories WHERE name = ?), ?, ?)",
+                               (("Category {}".format(i % 50), "Seed", 100) for i in range(50000)))
+        connection.executemany("INSERT INTO budgets (category_id, budget) VALUES ((SELECT id FROM categories WHERE name = ?), ?)",
+                               (("Category {}".format(i), 100000) for i in range(50)))
+        connection.commit()
+        connection.close()
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=target, name=target.__name__, args=(path, profile_name, seconds, results))
+                     for target in (writer, reader)]
+        for process in processes:
+            process.start()
+        outcome = {}
+        try:
+            for _ in processes:
+                role, done, errors = results.get(timeout=seconds + RESULT_GRACE)
+                outcome[role] = (done, errors)
+        except queue.Empty:
+            pass
+        for process in processes:
+            process.join(RESULT_GRACE)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        crashed = [process.name for process in processes if process.exitcode != 0]
+        if crashed or len(outcome) < len(processes):
+            raise RuntimeError("{} profile: {} did not finish (exit codes {})".format(
+                profile_name, ", ".join(crashed) or "a process", [process.exitcode for process in processes]))
+    return outcome
+
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("{:>8} {:>14} {:>14} {:>14} {:>14}".format("profile", "writes/s", "write errors", "reads/s", "read errors"))
+    for profile_name in database.PROFILES:
+        try:
+            outcome = run_profile(profile_name, seconds)
+        except RuntimeError as e:
+            print(e)
+            continue
+        writes, write_errors = outcome["writer"]
+        reads, read_errors = outcome["reader"]
+        print("{:>8} {:>14,.0f} {:>14} {:>14,.0f} {:>14}".format(
+            profile_name, writes / seconds, write_errors, reads / seconds, read_errors))
+
+
+if __name__ == "__main__":
+    main()
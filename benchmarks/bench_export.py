@@ -0,0 +1,123 @@
+"""
+Benchmark streaming export of a large expenses table.
+
+Each export runs in its own process so its peak memory (max RSS) can be
+reported. The fetchall row shows what reading the whole table at once, as
+view_expenses used to, costs in memory. Parquet is skipped when pyarrow is
+not installed.
+
+Usage:
+    python benchmarks/bench_export.py [rows]    (default 10,000,000)
+"""
+
+# Importing necessary modules
+import multiprocessing
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import exporter
+import migrations
+
+
+
+def build_database(path, rows, seed=42):
+    """
+    Create a migrated database file with rows expenses.
+
+    The triggers and secondary indexes are dropped while loading and the
+    indexes recreated afterwards, which is much faster for a one-off bulk load.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    migrations.migrate(connection)
+    triggers = connection.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'expenses'").fetchall()
+    for (name,) in triggers:
+        connection.execute("DROP TRIGGER {}".format(name))
+    indexes = connection.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'expenses' "
+                                 "AND sql IS NOT NULL").fetchall()
+    for name, _sql in indexes:
+        connection.execute("DROP INDEX {}".format(name))
+    connection.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", (("Category {}".format(i),) for i in range(50)))
+    connection.executemany(
+        "INSERT INTO expenses (category_id, item_name, amount, occurred_at) VALUES ((SELECT id FROM categories WHERE name = ?), ?, ?, ?)",
+        (("Category {}".format(rng.randrange(50)), "Item {}".format(i), rng.randint(100, 50000),
+          "20{:02d}-{:02d}-{:02d} 12:00:00".format(rng.randint(15, 24), rng.randint(1, 12), rng.randint(1, 28)))
+         for i in range(rows)))
+    connection.commit()
+    for _name, sql in indexes:
+        connection.execute(sql)
+    connection.commit()
+    connection.close()
+
+
+
+def fetchall_export(connection, output):
+    """
+    Read the whole table into a list before writing it, for comparison.
+    """
+    rows = connection.execute("SELECT t.id, c.name, t.item_name, t.amount, t.occurred_at FROM expenses AS t "
+                              "JOIN categories AS c ON c.id = t.category_id ORDER BY t.id").fetchall()
+    with open(output, "w") as out:
+        for row in rows:
+            out.write("{},{},{},{},{}\n".format(*row))
+    return len(rows)
+
+
+
+def run_export(path, output_format, output, filters, results):
+    """
+    Child process: run one export and report rows, seconds and peak RSS.
+    """
+    connection = sqlite3.connect(path)
+    start = time.perf_counter()
+    if output_format == "fetchall":
+        count = fetchall_export(connection, output)
+    else:
+        count = exporter.export(connection, "expenses", output_format, output, **filters)
+    seconds = time.perf_counter() - start
+    connection.close()
+    results.put((count, seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    try:
+        import pyarrow  # noqa: F401
+        formats = ("csv", "jsonl", "parquet")
+    except ImportError:
+        formats = ("csv", "jsonl")
+        print("pyarrow is not installed; skipping Parquet.")
+    cases = [(output_format, {}) for output_format in formats]
+    cases.append(("csv", {"start": "2020-01-01", "end": "2020-02-01"}))
+    cases.append(("csv", {"category": "Category 7"}))
+    cases.append(("fetchall", {}))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "export.db")
+        start = time.perf_counter()
+        build_database(path, rows)
+        print("Built {:,} rows in {:.1f}s".format(rows, time.perf_counter() - start))
+        print("{:<10} {:<36} {:>12} {:>10} {:>12} {:>12}".format("format", "filter", "rows", "seconds", "rows/s", "peak MiB"))
+        for output_format, filters in cases:
+            output = os.path.join(directory, "export.out")
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run_export, args=(path, output_format, output, filters, results))
+            process.start()
+            count, seconds, peak = results.get()
+            process.join()
+            print("{:<10} {:<36} {:>12,} {:>10.2f} {:>12,.0f} {:>12.1f}".format(
+                output_format, ", ".join("{}={}".format(*item) for item in filters.items()) or "-",
+                count, seconds, count / seconds, peak))
+            os.remove(output)
+
+
+if __name__ == "__main__":
+    main()
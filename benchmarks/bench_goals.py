@@ -0,0 +1,90 @@
+"""
+Benchmark the goal progress report with many goals.
+
+Builds a database with goals and a contribution history, then times
+goal_analytics.goal_progress with the plain Python computation and, when
+NumPy is installed, the vectorized one, and checks that both agree.
+
+Usage:
+    python benchmarks/bench_goals.py [goals] [contributions]    (default 10,000 / 200,000)
+"""
+
+# Importing necessary modules
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import goal_analytics
+import migrations
+
+
+
+def build_database(path, goals, contributions, seed=42):
+    """
+    Create a migrated database with goals (some without a target) and contributions over the last year.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    migrations.migrate(connection)
+    connection.executemany("INSERT INTO financial_goals (goal_name, target_amount, current_amount) VALUES (?, ?, ?)",
+                           (("Goal {}".format(i), rng.choice((0, rng.randint(10000, 10000000))), rng.randint(0, 500000))
+                            for i in range(goals)))
+    connection.execute("UPDATE goal_contributions SET contributed_at = datetime('now', '-365 days')")
+    connection.executemany("INSERT INTO goal_contributions (goal_id, amount, contributed_at) "
+                           "VALUES (?, ?, datetime('now', ?))",
+                           ((rng.randint(1, goals), rng.randint(-5000, 50000), "-{} days".format(rng.randrange(365)))
+                            for _ in range(contributions)))
+    connection.commit()
+    return connection
+
+
+
+def best_of(function, repeat=5):
+    """
+    Return the result of the last run and the best time in milliseconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+
+def main():
+    goals = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    contributions = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    with tempfile.TemporaryDirectory() as directory:
+        connection = build_database(os.path.join(directory, "goals.db"), goals, contributions)
+        print("{:,} goals, {:,} contributions".format(goals, contributions))
+
+        rows, query_ms = best_of(lambda: connection.execute(goal_analytics.GOAL_HISTORY_QUERY,
+                                                            {"on": date.today().isoformat()}).fetchall())
+        print("{:<28} {:>10.2f} ms".format("history query", query_ms))
+        python_result, python_ms = best_of(lambda: goal_analytics.goal_progress(connection, use_numpy=False))
+        print("{:<28} {:>10.2f} ms".format("report, plain Python", python_ms))
+
+        numpy = goal_analytics.load_numpy()
+        if numpy is None:
+            print("NumPy is not installed; skipping the vectorized report.")
+        else:
+            _columns, compute_ms = best_of(lambda: goal_analytics.python_projections(rows))
+            print("{:<28} {:>10.2f} ms".format("  projections only", compute_ms))
+            numpy_result, numpy_ms = best_of(lambda: goal_analytics.goal_progress(connection, use_numpy=True))
+            print("{:<28} {:>10.2f} ms".format("report, NumPy", numpy_ms))
+            _columns, compute_ms = best_of(lambda: goal_analytics.numpy_projections(numpy, rows))
+            print("{:<28} {:>10.2f} ms".format("  projections only", compute_ms))
+            print("results identical:", numpy_result == python_result)
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
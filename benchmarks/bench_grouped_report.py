@@ -0,0 +1,88 @@
+"""
+Benchmark the grouped expense report against the old per-category queries.
+
+Usage:
+    python benchmarks/bench_grouped_report.py
+"""
+
+# Importing necessary modules
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import migrations
+import reports
+from repository import ExpenseRepository
+
+
+
+def build_database(rows, categories, seed=42):
+    """
+    Build a migrated in-memory database with an expenses table filled with random rows.
+
+    Parameters:
+    - rows (int): Number of expense rows to insert.
+    - categories (int): Number of distinct categories.
+    - seed (int): Seed for the random generator.
+
+    Returns:
+    - connection (sqlite3.Connection): Connection to the populated database.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(":memory:")
+    migrations.migrate(connection)
+    ExpenseRepository(connection).add_many(
+        ("Category {}".format(rng.randrange(categories)), "Item {}".format(i), round(rng.uniform(1, 500), 2)) for i in range(rows))
+    return connection
+
+
+
+def per_category_report(connection):
+    """
+    The original report: one SELECT per distinct category.
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT DISTINCT category_id FROM expenses")
+    count = 0
+    for category in cursor.fetchall():
+        cursor.execute("SELECT * FROM expenses WHERE category_id=?", (category[0],))
+        count += len(cursor.fetchall())
+    return count
+
+
+
+def grouped_report(connection):
+    """
+    The grouped report: one ordered pass over the table.
+    """
+    count = 0
+    for _category, rows in reports.grouped_by_category(connection, "expenses"):
+        count += len(rows)
+    return count
+
+
+
+def time_call(function, connection):
+    start = time.perf_counter()
+    function(connection)
+    return time.perf_counter() - start
+
+
+
+def main():
+    print("{:>8} {:>6} {:>14} {:>14} {:>8}".format("rows", "cats", "per-category s", "grouped s", "speedup"))
+    for rows in (10000, 50000, 200000):
+        for categories in (10, 100, 400):
+            connection = build_database(rows, categories)
+            old = time_call(per_category_report, connection)
+            new = time_call(grouped_report, connection)
+            print("{:>8} {:>6} {:>14.4f} {:>14.4f} {:>7.1f}x".format(rows, categories, old, new, old / new))
+            connection.close()
+
+
+if __name__ == "__main__":
+    main()
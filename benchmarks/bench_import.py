@@ -0,0 +1,102 @@
+"""
+Benchmark the batched statement import against one INSERT and commit per row.
+
+The per-row path mirrors add_expense_category in the text UI. Both paths
+write to a database file on disk so the per-commit sync cost is included.
+
+The batched rows still pass through the triggers that keep category_totals,
+monthly_rollups and the search index current, which caps the batched rate
+well below what executemany alone reaches. The speedup is printed against
+TARGET_SPEEDUP and says plainly when the target is not met; how far off it
+is depends mostly on how slow a commit is on the storage.
+
+Usage:
+    python benchmarks/bench_import.py [rows]
+"""
+
+# Importing necessary modules
+import csv
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import categories
+import importer
+import migrations
+
+
+PER_ROW_SAMPLE = 2000
+
+# The speedup over per-row commits the batched import was asked to reach
+TARGET_SPEEDUP = 100
+
+
+
+def write_statement(path, rows, seed=42):
+    """
+    Write a CSV statement with random transactions.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as statement:
+        writer = csv.writer(statement)
+        writer.writerow(["Date", "Description", "Amount"])
+        for i in range(rows):
+            writer.writerow(["2024-{:02d}-{:02d}".format(rng.randint(1, 12), rng.randint(1, 28)),
+                             "Shop {}".format(rng.randrange(200)), "-{:.2f}".format(rng.uniform(1, 500))])
+
+
+
+def open_database(path):
+    connection = sqlite3.connect(path)
+    migrations.migrate(connection)
+    return connection
+
+
+
+def per_row_import(connection, path, limit):
+    """
+    Insert and commit each row separately, as add_expense_category does.
+    """
+    count = 0
+    for record in importer.read_csv(path):
+        if count == limit:
+            break
+        connection.execute("INSERT INTO expenses (category_id, item_name, amount) VALUES (?, ?, ?)",
+                           (categories.category_id(connection, importer.DEFAULT_CATEGORY), record.item_name, abs(record.amount)))
+        connection.commit()
+        count += 1
+    return count
+
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as directory:
+        statement = os.path.join(directory, "statement.csv")
+        write_statement(statement, rows)
+
+        connection = open_database(os.path.join(directory, "per_row.db"))
+        start = time.perf_counter()
+        count = per_row_import(connection, statement, PER_ROW_SAMPLE)
+        per_row_rate = count / (time.perf_counter() - start)
+        connection.close()
+
+        connection = open_database(os.path.join(directory, "batched.db"))
+        result = importer.import_file(connection, statement, table="expenses")
+        batched_rate = result.expenses / result.seconds
+        connection.close()
+
+    print("per-row commits: {:>12,.0f} rows/s (sample of {} rows)".format(per_row_rate, PER_ROW_SAMPLE))
+    print("batched import:  {:>12,.0f} rows/s ({} rows)".format(batched_rate, rows))
+    speedup = batched_rate / per_row_rate
+    print("speedup:         {:>12.1f}x".format(speedup))
+    print("target:          {:>12.0f}x ({})".format(TARGET_SPEEDUP, "met" if speedup >= TARGET_SPEEDUP else "NOT met"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the monthly trend report from rollups against a GROUP BY over the raw rows.
+
+Also reports how much the rollup triggers add to a bulk insert.
+
+Usage:
+    python benchmarks/bench_rollups.py
+"""
+
+# Importing necessary modules
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import migrations
+import rollups
+from repository import ExpenseRepository
+
+
+
+def random_rows(rows, categories, years, seed=42):
+    """
+    Generate (category, item_name, amount, occurred_at) rows spread over a number of years.
+    """
+    rng = random.Random(seed)
+    for i in range(rows):
+        occurred_at = "{:04d}-{:02d}-{:02d} 12:00:00".format(2024 - rng.randrange(years), rng.randint(1, 12), rng.randint(1, 28))
+        yield ("Category {}".format(rng.randrange(categories)), "Item {}".format(i), rng.randint(100, 50000) / 100, occurred_at)
+
+
+
+def build_database(rows, categories, years, with_triggers=True):
+    """
+    Build a migrated in-memory database and time filling it.
+
+    Returns:
+    - result (tuple): (connection, seconds spent inserting).
+    """
+    connection = sqlite3.connect(":memory:")
+    migrations.migrate(connection)
+    if not with_triggers:
+        for trigger in ("insert", "delete", "update_old", "update_new"):
+            connection.execute("DROP TRIGGER expenses_rollups_{}".format(trigger))
+    data = list(random_rows(rows, categories, years))
+    start = time.perf_counter()
+    ExpenseRepository(connection).add_many(data)
+    return connection, time.perf_counter() - start
+
+
+
+def raw_trend(connection):
+    """
+    Monthly totals per category computed from every transaction.
+    """
+    return connection.execute("SELECT substr(occurred_at, 1, 7), category_id, SUM(amount), COUNT(*), MIN(amount), MAX(amount) "
+                              "FROM expenses GROUP BY 1, 2 ORDER BY 1, 2").fetchall()
+
+
+
+def rollup_trend(connection):
+    """
+    Monthly totals per category read from monthly_rollups.
+    """
+    return rollups.monthly_trend(connection, "expenses")
+
+
+
+def time_call(function, connection):
+    start = time.perf_counter()
+    result = function(connection)
+    return time.perf_counter() - start, len(result)
+
+
+
+def main():
+    print("{:>8} {:>6} {:>12} {:>12} {:>8} {:>12} {:>12}".format(
+        "rows", "months", "raw s", "rollup s", "speedup", "insert s", "no-trigger s"))
+    for rows in (10000, 100000, 500000):
+        connection, insert_seconds = build_database(rows, 20, 5)
+        plain, plain_seconds = build_database(rows, 20, 5, with_triggers=False)
+        plain.close()
+        raw_seconds, groups = time_call(raw_trend, connection)
+        rollup_seconds, rollup_groups = time_call(rollup_trend, connection)
+        assert groups == rollup_groups
+        print("{:>8} {:>6} {:>12.4f} {:>12.4f} {:>7.0f}x {:>12.3f} {:>12.3f}".format(
+            rows, 60, raw_seconds, rollup_seconds, raw_seconds / rollup_seconds, insert_seconds, plain_seconds))
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
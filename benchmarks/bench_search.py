@@ -0,0 +1,101 @@
+"""
+Benchmark full-text search against a LIKE scan of the expenses table.
+
+Builds a migrated database with rows expenses whose item names are drawn
+from a vocabulary of a few thousand words, then times the same searches
+through the FTS5 index (search.search, ranked and newest first) and as the
+LIKE '%word%' scan used without it.
+
+Usage:
+    python benchmarks/bench_search.py [rows]    (default 1,000,000)
+"""
+
+# Importing necessary modules
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import migrations
+import search
+
+WORDS = ["uber", "ride", "airport", "coffee", "groceries", "rent", "fuel", "lunch", "dinner", "taxi",
+         "pharmacy", "cinema", "gym", "books", "parking", "electricity", "water", "internet", "phone", "gift"]
+
+QUERIES = ["uber", "uber ride", "air", "pharmacy parking", "nothing matches"]
+
+# Made-up words so the common words above appear in a realistic share of rows
+FILLER_WORDS = ["{}{}".format(word, number) for word in ("shop", "store", "item", "order") for number in range(1000)]
+
+
+
+def build_database(path, rows, seed=42):
+    """
+    Create a migrated database file with rows expenses and a filled search index.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    migrations.migrate(connection)
+    connection.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", (("Category {}".format(i),) for i in range(50)))
+    connection.executemany(
+        "INSERT INTO expenses (category_id, item_name, amount, occurred_at) VALUES ((SELECT id FROM categories WHERE name = ?), ?, ?, ?)",
+        (("Category {}".format(rng.randrange(50)), " ".join([rng.choice(WORDS)] + rng.sample(FILLER_WORDS, 2)), rng.randint(100, 50000),
+          "2024-{:02d}-{:02d} 12:00:00".format(rng.randint(1, 12), rng.randint(1, 28)))
+         for _ in range(rows)))
+    connection.commit()
+    return connection
+
+
+
+def time_query(function, repeat=5):
+    """
+    Return the best of repeat runs in milliseconds and the number of results.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(hits)
+
+
+
+def like_search(connection, text, limit):
+    """
+    The search without an FTS5 index: every word as LIKE '%word%' on both columns.
+    """
+    words = search.search_terms(text)
+    conditions = " AND ".join(["(t.item_name LIKE ? OR c.name LIKE ?)"] * len(words))
+    patterns = []
+    for word in words:
+        patterns += ["%{}%".format(word)] * 2
+    return connection.execute("SELECT t.id FROM expenses AS t JOIN categories AS c ON c.id = t.category_id "
+                              "WHERE {} ORDER BY t.id DESC LIMIT ?".format(conditions),
+                              patterns + [limit]).fetchall()
+
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        connection = build_database(os.path.join(directory, "search.db"), rows)
+        print("Built {:,} rows in {:.1f}s".format(rows, time.perf_counter() - start))
+        if not search.has_search_index(connection, "expenses"):
+            print("This SQLite has no FTS5; only the LIKE scan can be timed.")
+        print("{:<20} {:>12} {:>12} {:>10} {:>8}".format("query", "ranked ms", "newest ms", "like ms", "hits"))
+        for text in QUERIES:
+            ranked_ms, hits = time_query(lambda: search.search(connection, "expenses", text))
+            newest_ms, _hits = time_query(lambda: search.search(connection, "expenses", text, ranked=False))
+            like_ms, _hits = time_query(lambda: like_search(connection, text, search.DEFAULT_LIMIT))
+            print("{:<20} {:>12.2f} {:>12.2f} {:>10.2f} {:>8,}".format(text, ranked_ms, newest_ms, like_ms, hits))
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measure start-up time of the text UI, the command line and the GUI module.
+
+Each entry point is started as a fresh process. "cold" runs start with no
+database file, so every migration runs; "warm" runs reuse a database that
+is already at the current schema version. The bare interpreter start-up is
+shown for reference.
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+"""
+
+# Importing necessary modules
+import compileall
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+TEXT_UI = os.path.join(ROOT, "budget_Tracker - Simple text UI.py")
+CLI = os.path.join(ROOT, "budget_cli.py")
+
+
+
+def load_text_ui():
+    """
+    Import the text UI module, whose file name is not a valid module name.
+    """
+    sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location("text_ui", TEXT_UI)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Taken from the menu itself so the benchmark follows it when entries are added
+QUIT_CHOICE = load_text_ui().QUIT_CHOICE
+
+# Imports the GUI module without opening a window and fails if Tk was loaded
+GUI_IMPORT = "import sys; sys.path.insert(0, {!r}); import budget_Tracker; sys.exit('tkinter' in sys.modules)".format(ROOT)
+
+ENTRY_POINTS = [
+    ("python -c pass", [sys.executable, "-c", "pass"], None),
+    ("text UI, quit at once", [sys.executable, TEXT_UI], QUIT_CHOICE + "\n"),
+    ("cli report", [sys.executable, CLI, "report"], None),
+    ("cli add-expense", [sys.executable, CLI, "add-expense", "Food", "bread", "2.50"], None),
+    ("import budget_Tracker", [sys.executable, "-c", GUI_IMPORT], None),
+]
+
+
+
+def run_once(command, stdin, directory, cold):
+    """
+    Start a command once in a directory and time it until it exits.
+
+    Returns:
+    - seconds (float): Wall-clock time of the run.
+    """
+    if cold:
+        for name in os.listdir(directory):
+            if name.startswith("expense_tracker.db"):
+                os.remove(os.path.join(directory, name))
+    start = time.perf_counter()
+    subprocess.run(command, input=stdin, cwd=directory, stdout=subprocess.DEVNULL, check=True, text=True)
+    return time.perf_counter() - start
+
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    # Byte-compile up front, as PYTHONDONTWRITEBYTECODE would otherwise make every run compile
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+    print("{:<24} {:>12} {:>12}".format("entry point", "cold ms", "warm ms"))
+    with tempfile.TemporaryDirectory() as directory:
+        for name, command, stdin in ENTRY_POINTS:
+            # One untimed run to warm the file cache and create the database
+            run_once(command, stdin, directory, cold=False)
+            cold = statistics.median(run_once(command, stdin, directory, cold=True) for _ in range(runs))
+            warm = statistics.median(run_once(command, stdin, directory, cold=False) for _ in range(runs))
+            print("{:<24} {:>12.1f} {:>12.1f}".format(name, cold * 1000, warm * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Fill an expense tracker database with a reproducible synthetic ledger.
+
+The same seed and sizes always give the same rows, so benchmark runs on
+different versions of the app measure the same data. Transactions are
+spread over the last `days` days up to today (so this month and week
+always have spending), about one in ten is income, every category gets a
+budget and every goal a contribution history.
+
+Triggers and secondary indexes are dropped while loading and recreated
+afterwards, even if loading fails, then the derived tables (category
+totals, monthly rollups, search indexes) are rebuilt, so the result is the
+same as if every row had been entered through the app, only much faster.
+Rows are committed in batches; if a run is interrupted, rebuild the derived
+tables with totals.py --rebuild and rollups.py --rebuild.
+
+Usage:
+    python benchmarks/generate_ledger.py --transactions 1000000 [--categories 20] [--goals 50]
+                                         [--days 730] [--seed 42] [--database expense_tracker.db] [--append]
+"""
+
+# Importing necessary modules
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database
+import migrations
+import rollups
+import search
+import totals
+from categories import DEFAULT_CATEGORIES, category_id
+
+ITEM_WORDS = ["uber", "ride", "coffee", "groceries", "rent", "fuel", "lunch", "dinner", "taxi", "pharmacy",
+              "cinema", "gym", "books", "parking", "electricity", "water", "internet", "phone", "gift", "insurance"]
+
+INCOME_ITEMS = ["salary", "freelance", "interest", "refund", "dividend"]
+
+INCOME_SHARE = 0.1
+
+# Rows written per executemany call
+BATCH_SIZE = 50000
+
+
+
+def category_names(count):
+    """
+    The first count category names: the app's defaults, then numbered ones.
+    """
+    return [DEFAULT_CATEGORIES[i] if i < len(DEFAULT_CATEGORIES) else "Category {}".format(i + 1) for i in range(count)]
+
+
+
+def transaction_rows(rng, count, categories, days, now):
+    """
+    Generate (table, category, item_name, amount_cents, occurred_at) tuples.
+
+    Categories follow a skewed distribution (a few take most of the
+    spending) and amounts are log-normal, like a real ledger.
+    """
+    weights = [1.0 / (rank + 1) for rank in range(len(categories))]
+    seconds = days * 24 * 3600
+    for _ in range(count):
+        occurred_at = (now - timedelta(seconds=rng.randrange(seconds))).strftime("%Y-%m-%d %H:%M:%S")
+        if rng.random() < INCOME_SHARE:
+            yield ("income", "", rng.choice(INCOME_ITEMS), int(rng.lognormvariate(11, 0.6)), occurred_at)
+        else:
+            category = rng.choices(categories, weights)[0]
+            item_name = " ".join(rng.sample(ITEM_WORDS, 2))
+            yield ("expenses", category, item_name, max(1, int(rng.lognormvariate(7.5, 1.1))), occurred_at)
+
+
+
+def drop_triggers_and_indexes(connection, tables):
+    """
+    Drop the triggers and secondary indexes of some tables.
+
+    Returns:
+    - statements (list): The CREATE statements, to run again after loading.
+    """
+    placeholders = ", ".join("?" * len(tables))
+    objects = connection.execute("SELECT type, name, sql FROM sqlite_master WHERE type IN ('trigger', 'index') "
+                                 "AND sql IS NOT NULL AND tbl_name IN ({})".format(placeholders), tables).fetchall()
+    for object_type, name, _sql in objects:
+        connection.execute("DROP {} {}".format(object_type.upper(), name))
+    return [sql for _type, _name, sql in objects]
+
+
+
+def generate(connection, transactions, categories=20, goals=50, days=730, seed=42, now=None):
+    """
+    Write a synthetic ledger to a migrated database.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - transactions (int): Number of expense and income rows together.
+    - categories (int): Number of expense categories, each with a budget.
+    - goals (int): Number of financial goals.
+    - days (int): Spread the transactions over this many days up to now.
+    - seed (int): Seed for the random generator.
+    - now (datetime, optional): End of the ledger. Defaults to the current time.
+
+    Returns:
+    - counts (dict): Rows written per table.
+
+    Raises:
+    - sqlite3.Error: If the rows cannot be written.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now().replace(microsecond=0)
+    names = category_names(categories)
+    tables = ("expenses", "income", "financial_goals", "goal_contributions")
+    migrations.migrate(connection)
+
+    counts = {"expenses": 0, "income": 0, "budgets": 0, "financial_goals": 0, "goal_contributions": 0}
+    statements = drop_triggers_and_indexes(connection, tables)
+    try:
+        ids = {name: category_id(connection, name) for name in names + [""]}
+        rows = transaction_rows(rng, transactions, names, days, now)
+        while True:
+            batch = {"expenses": [], "income": []}
+            for _index, row in zip(range(BATCH_SIZE), rows):
+                batch[row[0]].append((ids[row[1]],) + row[2:])
+            if not batch["expenses"] and not batch["income"]:
+                break
+            for table, table_rows in batch.items():
+                connection.executemany("INSERT INTO {} (category_id, item_name, amount, occurred_at) VALUES (?, ?, ?, ?)"
+                                       .format(table), table_rows)
+                counts[table] += len(table_rows)
+            connection.commit()
+
+        budgets = [(ids[name], rng.randrange(20000, 500000, 1000), ("monthly", "weekly")[index % 2])
+                   for index, name in enumerate(names)]
+        connection.executemany("INSERT OR REPLACE INTO budgets (category_id, budget, period) VALUES (?, ?, ?)", budgets)
+        counts["budgets"] = len(budgets)
+
+        # Goals start up to a year ago with an opening amount, then get a contribution roughly every month
+        first_goal_id = (connection.execute("SELECT COALESCE(MAX(id), 0) FROM financial_goals").fetchone()[0]) + 1
+        for goal_id in range(first_goal_id, first_goal_id + goals):
+            target = rng.choice([0] + [rng.randrange(100000, 10000000, 10000)] * 9)
+            started = now - timedelta(days=rng.randrange(30, 365))
+            contributions = [(goal_id, rng.randrange(0, 100000, 100), started.strftime("%Y-%m-%d %H:%M:%S"), 1)]
+            day = started
+            while True:
+                day += timedelta(days=rng.randrange(20, 40))
+                if day > now:
+                    break
+                contributions.append((goal_id, rng.randrange(-5000, 50000, 100), day.strftime("%Y-%m-%d %H:%M:%S"), 0))
+            current = sum(amount for _goal, amount, _at, _opening in contributions)
+            connection.execute("INSERT INTO financial_goals (id, goal_name, target_amount, current_amount) VALUES (?, ?, ?, ?)",
+                               (goal_id, "Goal {}".format(goal_id), target, current))
+            connection.executemany("INSERT INTO goal_contributions (goal_id, amount, contributed_at, opening) "
+                                   "VALUES (?, ?, ?, ?)", contributions)
+            counts["financial_goals"] += 1
+            counts["goal_contributions"] += len(contributions)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        for statement in statements:
+            connection.execute(statement)
+        connection.commit()
+    totals.rebuild_category_totals(connection)
+    rollups.rebuild_rollups(connection)
+    with connection:
+        for table in ("expenses", "income"):
+            if search.has_search_index(connection, table):
+                connection.execute("INSERT INTO {0}_search ({0}_search) VALUES ('rebuild')".format(table))
+    return counts
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill a database with a reproducible synthetic ledger.")
+    parser.add_argument("--database", default="expense_tracker.db", help="SQLite database file")
+    parser.add_argument("--transactions", type=int, default=100000, help="Expense and income rows (10k to 10M)")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--goals", type=int, default=50)
+    parser.add_argument("--days", type=int, default=730, help="Spread transactions over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--append", action="store_true", help="Add to a database that already has transactions")
+    args = parser.parse_args(argv)
+
+    connection = database.connect(args.database)
+    try:
+        migrations.migrate(connection)
+        existing = connection.execute("SELECT (SELECT COUNT(*) FROM expenses) + (SELECT COUNT(*) FROM income)").fetchone()[0]
+        if existing and not args.append:
+            print("{} already has {:,} transactions; use --append to add to them.".format(args.database, existing))
+            return 1
+        start = time.perf_counter()
+        counts = generate(connection, args.transactions, args.categories, args.goals, args.days, args.seed)
+        print("Wrote {} in {:.1f}s.".format(", ".join("{:,} {}".format(count, table) for table, count in counts.items()),
+                                            time.perf_counter() - start))
+        return 0
+    except sqlite3.Error as e:
+        print("Error generating ledger:", e)
+        return 1
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+"""
+Load-test the HTTP/JSON API server.
+
+Starts api_server.py on a temporary database (or targets --url), then runs
+a number of concurrent keep-alive clients for a fixed time. Each client
+mixes list, report and add requests. Prints requests per second and
+latency percentiles per endpoint.
+
+Usage:
+    python benchmarks/load_test.py [--clients 32] [--seconds 10] [--workers 4] [--url http://127.0.0.1:8080]
+"""
+
+# Importing necessary modules
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import database
+import migrations
+
+# (weight, method, path, body)
+REQUEST_MIX = [
+    (40, "GET", "/expenses?limit=50", None),
+    (20, "GET", "/budgets", None),
+    (15, "GET", "/expenses/by-category", None),
+    (5, "GET", "/goals/progress", None),
+    (20, "POST", "/expenses", {"category": "Category 3", "item_name": "load test", "amount": "4.20"}),
+]
+
+
+
+def seed_database(path, rows=100000, seed=42):
+    """
+    Create a database with rows expenses, 50 budgets and a few goals.
+    """
+    rng = random.Random(seed)
+    connection = database.connect(path)
+    migrations.migrate(connection)
+    connection.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", (("Category {}".format(i),) for i in range(50)))
+    connection.executemany("INSERT INTO expenses (category_id, item_name, amount, occurred_at) "
+                           "VALUES ((SELECT id FROM categories WHERE name = ?), ?, ?, date('now', ?))",
+                           (("Category {}".format(rng.randrange(50)), "Item {}".format(i), rng.randint(100, 50000),
+                             "-{} days".format(rng.randrange(400))) for i in range(rows)))
+    connection.executemany("INSERT INTO budgets (category_id, budget) VALUES ((SELECT id FROM categories WHERE name = ?), ?)",
+                           (("Category {}".format(i), 100000) for i in range(50)))
+    connection.executemany("INSERT INTO financial_goals (goal_name, target_amount, current_amount) VALUES (?, ?, ?)",
+                           (("Goal {}".format(i), 1000000, 250000) for i in range(5)))
+    connection.commit()
+    connection.close()
+
+
+
+async def client(host, port, deadline, latencies, errors, rng):
+    """
+    One keep-alive connection sending requests from REQUEST_MIX until the deadline.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    weights = [weight for weight, _method, _path, _body in REQUEST_MIX]
+    try:
+        while time.perf_counter() < deadline:
+            _weight, method, path, body = rng.choices(REQUEST_MIX, weights)[0]
+            data = json.dumps(body).encode() if body is not None else b""
+            request = "{} {} HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n".format(
+                method, path, host, len(data)).encode() + data
+            start = time.perf_counter()
+            writer.write(request)
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            key = "{} {}".format(method, path.split("?")[0])
+            latencies.setdefault(key, []).append(time.perf_counter() - start)
+            if int(status_line.split()[1]) >= 400:
+                errors[key] = errors.get(key, 0) + 1
+    finally:
+        writer.close()
+
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+
+async def run_load(host, port, clients, seconds):
+    latencies = {}
+    errors = {}
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, deadline, latencies, errors, random.Random(i)) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - start
+
+
+
+def wait_for_server(process):
+    """
+    Read the server's "Serving ..." line and return the port it listens on.
+    """
+    line = process.stdout.readline()
+    if not line.startswith("Serving"):
+        raise RuntimeError("server did not start: {}".format(line.strip()))
+    return int(line.rsplit(":", 1)[1].strip("/\n"))
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API server.")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4, help="Server database threads (local server only)")
+    parser.add_argument("--rows", type=int, default=100000, help="Expenses in the seeded database (local server only)")
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory() as directory:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port
+        else:
+            path = os.path.join(directory, "load.db")
+            seed_database(path, args.rows)
+            process = subprocess.Popen([sys.executable, os.path.join(ROOT, "api_server.py"), "--database", path,
+                                        "--port", "0", "--workers", str(args.workers)],
+                                       stdout=subprocess.PIPE, text=True)
+            host, port = "127.0.0.1", wait_for_server(process)
+        try:
+            latencies, errors, elapsed = asyncio.run(run_load(host, port, args.clients, args.seconds))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    print("{} clients, {:.1f}s: {:,} requests, {:,.0f} requests/s".format(args.clients, elapsed, total, total / elapsed))
+    print("{:<28} {:>9} {:>8} {:>9} {:>9} {:>9}".format("endpoint", "requests", "errors", "p50 ms", "p99 ms", "max ms"))
+    for key in sorted(latencies):
+        values = latencies[key]
+        print("{:<28} {:>9,} {:>8} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+            key, len(values), errors.get(key, 0), percentile(values, 0.5) * 1000, percentile(values, 0.99) * 1000,
+            max(values) * 1000))
+
+
+if __name__ == "__main__":
+    main()
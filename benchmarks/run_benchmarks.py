@@ -0,0 +1,274 @@
+"""
+Time every operation of the text UI on a synthetic ledger and compare with a baseline.
+
+Each operation is the function the text UI menu calls (the Tkinter app
+runs the same repository queries), run headlessly with its printed output
+discarded. Every operation is timed `repeat` times for p50/p99/mean
+latency, then run once more under tracemalloc for its peak memory. The
+query cache is cleared before each run, so the queries themselves are
+measured; pass --warm to measure with the cache.
+
+Results can be saved as a JSON baseline and later runs checked against it:
+an operation regresses when its p50 latency or peak memory grows by more
+than the tolerance. The exit status is 1 if anything regressed.
+
+The generated ledger ends at a fixed time, recorded in the results as
+ledger_now and reused when comparing with a baseline, and the operations
+run as if today were that day. So a baseline is always compared with the
+same rows and the same current month and week, whatever day it is.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--transactions 100000] [--repeat 30] [--save baseline.json]
+    python benchmarks/run_benchmarks.py --baseline baseline.json [--tolerance 0.2]
+    python benchmarks/run_benchmarks.py --now "2025-06-15 12:00:00" [--save baseline.json]
+    python benchmarks/run_benchmarks.py --database copy_of_my.db --operations view_budget view_progress
+"""
+
+# Importing necessary modules
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import database
+import generate_ledger
+import periods
+import query_cache
+from repository import ExpenseRepository, GoalRepository, IncomeRepository
+
+DEFAULT_TOLERANCE = 0.2
+
+# Format of ledger_now on the command line and in baselines
+NOW_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Changes smaller than these are noise and never reported as regressions
+MIN_REGRESSION_MS = 0.5
+MIN_REGRESSION_KIB = 64
+
+
+
+def load_text_ui():
+    """
+    Import "budget_Tracker - Simple text UI.py", whose file name is not a module name.
+    """
+    spec = importlib.util.spec_from_file_location("text_ui", os.path.join(ROOT, "budget_Tracker - Simple text UI.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+
+def operations(ui):
+    """
+    The benchmarked operations as {name: function(connection)}, in menu order.
+    """
+    return {
+        "add_expense": lambda connection: ui.add_expense_category(connection, "Housing", "benchmark", 12.5),
+        "view_expenses": ui.view_expenses,
+        "view_expenses_page": lambda connection: ExpenseRepository(connection).page(),
+        "view_expenses_by_category": ui.view_expenses_by_category,
+        "add_income": lambda connection: ui.add_income_category(connection, "", "benchmark", 100),
+        "view_income": ui.view_income,
+        "view_income_by_category": ui.view_income_by_category,
+        # Menu option 7: set the budget, then report the category against it
+        "set_budget": lambda connection: [ui.set_budget(connection, "Housing", 5000, "monthly"),
+                                          ui.BudgetRepository(connection).report("Housing")],
+        "view_budget": ui.view_budget,
+        "set_goal": lambda connection: GoalRepository(connection).add("benchmark", 1000, 10),
+        "view_progress": ui.view_progress,
+        "search": lambda connection: [ExpenseRepository(connection).search("uber ride"),
+                                      IncomeRepository(connection).search("uber ride")],
+    }
+
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+
+def measure(function, connection, repeat, warm):
+    """
+    Time an operation repeat times, then measure its peak memory in one more run.
+
+    Returns:
+    - result (dict): p50_ms, p99_ms, mean_ms, runs and peak_kib.
+    """
+    timings = []
+    # Printed text is discarded rather than captured, so it does not count towards memory
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for _ in range(repeat):
+            if not warm:
+                query_cache.invalidate(connection)
+            start = time.perf_counter()
+            function(connection)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        if not warm:
+            query_cache.invalidate(connection)
+        tracemalloc.start()
+        try:
+            function(connection)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"p50_ms": percentile(timings, 0.5), "p99_ms": percentile(timings, 0.99),
+            "mean_ms": sum(timings) / len(timings), "runs": repeat, "peak_kib": peak / 1024}
+
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline.
+
+    Returns:
+    - regressions (list): Text describing each operation that got slower or used more memory.
+    """
+    regressions = []
+    for name, result in results["operations"].items():
+        before = baseline["operations"].get(name)
+        if before is None:
+            continue
+        if result["p50_ms"] > before["p50_ms"] * (1 + tolerance) and result["p50_ms"] - before["p50_ms"] > MIN_REGRESSION_MS:
+            regressions.append("{}: p50 {:.2f} ms -> {:.2f} ms".format(name, before["p50_ms"], result["p50_ms"]))
+        if result["peak_kib"] > before["peak_kib"] * (1 + tolerance) and result["peak_kib"] - before["peak_kib"] > MIN_REGRESSION_KIB:
+            regressions.append("{}: peak memory {:.0f} KiB -> {:.0f} KiB".format(name, before["peak_kib"], result["peak_kib"]))
+    return regressions
+
+
+
+@contextlib.contextmanager
+def today_is(day):
+    """
+    Make periods.to_date() default to a day instead of today, for a with block.
+    """
+    to_date = periods.to_date
+    periods.to_date = lambda on=None: to_date(day if on is None else on)
+    try:
+        yield
+    finally:
+        periods.to_date = to_date
+
+
+
+def run(database_name, names, repeat, warm, today=None):
+    """
+    Benchmark the named operations on a database.
+
+    Parameters:
+    - today (date, optional): Run the operations as if it were this day.
+
+    Returns:
+    - results (dict): "meta" describing the run and "operations" with a result per operation.
+    """
+    ui = load_text_ui()
+    available = operations(ui)
+    connection = database.connect(database_name)
+    try:
+        rows = connection.execute("SELECT (SELECT COUNT(*) FROM expenses), (SELECT COUNT(*) FROM income)").fetchone()
+        results = {"meta": {"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                            "sqlite": sqlite3.sqlite_version, "expenses": rows[0], "income": rows[1],
+                            "repeat": repeat, "warm": warm},
+                   "operations": {}}
+        for name in names:
+            with today_is(today) if today is not None else contextlib.nullcontext():
+                results["operations"][name] = measure(available[name], connection, repeat, warm)
+            print("{:<28} {:>10.2f} {:>10.2f} {:>10.2f} {:>12.0f}".format(
+                name, *(results["operations"][name][key] for key in ("p50_ms", "p99_ms", "mean_ms", "peak_kib"))))
+    finally:
+        connection.close()
+    return results
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every text UI operation and check for regressions.")
+    parser.add_argument("--database", help="Benchmark a copy of an existing database instead of generating one")
+    parser.add_argument("--transactions", type=int, default=100000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--goals", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", help='End the generated ledger at this time, "YYYY-MM-DD HH:MM:SS" '
+                                      "(default: the baseline's, or the current time)")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--operations", nargs="+", help="Only these operations")
+    parser.add_argument("--warm", action="store_true", help="Keep the query cache between runs")
+    parser.add_argument("--save", help="Write the results to this JSON baseline file")
+    parser.add_argument("--baseline", help="Compare with this JSON baseline file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed growth of p50 latency and peak memory (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    available = list(operations(load_text_ui()))
+    unknown = set(args.operations or ()) - set(available)
+    if unknown:
+        parser.error("unknown operations: {}; choose from {}".format(", ".join(sorted(unknown)), ", ".join(available)))
+    names = args.operations or available
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    ledger_now = args.now or (baseline or {}).get("meta", {}).get("ledger_now")
+    try:
+        ledger_now = datetime.strptime(ledger_now, NOW_FORMAT) if ledger_now else datetime.now().replace(microsecond=0)
+    except ValueError:
+        parser.error("--now must be YYYY-MM-DD HH:MM:SS")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.db")
+        if args.database:
+            # Work on a copy: the operations add rows
+            source = sqlite3.connect(args.database)
+            target = sqlite3.connect(path)
+            source.backup(target)
+            source.close()
+            target.close()
+        else:
+            connection = database.connect(path)
+            start = time.perf_counter()
+            generate_ledger.generate(connection, args.transactions, args.categories, args.goals, seed=args.seed,
+                                     now=ledger_now)
+            connection.close()
+            print("Generated {:,} transactions in {:.1f}s".format(args.transactions, time.perf_counter() - start))
+
+        print("{:<28} {:>10} {:>10} {:>10} {:>12}".format("operation", "p50 ms", "p99 ms", "mean ms", "peak KiB"))
+        # An existing database is measured as it is, on the real date
+        results = run(path, names, args.repeat, args.warm, None if args.database else ledger_now.date())
+        results["meta"].update(transactions=args.transactions if not args.database else None,
+                               categories=args.categories, goals=args.goals, seed=args.seed,
+                               ledger_now=None if args.database else ledger_now.strftime(NOW_FORMAT))
+
+    if args.save:
+        with open(args.save, "w") as out:
+            json.dump(results, out, indent=2)
+        print("Saved results to", args.save)
+
+    if baseline is not None:
+        for key in ("expenses", "income", "warm", "ledger_now"):
+            if baseline["meta"].get(key) != results["meta"].get(key):
+                print("Warning: baseline {} was {!r}, this run {!r}".format(key, baseline["meta"].get(key),
+                                                                           results["meta"].get(key)))
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            return 1
+        print("No regressions against", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
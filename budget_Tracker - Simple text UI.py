@@ -1,25 +1,56 @@
-# Importing necessary module
+# Importing necessary modules
+import argparse
+import csv
 import sqlite3
+import sys
 
+import categories
+import database
+import goal_analytics
+import instrumentation
+import migrations
+import periods
+import pool
+import reports
+import search
+from money import Money
+from repository import BudgetRepository, ExpenseRepository, GoalRepository, IncomeRepository
 
 
-def connect_to_database(database_name):
+# Line format of batch entry
+BATCH_FORMAT = "category,item_name,amount[,YYYY-MM-DD]"
+
+# The last menu entry; scripts such as benchmarks/bench_startup.py send it to exit
+QUIT_CHOICE = "14"
+
+
+
+def connect_to_database(database_name, query_stats=None):
     """
     Connect to SQLite database.
 
+    Connections come from a pool.ConnectionPool and use the profile from
+    database.connect (WAL journaling by default), so the Tkinter app can use
+    the database at the same time.
+
     Parameters:
     - database_name (str): The name of the SQLite database.
+    - query_stats (instrumentation.QueryStats, optional): Record every statement run on the connection.
 
     Returns:
-    - connection (sqlite3.Connection): Connection object if successful, None otherwise.
+    - connection_pool (pool.ConnectionPool): Pool holding one open connection if successful, None otherwise.
 
     Raises:
     - sqlite3.Error: If there is an error connecting to the database.
     """
     try:
-        connection = sqlite3.connect(database_name)
-        return connection
-    except sqlite3.Error as e:
+        connect = query_stats.connect if query_stats is not None else database.connect
+        connection_pool = pool.ConnectionPool(database_name, max_size=1, connect=connect)
+        # Open the connection now so a bad database is reported straight away
+        with connection_pool.connection():
+            pass
+        return connection_pool
+    except (sqlite3.Error, ValueError) as e:
         print("Error connecting to database:", e)
         return None
 
@@ -27,7 +58,7 @@ def connect_to_database(database_name):
 
 def create_tables(connection):
     """
-    Create necessary tables if they don't exist in the database.
+    Create necessary tables if they don't exist in the database and apply any pending schema migrations.
 
     Parameters:
     - connection (sqlite3.Connection): Connection object to the SQLite database.
@@ -39,36 +70,13 @@ def create_tables(connection):
     - sqlite3.Error: If there is an error creating tables in the database.
     """
     try:
-        cursor = connection.cursor()
-        # Create table for expenses
-        cursor.execute('''CREATE TABLE IF NOT EXISTS expenses (
-                        id INTEGER PRIMARY KEY,
-                        category TEXT,
-                        item_name TEXT,
-                        amount REAL)''')
-        # Create table for income
-        cursor.execute('''CREATE TABLE IF NOT EXISTS income (
-                        id INTEGER PRIMARY KEY,
-                        category TEXT,
-                        item_name TEXT,
-                        amount REAL)''')
-        # Create table for budgets with a unique constraint
-        cursor.execute('''CREATE TABLE IF NOT EXISTS budgets (
-                        category TEXT PRIMARY KEY,
-                        budget REAL)''')  # Adding PRIMARY KEY constraint
-        # Create table for financial goals
-        cursor.execute('''CREATE TABLE IF NOT EXISTS financial_goals (
-                        id INTEGER PRIMARY KEY,
-                        goal_name TEXT,
-                        target_amount REAL,
-                        current_amount REAL)''')
-        connection.commit()
+        migrations.migrate(connection)
     except sqlite3.Error as e:
         print("Error creating tables:", e)
 
 
 
-def add_expense_category(connection, category, item_name, amount):
+def add_expense_category(connection, category, item_name, amount, occurred_at=None):
     """
     Add new expense category to the database.
 
@@ -77,6 +85,7 @@ def add_expense_category(connection, category, item_name, amount):
     - category (str): Expense category to add.
     - item_name (str): Name of the expense item.
     - amount (float): Expense amount.
+    - occurred_at (str, optional): Date as "YYYY-MM-DD HH:MM:SS". Defaults to now.
 
     Returns:
     - None
@@ -85,9 +94,7 @@ def add_expense_category(connection, category, item_name, amount):
     - sqlite3.Error: If there is an error adding the expense category to the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("INSERT INTO expenses (category, item_name, amount) VALUES (?, ?, ?)", (category, item_name, amount))
-        connection.commit()
+        ExpenseRepository(connection).add(category, item_name, amount, occurred_at)
         print("Expense item '{}' added successfully to category '{}'.".format(item_name, category))
     except sqlite3.Error as e:
         print("Error adding expense item:", e)
@@ -108,13 +115,11 @@ def view_expenses(connection):
     - sqlite3.Error: If there is an error viewing expenses in the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM expenses")
-        expense_data = cursor.fetchall()
-        if expense_data:
-            for row in expense_data:
-                print("Category: {}, Item Name: {}, Amount: {}".format(row[1], row[2], row[3]))
-        else:
+        found = False
+        for row in ExpenseRepository(connection).all():
+            print("Category: {}, Item Name: {}, Amount: {}".format(row.category, row.item_name, row.amount))
+            found = True
+        if not found:
             print("No expense entries found.")
     except sqlite3.Error as e:
         print("Error viewing expenses:", e)
@@ -135,22 +140,17 @@ def view_expenses_by_category(connection):
     - sqlite3.Error: If there is an error viewing expenses by category in the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT DISTINCT category FROM expenses")
-        categories = cursor.fetchall()
-        for category in categories:
-            print("Category:", category[0])
-            cursor.execute("SELECT * FROM expenses WHERE category=?", (category[0],))
-            expense_data = cursor.fetchall()
+        for category, expense_data in ExpenseRepository(connection).by_category():
+            print("Category:", category)
             for row in expense_data:
-                print("    Item Name: {}, Amount: {}".format(row[2], row[3]))
+                print("    Item Name: {}, Amount: {}".format(row.item_name, row.amount))
             print()  # Empty line
     except sqlite3.Error as e:
         print("Error viewing expenses by category:", e)
 
 
 
-def add_income_category(connection, category, item_name, amount):
+def add_income_category(connection, category, item_name, amount, occurred_at=None):
     """
     Add new income category to the database.
 
@@ -159,6 +159,7 @@ def add_income_category(connection, category, item_name, amount):
     - category (str): Income category to add.
     - item_name (str): Name of the income item.
     - amount (float): Income amount.
+    - occurred_at (str, optional): Date as "YYYY-MM-DD HH:MM:SS". Defaults to now.
 
     Returns:
     - None
@@ -167,9 +168,7 @@ def add_income_category(connection, category, item_name, amount):
     - sqlite3.Error: If there is an error adding the income category to the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("INSERT INTO income (category, item_name, amount) VALUES (?, ?, ?)", (category, item_name, amount))
-        connection.commit()
+        IncomeRepository(connection).add(category, item_name, amount, occurred_at)
         print("Income item '{}' added successfully to category '{}'.".format(item_name, category))
     except sqlite3.Error as e:
         print("Error adding income item:", e)
@@ -190,13 +189,11 @@ def view_income(connection):
     - sqlite3.Error: If there is an error viewing income in the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM income")
-        income_data = cursor.fetchall()
-        if income_data:
-            for row in income_data:
-                print("Category: {}, Item Name: {}, Amount: {}".format(row[1], row[2], row[3]))
-        else:
+        found = False
+        for row in IncomeRepository(connection).all():
+            print("Category: {}, Item Name: {}, Amount: {}".format(row.category, row.item_name, row.amount))
+            found = True
+        if not found:
             print("No income entries found.")
     except sqlite3.Error as e:
         print("Error viewing income:", e)
@@ -217,22 +214,17 @@ def view_income_by_category(connection):
     - sqlite3.Error: If there is an error viewing income by category in the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT DISTINCT category FROM income")
-        categories = cursor.fetchall()
-        for category in categories:
-            print("Category:", category[0])
-            cursor.execute("SELECT * FROM income WHERE category=?", (category[0],))
-            income_data = cursor.fetchall()
+        for category, income_data in IncomeRepository(connection).by_category():
+            print("Category:", category)
             for row in income_data:
-                print("    Item Name: {}, Amount: {}".format(row[2], row[3]))
+                print("    Item Name: {}, Amount: {}".format(row.item_name, row.amount))
             print()  # Empty line
     except sqlite3.Error as e:
         print("Error viewing income by category:", e)
 
 
 
-def set_budget(connection, category, budget):
+def set_budget(connection, category, budget, period=periods.DEFAULT_PERIOD):
     """
     Set budget for a category.
 
@@ -240,6 +232,7 @@ def set_budget(connection, category, budget):
     - connection (sqlite3.Connection): Connection object to the SQLite database.
     - category (str): Category for which budget is set.
     - budget (float): Budget amount to set.
+    - period (str): "monthly" or "weekly".
 
     Returns:
     - None
@@ -248,10 +241,8 @@ def set_budget(connection, category, budget):
     - sqlite3.Error: If there is an error setting the budget in the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("INSERT OR REPLACE INTO budgets (category, budget) VALUES (?, ?)", (category, budget))
-        connection.commit()
-        print("Budget for category '{}' set successfully.".format(category))
+        BudgetRepository(connection).set(category, budget, period)
+        print("{} budget for category '{}' set successfully.".format(period.capitalize(), category))
     except sqlite3.Error as e:
         print("Error setting budget:", e)
 
@@ -259,7 +250,7 @@ def set_budget(connection, category, budget):
 
 def view_budget(connection):
     """
-    View budget for each category and compare with actual expenses.
+    View budget for each category and compare with the expenses of the current month or week.
 
     Parameters:
     - connection (sqlite3.Connection): Connection object to the SQLite database.
@@ -271,15 +262,10 @@ def view_budget(connection):
     - sqlite3.Error: If there is an error viewing the budget in the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT category, budget FROM budgets")
-        budget_data = cursor.fetchall()
+        budget_data = BudgetRepository(connection).report()
         if budget_data:
-            for category, budget in budget_data:
-                cursor.execute("SELECT SUM(amount) FROM expenses WHERE category = ?", (category,))
-                total_expense = cursor.fetchone()[0] or 0
-                difference = budget - total_expense
-                print(f"Category: {category}, Budget: {budget:.2f}, Actual Expense: {total_expense:.2f}, Difference: {difference:.2f}")
+            for line in budget_data:
+                print(reports.format_budget_line(line))
         else:
             print("No budget categories found.")
     except sqlite3.Error as e:
@@ -301,12 +287,10 @@ def set_financial_goals(connection):
     - sqlite3.Error: If there is an error setting financial goals in the database.
     """
     try:
-        cursor = connection.cursor()
         goal_name = input("Enter the name of the financial goal: ")
         target_amount = float(input("Enter the target amount: "))
         current_amount = float(input("Enter the current amount: "))
-        cursor.execute("INSERT INTO financial_goals (goal_name, target_amount, current_amount) VALUES (?, ?, ?)", (goal_name, target_amount, current_amount))
-        connection.commit()
+        GoalRepository(connection).add(goal_name, target_amount, current_amount)
         print("Financial goal '{}' set successfully.".format(goal_name))
     except sqlite3.Error as e:
         print("Error setting financial goal:", e)
@@ -327,16 +311,17 @@ def view_and_edit_goals(connection):
     - sqlite3.Error: If there is an error viewing financial goals in the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM financial_goals")
-        goals_data = cursor.fetchall()
+        goals = GoalRepository(connection)
+        goals_data = goals.all()
         if goals_data:
             for goal in goals_data:
-                print("Goal Name: {}, Target Amount: {}, Current Amount: {}".format(goal[1], goal[2], goal[3]))
+                print("Goal Name: {}, Target Amount: {}, Current Amount: {}".format(goal.goal_name, goal.target_amount, goal.current_amount))
             goal_id = int(input("Enter the ID of the goal you want to edit: "))
             new_target_amount = float(input("Enter the new target amount: "))
-            cursor.execute("UPDATE financial_goals SET target_amount = ? WHERE id = ?", (new_target_amount, goal_id))
-            connection.commit()
+            goals.update_target(goal_id, new_target_amount)
+            saved = input("Enter an amount saved towards this goal (leave blank for none): ").strip()
+            if saved:
+                goals.contribute(goal_id, float(saved))
             print("Financial goal updated successfully.")
         else:
             print("No financial goals found.")
@@ -359,13 +344,13 @@ def view_progress(connection):
     - sqlite3.Error: If there is an error viewing progress towards financial goals in the database.
     """
     try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM financial_goals")
-        goals_data = cursor.fetchall()
-        if goals_data:
-            for goal in goals_data:
-                progress = (goal[3] / goal[2]) * 100
-                print("Goal Name: {}, Target Amount: {}, Current Amount: {}, Progress: {:.2f}%".format(goal[1], goal[2], goal[3], progress))
+        progress = GoalRepository(connection).progress()
+        if progress:
+            for line in progress:
+                print(goal_analytics.format_goal_progress(line))
+            _current, _target, percent = goal_analytics.overall_progress(progress)
+            if percent is not None:
+                print("Total progress towards financial goals: {:.2f}%".format(percent))
         else:
             print("No financial goals found.")
     except sqlite3.Error as e:
@@ -373,6 +358,68 @@ def view_progress(connection):
 
 
 
+def ask_date():
+    """
+    Ask for the date of a transaction until a valid one is entered.
+
+    Returns:
+    - occurred_at (str): Date as "YYYY-MM-DD 00:00:00", or None for today.
+    """
+    while True:
+        try:
+            return periods.parse_day(input("Enter date (YYYY-MM-DD), or leave blank for today: "))
+        except ValueError:
+            print("Please enter the date as YYYY-MM-DD.")
+
+
+
+def ask_period():
+    """
+    Ask for a budget period until a valid one is entered.
+
+    Returns:
+    - period (str): "monthly" or "weekly".
+    """
+    while True:
+        period = input("Enter budget period (monthly/weekly) [monthly]: ").strip().lower() or periods.DEFAULT_PERIOD
+        if period in periods.PERIODS:
+            return period
+        print("Please enter monthly or weekly.")
+
+
+
+def search_transactions(connection):
+    """
+    Search expenses and income by item name or category.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - None
+
+    Raises:
+    - sqlite3.Error: If there is an error searching the database.
+    """
+    text = input("Enter words to search for: ")
+    try:
+        found = False
+        for title, repository in (("Expenses", ExpenseRepository(connection)), ("Income", IncomeRepository(connection))):
+            hits = repository.search(text)
+            if hits:
+                print(title + ":")
+                for hit in hits:
+                    print("    " + search.format_hit(hit))
+                found = True
+        if not found:
+            print("No matching entries found.")
+    except ValueError as e:
+        print(e)
+    except sqlite3.Error as e:
+        print("Error searching:", e)
+
+
+
 def display_categories(categories):
     """
     Display pre-added categories with numbers.
@@ -390,18 +437,158 @@ def display_categories(categories):
 
 
 
-def add_new_category():
+def load_categories(connection):
     """
-    Add a new category.
+    Read the stored categories: the pre-added ones and those added since.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - categories (list): Category names. The pre-added ones if they cannot be read.
+    """
+    try:
+        return categories.names(connection)
+    except sqlite3.Error as e:
+        print("Error loading categories:", e)
+        return list(categories.DEFAULT_CATEGORIES)
+
+
+
+def add_new_category(connection):
+    """
+    Add a new category and store it, so it is offered again next time.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
 
     Returns:
     - new_category (str): The newly added category.
     """
     new_category = input("Enter the new category: ")
+    if new_category:
+        try:
+            categories.add(connection, new_category)
+        except sqlite3.Error as e:
+            print("Error saving category:", e)
     return new_category
 
 
 
+def parse_batch(lines, categories):
+    """
+    Parse and validate batch entry lines of the form category,item_name,amount[,YYYY-MM-DD].
+
+    Fields may be quoted as in CSV. Blank lines are skipped, and a category
+    matching an existing one apart from case is written as the existing one.
+
+    Parameters:
+    - lines (iterable): The lines.
+    - categories (list): Existing categories.
+
+    Returns:
+    - rows (list): (category, item_name, amount, occurred_at) tuples of the valid lines, amounts as Money.
+    - errors (list): One message per invalid line, with its line number.
+    """
+    known = {category.lower(): category for category in categories}
+    rows, errors = [], []
+    for line_number, fields in enumerate(csv.reader(lines), start=1):
+        fields = [field.strip() for field in fields]
+        if not any(fields):
+            continue
+        if len(fields) not in (3, 4):
+            errors.append("Line {}: expected {}".format(line_number, BATCH_FORMAT))
+            continue
+        category, item_name, amount = fields[:3]
+        if not category or not item_name:
+            errors.append("Line {}: the category and item name cannot be empty".format(line_number))
+            continue
+        try:
+            amount = Money.parse(amount)
+        except ValueError as e:
+            errors.append("Line {}: {}".format(line_number, e))
+            continue
+        try:
+            occurred_at = periods.parse_day(fields[3]) if len(fields) == 4 else None
+        except ValueError:
+            errors.append("Line {}: '{}' is not a date in the form YYYY-MM-DD".format(line_number, fields[3]))
+            continue
+        rows.append((known.get(category.lower(), category), item_name, amount, occurred_at))
+    return rows, errors
+
+
+
+def read_batch_lines():
+    """
+    Read lines typed or pasted at the prompt until an empty line or the end of input.
+
+    Returns:
+    - lines (list): The lines read.
+    """
+    print("Enter one expense per line as {}.".format(BATCH_FORMAT))
+    print("Finish with an empty line.")
+    lines = []
+    while True:
+        try:
+            line = input()
+        except EOFError:
+            break
+        if not line.strip():
+            break
+        lines.append(line)
+    return lines
+
+
+
+def add_expenses_batch(connection, lines, categories):
+    """
+    Add many expenses at once, all in one transaction.
+
+    Every line is checked before anything is written. If any line is invalid,
+    or writing fails, no expense is added.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - lines (iterable): Lines of the form category,item_name,amount[,YYYY-MM-DD].
+    - categories (list): Existing categories. New categories in the lines are appended to it.
+
+    Returns:
+    - added (bool): True if the expenses were added.
+
+    Raises:
+    - sqlite3.Error: If there is an error adding the expenses to the database.
+    """
+    rows, errors = parse_batch(lines, categories)
+    if errors:
+        for error in errors:
+            print(error)
+        print("{} invalid line(s); no expenses were added.".format(len(errors)))
+        return False
+    if not rows:
+        print("No expenses entered.")
+        return False
+
+    try:
+        ExpenseRepository(connection).add_many(rows)
+    except sqlite3.Error as e:
+        print("Error adding expenses, none were added:", e)
+        return False
+
+    # Summary per category, in the order the categories were first entered
+    summary = {}
+    for category, _item_name, amount, _occurred_at in rows:
+        count, total = summary.get(category, (0, Money(0)))
+        summary[category] = (count + 1, total + amount)
+    for category in summary:
+        if category not in categories:
+            categories.append(category)
+    print("Added {} expenses totalling {}:".format(len(rows), sum((row[2] for row in rows), Money(0))))
+    for category, (count, total) in summary.items():
+        print("    {}: {} item(s), {}".format(category, count, total))
+    return True
+
+
+
 def display_menu():
     """
     Display the menu.
@@ -422,37 +609,76 @@ def display_menu():
     print("9. Set financial goals")
     print("10. View and edit financial goals")
     print("11. View progress towards financial goals")
-    print("12. Quit")
+    print("12. Search expenses and income")
+    print("13. Add many expenses at once")
+    print("{}. Quit".format(QUIT_CHOICE))
     print()  # Empty line
 
 
 
-def main():
+def main(argv=None):
     """
     Main function to run the expense and budget tracker app.
-    """
+
+    Parameters:
+    - argv (list, optional): Command line arguments. Defaults to sys.argv.
+
+    Returns:
+    - status (int or None): 1 if the database cannot be opened. With --batch, 0 if the
+      expenses were added and 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Expense and budget tracker.")
+    parser.add_argument("--stats", action="store_true",
+                        help="Record the SQL statements run and print their statistics on exit")
+    parser.add_argument("--slow-ms", type=float,
+                        help="With --stats, log statements taking this many milliseconds or longer (default {})"
+                        .format(instrumentation.DEFAULT_SLOW_MS))
+    parser.add_argument("--slow-log", help="With --stats, append slow statements to this file")
+    parser.add_argument("--explain", action="store_true", help="With --stats, capture the query plan of slow statements")
+    parser.add_argument("--batch", action="store_true",
+                        help="Add expenses read from stdin, one per line as {}, in one transaction, "
+                             "then exit".format(BATCH_FORMAT))
+    args = parser.parse_args(argv)
+
+    query_stats = None
+    if args.stats:
+        query_stats = instrumentation.QueryStats(args.slow_ms, args.slow_log, args.explain)
+
     # Connect to database
     database_name = "expense_tracker.db"
-    connection = connect_to_database(database_name)
-    if connection is None:
-        return
+    connection_pool = connect_to_database(database_name, query_stats)
+    if connection_pool is None:
+        return 1
+
+    # The pool closes the connection when the menu exits, also on errors
+    try:
+        with connection_pool, connection_pool.connection() as connection:
+            if args.batch:
+                create_tables(connection)
+                return 0 if add_expenses_batch(connection, sys.stdin, load_categories(connection)) else 1
+            run_menu(connection)
+    finally:
+        if query_stats is not None:
+            print()
+            print(instrumentation.format_report(query_stats))
+
+
+
+def run_menu(connection):
+    """
+    Run the menu loop until the user quits.
 
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - None
+    """
     # Create tables if they don't exist
     create_tables(connection)
 
-    # Pre-added categories
-    categories = [
-        "Housing",
-        "Transportation",
-        "Food and Dining",
-        "Utilities",
-        "Personal Care",
-        "Health and Fitness",
-        "Entertainment",
-        "Education",
-        "Debt Payments",
-        "Savings and Investments"
-    ]
+    # Stored categories, and those added while the menu runs
+    categories = load_categories(connection)
 
     # Main menu
     while True:
@@ -465,13 +691,14 @@ def main():
             display_categories(categories)
             category_choice = int(input("Enter expense category number or add a new one: "))
             if category_choice == len(categories) + 1:
-                category = add_new_category()
+                category = add_new_category(connection)
                 categories.append(category)
             else:
                 category = categories[category_choice - 1]
             item_name = input("Enter expense item name: ")
             amount = float(input("Enter expense amount: "))
-            add_expense_category(connection, category, item_name, amount)
+            occurred_at = ask_date()
+            add_expense_category(connection, category, item_name, amount, occurred_at)
             print()  # Empty line
 
 
@@ -491,7 +718,8 @@ def main():
             # Add income
             item_name = input("Enter income item name: ")
             amount = float(input("Enter income amount: "))
-            add_income_category(connection, "", item_name, amount)
+            occurred_at = ask_date()
+            add_income_category(connection, "", item_name, amount, occurred_at)
             print()  # Empty line
 
 
@@ -512,25 +740,18 @@ def main():
             display_categories(categories)
             category_choice = int(input("Enter category number to set budget: "))
             if category_choice == len(categories) + 1:
-                category = add_new_category()
+                category = add_new_category(connection)
                 categories.append(category)
             else:
                 category = categories[category_choice - 1]
+            period = ask_period()
             budget = float(input("Enter Budget Amount: "))
-            set_budget(connection, category, budget)
+            set_budget(connection, category, budget, period)
             
-            # Calculate total expenses for the chosen category
+            # Compare the budget with this period's expenses for the chosen category
             try:
-                cursor = connection.cursor()
-                cursor.execute("SELECT SUM(amount) FROM expenses WHERE category = ?", (category,))
-                total_expense = cursor.fetchone()[0] or 0
-                difference = budget - total_expense
-                if difference > 0:
-                    print(f"Category '{category}' is under budget by ${difference:.2f}.")
-                elif difference < 0:
-                    print(f"Category '{category}' is over budget by ${abs(difference):.2f}.")
-                else:
-                    print(f"Category '{category}' is exactly on budget.")
+                for line in BudgetRepository(connection).report(category):
+                    print(reports.budget_status(line))
             except sqlite3.Error as e:
                 print("Error calculating budget difference:", e)
             print()  # Empty line
@@ -561,18 +782,26 @@ def main():
 
 
         elif choice == "12":
+            # Search by item name or category
+            search_transactions(connection)
+            print()  # Empty line
+
+
+        elif choice == "13":
+            # Batch entry: many expenses in one transaction
+            add_expenses_batch(connection, read_batch_lines(), categories)
+            print()  # Empty line
+
+
+        elif choice == QUIT_CHOICE:
             # Exit the program
             print("Exiting...")
             break
 
         else:
-            print("Invalid choice. Please enter a number between 1 and 12.")
+            print("Invalid choice. Please enter a number between 1 and {}.".format(QUIT_CHOICE))
             print()  # Empty line
 
 
-    # Close the database connection when done
-    connection.close()
-
-
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
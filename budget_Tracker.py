@@ -1,8 +1,41 @@
-import tkinter as tk
-from tkinter import messagebox, simpledialog
 import sqlite3
 
+import categories
+from db_worker import DatabaseWorker
+import goal_analytics
+import instrumentation
+import migrations
+import periods
+import query_cache
+import reports
+import search
+from repository import BudgetRepository, ExpenseRepository, GoalRepository, IncomeRepository
+
+# tkinter is imported by load_tkinter() when the window is created, so
+# importing this module does not load Tk.
+tk = messagebox = simpledialog = ttk = None
+
+
+
+def load_tkinter():
+    """
+    Import tkinter and its dialogs into this module.
+
+    Returns:
+    - None
+    """
+    global tk, messagebox, simpledialog, ttk
+    if tk is None:
+        import tkinter
+        from tkinter import messagebox, simpledialog, ttk
+        tk = tkinter
+
+
+
 class BudgetTrackerApp:
+    # Milliseconds between checks for finished database jobs
+    POLL_INTERVAL = 50
+
     def __init__(self, master):
         """
         Initialize the BudgetTrackerApp.
@@ -10,33 +43,23 @@ class BudgetTrackerApp:
         Parameters:
         - master (tk.Tk): The master tkinter window.
         """
+        load_tkinter()
         self.master = master
         self.master.title("Expense and Budget Tracker")
 
-        # Connect to database
+        # Connect to database. Queries run on a background worker thread and
+        # are recorded for the diagnostics view.
         self.database_name = "expense_tracker.db"
-        self.connection = self.connect_to_database(self.database_name)
-        if self.connection is None:
+        self.query_stats = instrumentation.QueryStats(explain=True)
+        self.worker = self.connect_to_database(self.database_name)
+        if self.worker is None:
             messagebox.showerror("Error", "Failed to connect to the database. Exiting...")
             self.master.destroy()
             return
 
-        # Create tables if they don't exist
-        self.create_tables(self.connection)
-
-        # Pre-added categories
-        self.categories = [
-            "Housing",
-            "Transportation",
-            "Food and Dining",
-            "Utilities",
-            "Personal Care",
-            "Health and Fitness",
-            "Entertainment",
-            "Education",
-            "Debt Payments",
-            "Savings and Investments"
-        ]
+        # Pre-added categories, replaced with those stored in the database
+        # (including ones added earlier) once it has been opened
+        self.categories = list(categories.DEFAULT_CATEGORIES)
 
         # Create buttons for each menu option
         self.btn_add_expense = tk.Button(master, text="1. Add expense", command=self.add_expense)
@@ -72,67 +95,154 @@ class BudgetTrackerApp:
         self.btn_view_progress = tk.Button(master, text="11. View progress towards financial goals", command=self.view_progress)
         self.btn_view_progress.pack()
 
-        self.btn_quit = tk.Button(master, text="12. Quit", command=self.quit_app)
+        self.btn_search = tk.Button(master, text="12. Search expenses and income", command=self.search_transactions)
+        self.btn_search.pack()
+
+        self.btn_diagnostics = tk.Button(master, text="13. Diagnostics", command=self.view_diagnostics)
+        self.btn_diagnostics.pack()
+
+        self.btn_quit = tk.Button(master, text="14. Quit", command=self.quit_app)
         self.btn_quit.pack()
 
+        # Busy indicator and cancel button for running database jobs
+        self.status_label = tk.Label(master, text="")
+        self.status_label.pack()
+        self.btn_cancel = tk.Button(master, text="Cancel", command=self.cancel_queries, state="disabled")
+        self.btn_cancel.pack()
+
+        self.master.protocol("WM_DELETE_WINDOW", self.quit_app)
+
+        # Create tables if they don't exist
+        self.create_tables()
+        self.load_categories()
+        self.poll_worker()
+
 
     def connect_to_database(self, database_name):
         """
-        Connect to SQLite database.
+        Connect to SQLite database on a background worker thread.
+
+        The connection uses the profile from database.connect (WAL journaling
+        by default), so the text UI can use the database at the same time.
+        Its statements are recorded in self.query_stats.
 
         Parameters:
         - database_name (str): The name of the SQLite database.
 
         Returns:
-        - connection (sqlite3.Connection): Connection object if successful, None otherwise.
+        - worker (DatabaseWorker): Worker owning the connection if successful, None otherwise.
 
         Raises:
         - sqlite3.Error: If there is an error connecting to the database.
         """
         try:
-            connection = sqlite3.connect(database_name)
-            return connection
-        except sqlite3.Error as e:
+            return DatabaseWorker(database_name, connect=self.query_stats.connect)
+        except (sqlite3.Error, ValueError) as e:
             messagebox.showerror("Database Error", f"Error connecting to database: {e}")
             return None
 
 
-    def create_tables(self, connection):
+    def create_tables(self):
         """
-        Create tables in the database if they don't exist.
+        Create tables in the database if they don't exist and apply any pending schema migrations.
+
+        The migrations are the first job queued on the worker, so they finish
+        before any other query runs.
 
         Parameters:
-        - connection (sqlite3.Connection): Connection object to the SQLite database.
+        - None
 
         Returns:
         - None
+        """
+        self.run_query(migrations.migrate, error_message="Error creating tables")
 
-        Raises:
-        - sqlite3.Error: If there is an error creating tables in the database.
+
+    def load_categories(self):
+        """
+        Read the stored categories into self.categories.
+
+        Parameters:
+        - None
+
+        Returns:
+        - None
+        """
+        def show(names):
+            self.categories = names
+
+        self.run_query(categories.names, show, "Error loading categories")
+
+
+    def run_query(self, function, on_success=None, error_message="Database error"):
+        """
+        Run a database job on the worker thread.
+
+        Parameters:
+        - function (callable): Called with the sqlite3.Connection in the worker thread.
+        - on_success (callable, optional): Called with the function's result in the Tk thread.
+        - error_message (str): Prefix of the error dialog shown if the job fails.
+
+        Returns:
+        - job (Job): Handle that can be used to cancel the job.
+        """
+        def on_error(e):
+            messagebox.showerror("Database Error", f"{error_message}: {e}")
+
+        job = self.worker.submit(function, on_success, on_error)
+        self.update_busy_indicator()
+        return job
+
+
+    def poll_worker(self):
+        """
+        Run the callbacks of finished database jobs, then check again shortly.
+
+        Parameters:
+        - None
+
+        Returns:
+        - None
         """
         try:
-            cursor = connection.cursor()
-            cursor.execute('''CREATE TABLE IF NOT EXISTS expenses (
-                            id INTEGER PRIMARY KEY,
-                            category TEXT,
-                            item_name TEXT,
-                            amount REAL)''')
-            cursor.execute('''CREATE TABLE IF NOT EXISTS income (
-                            id INTEGER PRIMARY KEY,
-                            category TEXT,
-                            item_name TEXT,
-                            amount REAL)''')
-            cursor.execute('''CREATE TABLE IF NOT EXISTS budgets (
-                            category TEXT PRIMARY KEY,
-                            budget REAL)''')
-            cursor.execute('''CREATE TABLE IF NOT EXISTS financial_goals (
-                            id INTEGER PRIMARY KEY,
-                            goal_name TEXT,
-                            target_amount REAL,
-                            current_amount REAL)''')
-            connection.commit()
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error creating tables: {e}")
+            self.worker.deliver_results()
+        finally:
+            self.update_busy_indicator()
+            self.master.after(self.POLL_INTERVAL, self.poll_worker)
+
+
+    def update_busy_indicator(self):
+        """
+        Show whether database jobs are running and enable the cancel button.
+
+        Parameters:
+        - None
+
+        Returns:
+        - None
+        """
+        if self.worker.busy():
+            self.status_label.config(text="Working...")
+            self.btn_cancel.config(state="normal")
+            self.master.config(cursor="watch")
+        else:
+            self.status_label.config(text="")
+            self.btn_cancel.config(state="disabled")
+            self.master.config(cursor="")
+
+
+    def cancel_queries(self):
+        """
+        Cancel all queued and running database jobs.
+
+        Parameters:
+        - None
+
+        Returns:
+        - None
+        """
+        self.worker.cancel_all()
+        self.update_busy_indicator()
 
 
     def add_expense(self):
@@ -157,19 +267,24 @@ class BudgetTrackerApp:
         amount = simpledialog.askfloat("Expense", "Enter expense amount:")
         if amount is None:
             return
+        occurred_at = self.ask_date("Expense")
+        if occurred_at is None:
+            return
 
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("INSERT INTO expenses (category, item_name, amount) VALUES (?, ?, ?)", (category, item_name, amount))
-            self.connection.commit()
+        def insert(connection):
+            ExpenseRepository(connection).add(category, item_name, amount, occurred_at or None)
+
+        def done(_result):
             messagebox.showinfo("Expense Added", f"Expense item '{item_name}' added successfully to category '{category}'.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error adding expense item: {e}")
+
+        self.run_query(insert, done, "Error adding expense item")
 
 
     def view_expenses(self):
         """
-        View expenses from the expenses table in the database.
+        View expenses from the expenses table in a scrollable list.
+
+        Rows are loaded a page at a time as the list is scrolled.
 
         Parameters:
         - None
@@ -180,17 +295,13 @@ class BudgetTrackerApp:
         Raises:
         - sqlite3.Error: If there is an error viewing expenses in the database.
         """
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM expenses")
-            expense_data = cursor.fetchall()
-            if expense_data:
-                expenses_str = "\n".join([f"Category: {row[1]}, Item Name: {row[2]}, Amount: {row[3]}" for row in expense_data])
-                messagebox.showinfo("Expenses", expenses_str)
+        def show(first_page):
+            if first_page:
+                TransactionListView(self.master, self.run_query, ExpenseRepository, "Expenses", first_page)
             else:
                 messagebox.showinfo("Expenses", "No expense entries found.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error viewing expenses: {e}")
+
+        self.run_query(lambda connection: ExpenseRepository(connection).page(), show, "Error viewing expenses")
 
 
     def view_expenses_by_category(self):
@@ -206,21 +317,13 @@ class BudgetTrackerApp:
         Raises:
         - sqlite3.Error: If there is an error viewing expenses by category in the database.
         """
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT DISTINCT category FROM expenses")
-            categories = cursor.fetchall()
-            for category in categories:
-                category_name = category[0]
-                cursor.execute("SELECT * FROM expenses WHERE category=?", (category_name,))
-                expense_data = cursor.fetchall()
-                if expense_data:
-                    expenses_str = "\n".join([f"    Item Name: {row[2]}, Amount: {row[3]}" for row in expense_data])
-                    messagebox.showinfo(f"Expenses - {category_name}", expenses_str)
-                else:
-                    messagebox.showinfo(f"Expenses - {category_name}", "No expense entries found.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error viewing expenses by category: {e}")
+        def show(groups):
+            for category_name, expense_data in groups:
+                expenses_str = "\n".join([f"    Item Name: {row.item_name}, Amount: {row.amount}" for row in expense_data])
+                messagebox.showinfo(f"Expenses - {category_name}", expenses_str)
+
+        self.run_query(lambda connection: list(ExpenseRepository(connection).by_category()), show,
+                       "Error viewing expenses by category")
 
 
     def add_income(self):
@@ -242,19 +345,24 @@ class BudgetTrackerApp:
         amount = simpledialog.askfloat("Income", "Enter income amount:")
         if amount is None:
             return
+        occurred_at = self.ask_date("Income")
+        if occurred_at is None:
+            return
 
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("INSERT INTO income (category, item_name, amount) VALUES (?, ?, ?)", ("", item_name, amount))
-            self.connection.commit()
+        def insert(connection):
+            IncomeRepository(connection).add("", item_name, amount, occurred_at or None)
+
+        def done(_result):
             messagebox.showinfo("Income Added", f"Income item '{item_name}' added successfully.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error adding income item: {e}")
+
+        self.run_query(insert, done, "Error adding income item")
 
 
     def view_income(self):
         """
-        View income from the income table in the database.
+        View income from the income table in a scrollable list.
+
+        Rows are loaded a page at a time as the list is scrolled.
 
         Parameters:
         - None
@@ -265,17 +373,13 @@ class BudgetTrackerApp:
         Raises:
         - sqlite3.Error: If there is an error viewing income in the database.
         """
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM income")
-            income_data = cursor.fetchall()
-            if income_data:
-                income_str = "\n".join([f"Category: {row[1]}, Item Name: {row[2]}, Amount: {row[3]}" for row in income_data])
-                messagebox.showinfo("Income", income_str)
+        def show(first_page):
+            if first_page:
+                TransactionListView(self.master, self.run_query, IncomeRepository, "Income", first_page)
             else:
                 messagebox.showinfo("Income", "No income entries found.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error viewing income: {e}")
+
+        self.run_query(lambda connection: IncomeRepository(connection).page(), show, "Error viewing income")
 
 
     def view_income_by_category(self):
@@ -291,21 +395,13 @@ class BudgetTrackerApp:
         Raises:
         - sqlite3.Error: If there is an error viewing income by category in the database.
         """
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT DISTINCT category FROM income")
-            categories = cursor.fetchall()
-            for category in categories:
-                category_name = category[0]
-                cursor.execute("SELECT * FROM income WHERE category=?", (category_name,))
-                income_data = cursor.fetchall()
-                if income_data:
-                    income_str = "\n".join([f"    Item Name: {row[2]}, Amount: {row[3]}" for row in income_data])
-                    messagebox.showinfo(f"Income - {category_name}", income_str)
-                else:
-                    messagebox.showinfo(f"Income - {category_name}", "No income entries found.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error viewing income by category: {e}")
+        def show(groups):
+            for category_name, income_data in groups:
+                income_str = "\n".join([f"    Item Name: {row.item_name}, Amount: {row.amount}" for row in income_data])
+                messagebox.showinfo(f"Income - {category_name}", income_str)
+
+        self.run_query(lambda connection: list(IncomeRepository(connection).by_category()), show,
+                       "Error viewing income by category")
 
 
     def select_category(self):
@@ -323,14 +419,55 @@ class BudgetTrackerApp:
             return None
         if category_choice == len(self.categories) + 1:
             category = simpledialog.askstring("Category", "Enter the new category:")
-            if category is None:
+            if not category:
                 return None
-            self.categories.append(category)
+            if category not in self.categories:
+                self.categories.append(category)
+                # Stored straight away, so it is offered again after a restart
+                self.run_query(lambda connection: categories.add(connection, category), error_message="Error adding category")
             return category
         else:
             return self.categories[category_choice - 1]
 
 
+    def ask_date(self, title):
+        """
+        Ask for the date of a transaction.
+
+        Parameters:
+        - title (str): Title of the dialog.
+
+        Returns:
+        - occurred_at (str): "YYYY-MM-DD 00:00:00", "" for today, or None if cancelled.
+        """
+        while True:
+            text = simpledialog.askstring(title, "Enter date (YYYY-MM-DD), or leave blank for today:")
+            if text is None:
+                return None
+            try:
+                return periods.parse_day(text) or ""
+            except ValueError:
+                messagebox.showerror("Error", f"'{text}' is not a date in the form YYYY-MM-DD.")
+
+
+    def ask_period(self):
+        """
+        Ask for a budget period.
+
+        Returns:
+        - period (str): "monthly" or "weekly", or None if cancelled.
+        """
+        while True:
+            period = simpledialog.askstring("Budget", "Enter budget period (monthly or weekly):",
+                                            initialvalue=periods.DEFAULT_PERIOD)
+            if period is None:
+                return None
+            period = period.strip().lower()
+            if period in periods.PERIODS:
+                return period
+            messagebox.showerror("Error", "Please enter monthly or weekly.")
+
+
     def set_budget(self):
         """
         Set a budget for a category.
@@ -347,31 +484,28 @@ class BudgetTrackerApp:
         category = self.select_category()
         if category is None:
             return
-        budget = simpledialog.askfloat("Budget", f"Enter budget amount for category '{category}':")
+        period = self.ask_period()
+        if period is None:
+            return
+        budget = simpledialog.askfloat("Budget", f"Enter {period} budget amount for category '{category}':")
         if budget is None:
             return
 
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("INSERT OR REPLACE INTO budgets (category, budget) VALUES (?, ?)", (category, budget))
-            self.connection.commit()
-
-            cursor.execute("SELECT SUM(amount) FROM expenses WHERE category = ?", (category,))
-            total_expense = cursor.fetchone()[0] or 0
-            difference = budget - total_expense
-            if difference > 0:
-                messagebox.showinfo("Budget", f"Category '{category}' is under budget by ${difference:.2f}.")
-            elif difference < 0:
-                messagebox.showinfo("Budget", f"Category '{category}' is over budget by ${abs(difference):.2f}.")
-            else:
-                messagebox.showinfo("Budget", f"Category '{category}' is exactly on budget.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error setting budget: {e}")
+        def save(connection):
+            budgets = BudgetRepository(connection)
+            budgets.set(category, budget, period)
+            return budgets.report(category)
+
+        def show(report):
+            for line in report:
+                messagebox.showinfo("Budget", reports.budget_status(line))
+
+        self.run_query(save, show, "Error setting budget")
 
 
     def view_budget(self):
         """
-        View budget for each category.
+        View budget for each category and compare with the expenses of the current month or week.
 
         Parameters:
         - None
@@ -382,17 +516,14 @@ class BudgetTrackerApp:
         Raises:
         - sqlite3.Error: If there is an error viewing budget in the database.
         """
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT category, budget FROM budgets")
-            budget_data = cursor.fetchall()
+        def show(budget_data):
             if budget_data:
-                budget_str = "\n".join([f"Category: {category}, Budget: {budget:.2f}" for category, budget in budget_data])
+                budget_str = "\n".join([reports.format_budget_line(line) for line in budget_data])
                 messagebox.showinfo("Budget", budget_str)
             else:
                 messagebox.showinfo("Budget", "No budget categories found.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error viewing budget: {e}")
+
+        self.run_query(lambda connection: BudgetRepository(connection).report(), show, "Error viewing budget")
 
 
     def set_financial_goals(self):
@@ -418,13 +549,13 @@ class BudgetTrackerApp:
         if current_amount is None:
             return
 
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("INSERT INTO financial_goals (goal_name, target_amount, current_amount) VALUES (?, ?, ?)", (goal_name, target_amount, current_amount))
-            self.connection.commit()
+        def insert(connection):
+            GoalRepository(connection).add(goal_name, target_amount, current_amount)
+
+        def done(_result):
             messagebox.showinfo("Financial Goals", f"Financial goal '{goal_name}' set successfully.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error setting financial goal: {e}")
+
+        self.run_query(insert, done, "Error setting financial goal")
 
 
     def view_and_edit_goals(self):
@@ -440,17 +571,15 @@ class BudgetTrackerApp:
         Raises:
         - sqlite3.Error: If there is an error viewing or editing financial goals in the database.
         """
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM financial_goals")
-            goals_data = cursor.fetchall()
+        def show(goals_data):
             if goals_data:
-                goals_str = "\n".join([f"Goal Name: {row[1]}, Target Amount: {row[2]}, Current Amount: {row[3]}" for row in goals_data])
+                goals_str = "\n".join([f"Goal Name: {row.goal_name}, Target Amount: {row.target_amount}, Current Amount: {row.current_amount}" for row in goals_data])
                 messagebox.showinfo("Financial Goals", goals_str)
             else:
                 messagebox.showinfo("Financial Goals", "No financial goals set.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error viewing financial goals: {e}")
+
+        self.run_query(lambda connection: GoalRepository(connection).all(), show,
+                       "Error viewing financial goals")
 
 
     def view_progress(self):
@@ -466,19 +595,91 @@ class BudgetTrackerApp:
         Raises:
         - sqlite3.Error: If there is an error viewing progress towards financial goals in the database.
         """
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT SUM(current_amount) FROM financial_goals")
-            total_current_amount = cursor.fetchone()[0] or 0
-            cursor.execute("SELECT SUM(target_amount) FROM financial_goals")
-            total_target_amount = cursor.fetchone()[0] or 0
-            if total_target_amount > 0:
-                progress_percentage = (total_current_amount / total_target_amount) * 100
-                messagebox.showinfo("Financial Goals Progress", f"Total progress towards financial goals: {progress_percentage:.2f}%")
+        def show(progress):
+            if progress:
+                _current, _target, progress_percentage = goal_analytics.overall_progress(progress)
+                lines = [goal_analytics.format_goal_progress(line) for line in progress]
+                if progress_percentage is not None:
+                    lines.insert(0, f"Total progress towards financial goals: {progress_percentage:.2f}%\n")
+                messagebox.showinfo("Financial Goals Progress", "\n".join(lines))
             else:
                 messagebox.showinfo("Financial Goals Progress", "No financial goals set.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error viewing progress towards financial goals: {e}")
+
+        self.run_query(lambda connection: GoalRepository(connection).progress(), show,
+                       "Error viewing progress towards financial goals")
+
+
+    def search_transactions(self):
+        """
+        Search expenses and income by item name or category.
+
+        Parameters:
+        - None
+
+        Returns:
+        - None
+
+        Raises:
+        - sqlite3.Error: If there is an error searching the database.
+        """
+        text = simpledialog.askstring("Search", "Enter words to search for:")
+        if not text:
+            return
+
+        def find(connection):
+            return ExpenseRepository(connection).search(text), IncomeRepository(connection).search(text)
+
+        def show(result):
+            sections = []
+            for title, hits in zip(("Expenses", "Income"), result):
+                if hits:
+                    sections.append(title + ":\n" + "\n".join("    " + search.format_hit(hit) for hit in hits))
+            messagebox.showinfo(f"Search - {text}", "\n\n".join(sections) or "No matching entries found.")
+
+        self.run_query(find, show, "Error searching")
+
+
+    def view_diagnostics(self):
+        """
+        Show which SQL statements took the most time, the recent slow queries and the query cache statistics.
+
+        Parameters:
+        - None
+
+        Returns:
+        - None
+        """
+        window = tk.Toplevel(self.master)
+        window.title("Diagnostics")
+        text = tk.Text(window, width=140, height=30, wrap="none", font="TkFixedFont")
+        scrollbar = ttk.Scrollbar(window, orient="vertical", command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+
+        def show(cache_stats):
+            if not window.winfo_exists():
+                return
+            report = instrumentation.format_report(self.query_stats)
+            report += "\n\nQuery cache: " + ", ".join(f"{name} {value}" for name, value in cache_stats.items())
+            text.configure(state="normal")
+            text.delete("1.0", "end")
+            text.insert("end", report)
+            text.configure(state="disabled")
+
+        def refresh():
+            # Cache statistics belong to the worker's connection, so they are read on the worker thread
+            self.run_query(query_cache.stats, show, "Error reading diagnostics")
+
+        def reset():
+            self.query_stats.reset()
+            refresh()
+
+        buttons = tk.Frame(window)
+        tk.Button(buttons, text="Refresh", command=refresh).pack(side="left")
+        tk.Button(buttons, text="Reset", command=reset).pack(side="left")
+        buttons.pack(side="bottom", fill="x")
+        text.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        refresh()
 
 
     def quit_app(self):
@@ -491,10 +692,191 @@ class BudgetTrackerApp:
         Returns:
         - None
         """
+        self.worker.close()
         self.master.destroy()
 
 
+class TransactionListView:
+    """
+    Scrollable list of a transaction table that loads rows lazily.
+
+    Rows are read with keyset pagination as the user scrolls, and at most
+    MAX_PAGES pages are kept in the Treeview: when a page is loaded at one end
+    the page at the other end is dropped, and it is read again if the user
+    scrolls back. Memory use and render time therefore stay bounded however
+    large the table is.
+    """
+
+    MAX_PAGES = 5
+
+    # How close (as a fraction of the list) to either end the view must be
+    # before the next page is loaded
+    LOAD_THRESHOLD = 0.1
+
+    def __init__(self, master, run_query, repository, title, first_page):
+        """
+        Open the list in a new window.
+
+        Parameters:
+        - master (tk.Tk): The master tkinter window.
+        - run_query (callable): BudgetTrackerApp.run_query, used to load pages on the database worker.
+        - repository (type): ExpenseRepository or IncomeRepository.
+        - title (str): Title of the window.
+        - first_page (list): The first page of Transaction rows.
+        """
+        self.run_query = run_query
+        self.repository = repository
+        self.pages = []
+        self.at_start = True
+        self.at_end = len(first_page) < reports.PAGE_SIZE
+        # A page load is scheduled or running. If it fails, loading stops;
+        # if it is cancelled from the main window, scrolling retries it.
+        self.load_pending = False
+        self.load_job = None
+
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        columns = ("category", "item_name", "amount", "occurred_at")
+        self.tree = ttk.Treeview(self.window, columns=columns, show="headings", height=20)
+        for column, heading, width, anchor in (("category", "Category", 160, "w"), ("item_name", "Item Name", 220, "w"),
+                                               ("amount", "Amount", 100, "e"), ("occurred_at", "Date", 150, "w")):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor=anchor)
+        self.scrollbar = ttk.Scrollbar(self.window, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.add_page(first_page, at_end=True)
+
+
+    def on_scroll(self, first, last):
+        """
+        Update the scrollbar and schedule a page load near either end of the list.
+
+        Parameters:
+        - first (str): Fraction of the list above the visible area.
+        - last (str): Fraction of the list up to the bottom of the visible area.
+
+        Returns:
+        - None
+        """
+        self.scrollbar.set(first, last)
+        if self.load_pending and not (self.load_job is not None and self.load_job.cancelled):
+            return
+        if float(last) >= 1 - self.LOAD_THRESHOLD and not self.at_end:
+            self.load_pending = True
+            self.window.after_idle(self.load_next)
+        elif float(first) <= self.LOAD_THRESHOLD and not self.at_start:
+            self.load_pending = True
+            self.window.after_idle(self.load_previous)
+
+
+    def load_next(self):
+        """
+        Load the page after the last loaded row on the database worker.
+
+        Returns:
+        - None
+        """
+        after_id = self.pages[-1][-1]
+        self.load_job = self.run_query(lambda connection: self.repository(connection).page(after_id=after_id),
+                                       self.show_next, f"Error loading {self.repository.table}")
+
+
+    def show_next(self, rows):
+        """
+        Append a page loaded by load_next.
+
+        Parameters:
+        - rows (list): Transaction rows.
+
+        Returns:
+        - None
+        """
+        self.load_pending = False
+        self.load_job = None
+        if not self.window.winfo_exists():
+            return
+        if len(rows) < reports.PAGE_SIZE:
+            self.at_end = True
+        if rows:
+            self.add_page(rows, at_end=True)
+
+
+    def load_previous(self):
+        """
+        Load the page before the first loaded row on the database worker.
+
+        Returns:
+        - None
+        """
+        before_id = self.pages[0][0]
+        self.load_job = self.run_query(lambda connection: self.repository(connection).page(before_id=before_id),
+                                       self.show_previous, f"Error loading {self.repository.table}")
+
+
+    def show_previous(self, rows):
+        """
+        Prepend a page loaded by load_previous.
+
+        Parameters:
+        - rows (list): Transaction rows.
+
+        Returns:
+        - None
+        """
+        self.load_pending = False
+        self.load_job = None
+        if not self.window.winfo_exists():
+            return
+        if len(rows) < reports.PAGE_SIZE:
+            self.at_start = True
+        if rows:
+            self.add_page(rows, at_end=False)
+
+
+    def add_page(self, rows, at_end):
+        """
+        Insert a page of rows and drop the page at the other end if too many are loaded.
+
+        The view is scrolled so the rows the user was looking at stay in place.
+
+        Parameters:
+        - rows (list): Transaction rows.
+        - at_end (bool): True to append the page, False to prepend it.
+
+        Returns:
+        - None
+        """
+        top = float(self.tree.yview()[0]) * len(self.tree.get_children())
+        for offset, row in enumerate(rows):
+            values = (row.category, row.item_name, row.amount, row.occurred_at or "")
+            self.tree.insert("", "end" if at_end else offset, iid=str(row.id), values=values)
+        ids = [row.id for row in rows]
+        if at_end:
+            self.pages.append(ids)
+        else:
+            self.pages.insert(0, ids)
+            top += len(ids)
+
+        if len(self.pages) > self.MAX_PAGES:
+            if at_end:
+                dropped = self.pages.pop(0)
+                self.at_start = False
+                top -= len(dropped)
+            else:
+                dropped = self.pages.pop()
+                self.at_end = False
+            self.tree.delete(*[str(row_id) for row_id in dropped])
+
+        total = len(self.tree.get_children())
+        if total:
+            self.tree.yview_moveto(max(top, 0) / total)
+
+
 def main():
+    load_tkinter()
     root = tk.Tk()
     app = BudgetTrackerApp(root)
     root.mainloop()
@@ -0,0 +1,399 @@
+"""
+Command line interface to the expense tracker for scripts and cron jobs.
+
+Every command runs without prompting and writes its results to stdout as
+they are read, as tab separated text, CSV, a JSON array or JSON lines.
+Errors go to stderr and give a non-zero exit status.
+
+Usage:
+    python budget_cli.py add-expense "Food and Dining" bread 2.50 --date 2024-05-01
+    python budget_cli.py add-income salary 1000
+    python budget_cli.py add-batch --table expenses < expenses.csv
+    python budget_cli.py set-budget Housing 5000 --period monthly
+    python budget_cli.py report --by-category --format json
+    python budget_cli.py report --trend --table expenses --format csv
+    python budget_cli.py list --from 2024-05-01 --to 2024-05-31
+    python budget_cli.py list --from 2022-01-01 --to 2022-12-31 --include-archived
+    python budget_cli.py search uber --table expenses --limit 20
+    python budget_cli.py goals --progress
+    python budget_cli.py contribute 3 150
+    python budget_cli.py import statement.csv
+    python budget_cli.py export --format jsonl --from 2024-01-01 --output expenses.jsonl
+"""
+
+# Importing necessary modules
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+import exporter
+import goal_analytics
+import migrations
+import periods
+import pool
+import reports
+import rollups
+import search
+import totals
+from money import Money
+from repository import BudgetRepository, ExpenseRepository, GoalRepository, IncomeRepository
+
+
+FORMATS = ("text", "csv", "json", "jsonl")
+
+REPOSITORIES = {"expenses": ExpenseRepository, "income": IncomeRepository}
+
+
+
+def output_value(value, output_format):
+    """
+    Convert a value for output: Money as a decimal number, dates as "YYYY-MM-DD", None as empty or null.
+    """
+    if isinstance(value, Money):
+        return float(value.to_decimal()) if output_format in ("json", "jsonl") else str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if value is None and output_format in ("text", "csv"):
+        return ""
+    return value
+
+
+
+def write_rows(rows, fields, output_format, out=None):
+    """
+    Write rows to a stream as they are produced.
+
+    Parameters:
+    - rows (iterable): Tuples in the order of fields.
+    - fields (sequence): Column names.
+    - output_format (str): "text" (tab separated with a header), "csv", "json" or "jsonl".
+    - out (file, optional): Stream to write to. Defaults to sys.stdout.
+
+    Returns:
+    - count (int): Number of rows written.
+    """
+    out = out or sys.stdout
+    count = 0
+    if output_format == "json":
+        out.write("[")
+        for row in rows:
+            record = dict(zip(fields, (output_value(value, output_format) for value in row)))
+            out.write(("," if count else "") + "\n  " + json.dumps(record))
+            count += 1
+        out.write("\n]\n" if count else "]\n")
+    elif output_format == "jsonl":
+        for row in rows:
+            out.write(json.dumps(dict(zip(fields, (output_value(value, output_format) for value in row)))) + "\n")
+            count += 1
+    else:
+        writer = csv.writer(out, delimiter="\t" if output_format == "text" else ",", lineterminator="\n")
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([output_value(value, output_format) for value in row])
+            count += 1
+    return count
+
+
+
+def date_range(args):
+    """
+    Turn the --from and --to options into a half-open [start, end) range.
+
+    Returns:
+    - range (tuple): (start, end) as "YYYY-MM-DD" strings, or None if neither option is given.
+
+    Raises:
+    - ValueError: If a date is invalid.
+    """
+    if args.start is None and args.end is None:
+        return None
+    start = periods.to_date(args.start).isoformat() if args.start else ""
+    end = (periods.to_date(args.end) + timedelta(days=1)).isoformat() if args.end else "9999-12-31"
+    return start, end
+
+
+
+def command_add(args, connection):
+    """
+    Add one expense or income entry.
+    """
+    repository = REPOSITORIES[args.table](connection)
+    row_id = repository.add(args.category, args.item_name, args.amount, periods.parse_day(args.date or ""))
+    print(row_id)
+    return 0
+
+
+
+def command_add_batch(args, connection):
+    """
+    Add entries read from stdin as CSV lines: category,item_name,amount[,YYYY-MM-DD].
+
+    All lines are written in one transaction, or none if a line is invalid.
+    """
+    rows = []
+    for line_number, row in enumerate(csv.reader(sys.stdin), start=1):
+        if not row:
+            continue
+        if len(row) not in (3, 4):
+            raise ValueError("line {}: expected category,item_name,amount[,date]".format(line_number))
+        try:
+            occurred_at = periods.parse_day(row[3]) if len(row) == 4 else None
+            rows.append((row[0], row[1], Money.parse(row[2]), occurred_at))
+        except ValueError as e:
+            raise ValueError("line {}: {}".format(line_number, e))
+    count = REPOSITORIES[args.table](connection).add_many(rows)
+    print("Added {} {} entries.".format(count, args.table))
+    return 0
+
+
+
+def command_set_budget(args, connection):
+    """
+    Set the budget of a category.
+    """
+    budgets = BudgetRepository(connection)
+    budgets.set(args.category, args.amount, args.period)
+    write_rows(budgets.report(args.category), reports.BudgetLine._fields, args.format)
+    return 0
+
+
+
+def command_report(args, connection):
+    """
+    Write a budget, per-category or monthly trend report.
+    """
+    if args.by_category:
+        dates = date_range(args)
+        if dates is None:
+            rows = totals.category_totals(connection, args.table)
+        else:
+            rows = reports.period_totals(connection, args.table, dates[0], dates[1])
+        write_rows(rows, ("category", "total", "entries"), args.format)
+    elif args.trend:
+        start = args.start[:7] if args.start else None
+        end = args.end[:7] if args.end else None
+        write_rows(rollups.monthly_trend(connection, args.table, args.category, start, end), rollups.Rollup._fields, args.format)
+    else:
+        write_rows(BudgetRepository(connection).report(args.category, args.on), reports.BudgetLine._fields, args.format)
+    return 0
+
+
+
+def command_list(args, connection):
+    """
+    Stream transactions, optionally limited to a date range and a category.
+    """
+    repository = REPOSITORIES[args.table](connection)
+    dates = date_range(args)
+    if args.include_archived:
+        # Rows without a date are never in a range; archived rows always have one
+        start, end = dates or ("", "9999-12-31")
+        rows = repository.between(start, end, args.category, include_archived=True)
+    elif dates is not None:
+        rows = repository.between(dates[0], dates[1], args.category)
+    else:
+        rows = repository.all(args.category)
+    write_rows(rows, ("id", "category", "item_name", "amount", "occurred_at"), args.format)
+    return 0
+
+
+
+def command_search(args, connection):
+    """
+    Write the transactions matching every search word, best match first.
+    """
+    hits = search.search(connection, args.table, " ".join(args.words), args.limit, prefix=not args.whole_words,
+                         ranked=not args.newest)
+    write_rows(hits, search.SearchHit._fields, args.format)
+    return 0
+
+
+
+def command_goals(args, connection):
+    """
+    Write the financial goals, or their progress and projected completion.
+    """
+    if args.progress:
+        write_rows(GoalRepository(connection).progress(args.on), goal_analytics.GoalProgress._fields, args.format)
+    else:
+        write_rows(GoalRepository(connection).all(), ("id", "goal_name", "target_amount", "current_amount"), args.format)
+    return 0
+
+
+
+def command_contribute(args, connection):
+    """
+    Add an amount saved to a financial goal.
+    """
+    if not GoalRepository(connection).contribute(args.goal_id, args.amount):
+        raise ValueError("no goal with id {}".format(args.goal_id))
+    return 0
+
+
+
+def command_export(args, connection):
+    """
+    Export a transaction table to CSV, JSON Lines or Parquet (see exporter.py).
+    """
+    start, end = date_range(args) or (None, None)
+    count = exporter.export(connection, args.table, args.format, args.output, args.category, start, end)
+    if args.output != "-":
+        print("Exported {} {} rows to {}.".format(count, args.table, args.output))
+    return 0
+
+
+
+def command_import(args, connection):
+    """
+    Import statement files (see importer.py).
+    """
+    import importer
+
+    if args.rules:
+        rules = importer.CategoryRules.from_file(args.rules, args.default_category)
+    else:
+        rules = importer.CategoryRules(default=args.default_category)
+    status = 0
+    for path in args.files:
+        try:
+            result = importer.import_file(connection, path, args.table, rules)
+            print("{}: {}".format(path, importer.format_result(result)))
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print("Error importing {}: {}".format(path, e), file=sys.stderr)
+            status = 1
+    return status
+
+
+
+def build_parser():
+    """
+    Build the argument parser with one sub-command per operation.
+
+    Returns:
+    - parser (argparse.ArgumentParser): The parser.
+    """
+    parser = argparse.ArgumentParser(description="Expense and budget tracker command line.")
+    parser.add_argument("--database", default="expense_tracker.db", help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_format(command):
+        command.add_argument("--format", choices=FORMATS, default="text", help="Output format (default: text)")
+
+    def add_dates(command):
+        command.add_argument("--from", dest="start", help="First day, YYYY-MM-DD")
+        command.add_argument("--to", dest="end", help="Last day, YYYY-MM-DD (included)")
+
+    command = commands.add_parser("add-expense", help="Add an expense")
+    command.add_argument("category")
+    command.add_argument("item_name")
+    command.add_argument("amount", type=Money.parse)
+    command.add_argument("--date", help="YYYY-MM-DD, default today")
+    command.set_defaults(handler=command_add, table="expenses")
+
+    command = commands.add_parser("add-income", help="Add an income entry")
+    command.add_argument("item_name")
+    command.add_argument("amount", type=Money.parse)
+    command.add_argument("--category", default="", help="Income category")
+    command.add_argument("--date", help="YYYY-MM-DD, default today")
+    command.set_defaults(handler=command_add, table="income")
+
+    command = commands.add_parser("add-batch", help="Add entries from CSV lines on stdin in one transaction")
+    command.add_argument("--table", choices=tuple(REPOSITORIES), default="expenses")
+    command.set_defaults(handler=command_add_batch)
+
+    command = commands.add_parser("set-budget", help="Set the budget of a category")
+    command.add_argument("category")
+    command.add_argument("amount", type=Money.parse)
+    command.add_argument("--period", choices=periods.PERIODS, default=periods.DEFAULT_PERIOD)
+    add_format(command)
+    command.set_defaults(handler=command_set_budget)
+
+    command = commands.add_parser("report", help="Budget (default), per-category or monthly trend report")
+    kind = command.add_mutually_exclusive_group()
+    kind.add_argument("--by-category", action="store_true", help="Totals per category")
+    kind.add_argument("--trend", action="store_true", help="Totals per month and category")
+    command.add_argument("--table", choices=tuple(REPOSITORIES), default="expenses")
+    command.add_argument("--category", help="Only this category")
+    command.add_argument("--on", help="Budget report for the periods containing this day (default today)")
+    add_dates(command)
+    add_format(command)
+    command.set_defaults(handler=command_report)
+
+    command = commands.add_parser("list", help="List transactions")
+    command.add_argument("--table", choices=tuple(REPOSITORIES), default="expenses")
+    command.add_argument("--category", help="Only this category")
+    command.add_argument("--include-archived", action="store_true",
+                         help="Also read the archived years (see archive.py); rows without a date are left out")
+    add_dates(command)
+    add_format(command)
+    command.set_defaults(handler=command_list)
+
+    command = commands.add_parser("search", help="Full-text search of item names and categories")
+    command.add_argument("words", nargs="+")
+    command.add_argument("--table", choices=tuple(REPOSITORIES), default="expenses")
+    command.add_argument("--limit", type=int, default=search.DEFAULT_LIMIT)
+    command.add_argument("--whole-words", action="store_true", help="Do not match word prefixes")
+    command.add_argument("--newest", action="store_true", help="Newest matches first instead of best first")
+    add_format(command)
+    command.set_defaults(handler=command_search)
+
+    command = commands.add_parser("goals", help="List financial goals")
+    command.add_argument("--progress", action="store_true", help="Progress, remaining amount and projected completion")
+    command.add_argument("--on", help="Project from this day (default today)")
+    add_format(command)
+    command.set_defaults(handler=command_goals)
+
+    command = commands.add_parser("contribute", help="Add an amount saved to a financial goal")
+    command.add_argument("goal_id", type=int)
+    command.add_argument("amount", type=Money.parse)
+    command.set_defaults(handler=command_contribute)
+
+    command = commands.add_parser("export", help="Export transactions to CSV, JSON Lines or Parquet")
+    command.add_argument("--table", choices=tuple(REPOSITORIES), default="expenses")
+    command.add_argument("--format", choices=exporter.EXPORT_FORMATS, default="csv")
+    command.add_argument("--output", default="-", help="Output file (default: stdout)")
+    command.add_argument("--category", help="Only this category")
+    add_dates(command)
+    command.set_defaults(handler=command_export)
+
+    command = commands.add_parser("import", help="Import CSV, OFX or QIF statements")
+    command.add_argument("files", nargs="+")
+    command.add_argument("--table", default="auto", choices=("auto", "expenses", "income"))
+    command.add_argument("--rules", help="CSV file of pattern,category rules")
+    command.add_argument("--default-category", default="Uncategorized", help="Category when no rule matches")
+    command.set_defaults(handler=command_import)
+    return parser
+
+
+
+def main(argv=None):
+    """
+    Run one command.
+
+    Returns:
+    - status (int): 0 on success, 1 on error.
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        connection_pool = pool.ConnectionPool(args.database, max_size=1)
+    except ValueError as e:
+        print("Error connecting to database:", e, file=sys.stderr)
+        return 1
+    try:
+        with connection_pool, connection_pool.connection() as connection:
+            migrations.migrate(connection)
+            return args.handler(args, connection)
+    except BrokenPipeError:
+        # The reader (e.g. head) went away; stop quietly
+        sys.stderr.close()
+        return 0
+    except (sqlite3.Error, ValueError, OSError) as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
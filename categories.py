@@ -0,0 +1,115 @@
+"""
+The categories table and in-memory lookups of category ids.
+
+Expenses, income, budgets and the derived tables refer to their category by
+the integer id of a row of the categories table (see
+migrations.add_categories), so each name is stored once and joins and
+GROUP BYs compare small integers. Transactions without a category use the
+row named "".
+
+The name-to-id map is kept in query_cache like other query results, so
+adding a transaction normally costs a dictionary lookup rather than an
+extra query. New names are added to the table the first time they are used.
+"""
+
+# Importing necessary modules
+import query_cache
+
+
+# The categories offered before any are added
+DEFAULT_CATEGORIES = ["Housing", "Transportation", "Food and Dining", "Utilities", "Personal Care", "Health and Fitness",
+                      "Entertainment", "Education", "Debt Payments", "Savings and Investments"]
+
+SELECT_QUERY = "SELECT name, id FROM categories ORDER BY id"
+# Another connection may add the same name between the lookup and the insert
+INSERT_QUERY = "INSERT OR IGNORE INTO categories (name) VALUES (?)"
+LOOKUP_QUERY = "SELECT id FROM categories WHERE name = ?"
+
+
+
+def category_ids(connection):
+    """
+    Map every category name to its id.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - ids (dict): {name: id}. Shared with other callers; do not modify it.
+
+    Raises:
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    return query_cache.cached(connection, ("category_ids",), ("categories",),
+                              lambda: dict(connection.execute(SELECT_QUERY).fetchall()))
+
+
+
+def category_id(connection, name, create=True):
+    """
+    Look up the id of a category, adding the category if it is new.
+
+    A new category is written on the caller's transaction and committed with it.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - name (str): The category name; None is the same as "".
+    - create (bool): Add the category when there is none with this name.
+
+    Returns:
+    - id (int or None): The id, or None if the category does not exist and create is False.
+
+    Raises:
+    - sqlite3.Error: If the category cannot be added.
+    """
+    name = name or ""
+    found = category_ids(connection).get(name)
+    if found is not None or not create:
+        return found
+    connection.execute(INSERT_QUERY, (name,))
+    found = connection.execute(LOOKUP_QUERY, (name,)).fetchone()[0]
+    query_cache.tables_changed(connection, "categories")
+    return found
+
+
+
+def names(connection):
+    """
+    Every named category in the order they were added, defaults first.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - names (list): Category names, without the "" of uncategorised transactions.
+
+    Raises:
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    return [name for name in category_ids(connection) if name]
+
+
+
+def add(connection, name, commit=True):
+    """
+    Add a category so it is offered from now on.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - name (str): The new category.
+    - commit (bool): Commit the transaction straight away.
+
+    Returns:
+    - id (int): Id of the category, new or existing.
+
+    Raises:
+    - ValueError: If the name is empty.
+    - sqlite3.Error: If the category cannot be added.
+    """
+    if not name:
+        raise ValueError("A category needs a name")
+    found = category_id(connection, name)
+    if commit:
+        connection.commit()
+        query_cache.tables_changed(connection, "categories")
+    return found
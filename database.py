@@ -0,0 +1,134 @@
+"""
+Opening connections to the expense tracker database.
+
+Every entry point opens its connection through connect(), which applies a
+connection profile: journaling mode, sync level, lock wait time and cache
+sizes. The default profile uses WAL journaling so the Tkinter app and the
+text UI can have the same database open without blocking each other.
+"""
+
+# Importing necessary modules
+import os
+import sqlite3
+from collections import namedtuple
+
+import query_cache
+
+
+ConnectionProfile = namedtuple("ConnectionProfile", [
+    "journal_mode",  # "wal", or "delete" for SQLite's default rollback journal
+    "synchronous",   # "normal" is safe with WAL and avoids an fsync per commit
+    "busy_timeout",  # milliseconds to wait for a lock before failing
+    "cache_size",    # page cache; negative values are KiB
+    "mmap_size",     # bytes of the file to memory-map, 0 to disable
+])
+
+PROFILES = {
+    "wal": ConnectionProfile("wal", "normal", 5000, -32000, 256 * 1024 * 1024),
+    # SQLite's own defaults, kept for comparison and for file systems without WAL support
+    "legacy": ConnectionProfile("delete", "full", 0, -2000, 0),
+}
+
+DEFAULT_PROFILE_NAME = "wal"
+
+# Milliseconds to wait for a lock while a connection is being set up, also
+# under profiles that otherwise fail at once (busy_timeout 0)
+CONNECT_BUSY_TIMEOUT = 5000
+
+# Environment variable that selects a profile by name
+PROFILE_ENVIRONMENT_VARIABLE = "BUDGET_TRACKER_DB_PROFILE"
+
+
+
+class Connection(sqlite3.Connection):
+    """
+    The connection class used by connect(). Unlike sqlite3.Connection it can
+    be weakly referenced, which query_cache needs to track connections.
+    """
+
+    def rollback(self):
+        """
+        Roll back the current transaction and drop cached results that may
+        have been read from its uncommitted rows.
+        """
+        had_changes = self.in_transaction
+        super().rollback()
+        if had_changes:
+            query_cache.invalidate(self)
+
+
+
+def get_profile(name=None):
+    """
+    Look up a connection profile.
+
+    Parameters:
+    - name (str, optional): Profile name. Defaults to the BUDGET_TRACKER_DB_PROFILE
+      environment variable, then "wal".
+
+    Returns:
+    - profile (ConnectionProfile): The profile.
+
+    Raises:
+    - ValueError: If there is no profile with that name.
+    """
+    name = name or os.environ.get(PROFILE_ENVIRONMENT_VARIABLE) or DEFAULT_PROFILE_NAME
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError("Unknown connection profile {!r}; choose one of {}".format(name, ", ".join(PROFILES)))
+
+
+
+def apply_profile(connection, profile):
+    """
+    Apply a connection profile to an open connection.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - profile (ConnectionProfile): Settings to apply.
+
+    Returns:
+    - None
+
+    Raises:
+    - sqlite3.Error: If a setting cannot be applied.
+    """
+    # Reading and setting the journal mode need a lock, which another process may
+    # hold while it writes; the mode is only set when the file has another one
+    connection.execute("PRAGMA busy_timeout = {:d}".format(max(profile.busy_timeout, CONNECT_BUSY_TIMEOUT)))
+    if connection.execute("PRAGMA journal_mode").fetchone()[0].lower() != profile.journal_mode:
+        connection.execute("PRAGMA journal_mode = {}".format(profile.journal_mode))
+    connection.execute("PRAGMA busy_timeout = {:d}".format(profile.busy_timeout))
+    connection.execute("PRAGMA synchronous = {}".format(profile.synchronous))
+    connection.execute("PRAGMA cache_size = {:d}".format(profile.cache_size))
+    connection.execute("PRAGMA mmap_size = {:d}".format(profile.mmap_size))
+
+
+
+def connect(database_name, profile=None, **options):
+    """
+    Open a connection to the database with a connection profile applied.
+
+    Parameters:
+    - database_name (str): The name of the SQLite database.
+    - profile (ConnectionProfile or str, optional): Profile or profile name. See get_profile.
+    - options: Extra keyword arguments for sqlite3.connect, e.g. check_same_thread.
+
+    Returns:
+    - connection (Connection): The configured connection.
+
+    Raises:
+    - ValueError: If the profile name is unknown.
+    - sqlite3.Error: If the database cannot be opened or configured.
+    """
+    if not isinstance(profile, ConnectionProfile):
+        profile = get_profile(profile)
+    options.setdefault("factory", Connection)
+    connection = sqlite3.connect(database_name, timeout=profile.busy_timeout / 1000, **options)
+    try:
+        apply_profile(connection, profile)
+    except sqlite3.Error:
+        connection.close()
+        raise
+    return connection
@@ -0,0 +1,213 @@
+"""
+Background database worker for the Tkinter UI.
+
+A single worker thread owns the SQLite connection and runs query jobs taken
+from a queue, so the Tk event loop never waits on the database. Finished jobs
+are handed back to the Tk thread, which polls for them with master.after and
+runs their callbacks there.
+"""
+
+# Importing necessary modules
+import queue
+import sqlite3
+import threading
+
+import database
+
+
+
+class Job:
+    """
+    A query job submitted to a DatabaseWorker.
+    """
+
+    def __init__(self, worker, function, on_success, on_error):
+        """
+        Parameters:
+        - worker (DatabaseWorker): The worker running the job.
+        - function (callable): Called with the connection in the worker thread.
+        - on_success (callable, optional): Called with the result in the Tk thread.
+        - on_error (callable, optional): Called with the exception in the Tk thread.
+        """
+        self.worker = worker
+        self.function = function
+        self.on_success = on_success
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Cancel the job. A running query is interrupted and no callback is run.
+        """
+        self.worker.cancel(self)
+
+
+
+class DatabaseWorker:
+    """
+    Run database jobs on a dedicated thread that owns the connection.
+    """
+
+    def __init__(self, database_name, connect=database.connect):
+        """
+        Start the worker thread and open the connection in it.
+
+        Parameters:
+        - database_name (str): The name of the SQLite database.
+        - connect (callable): Opens the connection, called in the worker thread.
+
+        Raises:
+        - sqlite3.Error: If the connection cannot be opened.
+        - ValueError: If the connection profile is unknown.
+        """
+        self.database_name = database_name
+        self.connect = connect
+        self.connection = None
+        self.connect_error = None
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.outstanding = []
+        self.current = None
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="database-worker", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.connect_error is not None:
+            raise self.connect_error
+
+
+    def run(self):
+        """
+        Worker thread: open the connection, then run jobs until closed.
+        """
+        try:
+            self.connection = self.connect(self.database_name)
+        except (sqlite3.Error, ValueError) as e:
+            self.connect_error = e
+            self.ready.set()
+            return
+        self.ready.set()
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            with self.lock:
+                if job.cancelled:
+                    continue
+                self.current = job
+            result = error = None
+            try:
+                result = job.function(self.connection)
+            except Exception as e:
+                error = e
+                if self.connection.in_transaction:
+                    self.connection.rollback()
+            with self.lock:
+                self.current = None
+            self.results.put((job, result, error))
+        self.connection.close()
+
+
+    def submit(self, function, on_success=None, on_error=None):
+        """
+        Queue a job for the worker thread.
+
+        Parameters:
+        - function (callable): Called with the sqlite3.Connection in the worker thread.
+        - on_success (callable, optional): Called with the function's result in the Tk thread.
+        - on_error (callable, optional): Called with the exception in the Tk thread.
+
+        Returns:
+        - job (Job): Handle that can be used to cancel the job.
+        """
+        job = Job(self, function, on_success, on_error)
+        with self.lock:
+            self.outstanding.append(job)
+        self.jobs.put(job)
+        return job
+
+
+    def cancel(self, job):
+        """
+        Cancel a job, interrupting it if it is running.
+
+        Parameters:
+        - job (Job): The job to cancel.
+
+        Returns:
+        - None
+        """
+        with self.lock:
+            job.cancelled = True
+            if job in self.outstanding:
+                self.outstanding.remove(job)
+            if self.current is job:
+                self.connection.interrupt()
+
+
+    def cancel_all(self):
+        """
+        Cancel every queued and running job.
+
+        Returns:
+        - None
+        """
+        with self.lock:
+            jobs = list(self.outstanding)
+        for job in jobs:
+            self.cancel(job)
+
+
+    def busy(self):
+        """
+        Check whether any submitted job has not been delivered yet.
+
+        Returns:
+        - busy (bool): True while jobs are queued, running or awaiting delivery.
+        """
+        with self.lock:
+            return bool(self.outstanding)
+
+
+    def deliver_results(self):
+        """
+        Run the callbacks of finished jobs. Call this from the Tk thread.
+
+        Returns:
+        - delivered (int): Number of jobs whose callbacks were run.
+        """
+        delivered = 0
+        while True:
+            try:
+                job, result, error = self.results.get_nowait()
+            except queue.Empty:
+                return delivered
+            with self.lock:
+                if job.cancelled:
+                    continue
+                self.outstanding.remove(job)
+            if error is None:
+                if job.on_success is not None:
+                    job.on_success(result)
+            elif job.on_error is not None:
+                job.on_error(error)
+            else:
+                raise error
+            delivered += 1
+
+
+    def close(self, timeout=5):
+        """
+        Cancel outstanding jobs, stop the worker thread and close the connection.
+
+        Parameters:
+        - timeout (float): Seconds to wait for the thread to finish.
+
+        Returns:
+        - None
+        """
+        self.cancel_all()
+        self.jobs.put(None)
+        self.thread.join(timeout)
@@ -0,0 +1,187 @@
+"""
+Streaming export of expenses and income to CSV, JSON Lines and Parquet.
+
+Rows are read from SQLite with fetchmany in fixed-size batches and written
+out batch by batch, so memory use stays the same however large the table
+is. Amounts are formatted by SQLite, not per row in Python, as exact
+decimals of the stored integer cents: strings such as "-12.50" in CSV and
+JSON Lines, and a decimal128 column in Parquet.
+
+Parquet output needs the optional pyarrow package; CSV and JSON Lines use
+the standard library only.
+"""
+
+# Importing necessary modules
+import csv
+import json
+import sys
+
+from reports import check_transaction_table
+
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+# Rows fetched and written per batch
+DEFAULT_BATCH_SIZE = 10000
+
+EXPORT_COLUMNS = ("id", "category", "item_name", "amount", "occurred_at")
+
+# amount as a decimal string built from the integer cents, e.g. "-12.50";
+# dividing by 100.0 would give a double, which is not exact
+AMOUNT_SQL = ("CASE WHEN t.amount IS NOT NULL THEN printf('%s%d.%02d', CASE WHEN t.amount < 0 THEN '-' ELSE '' END, "
+              "abs(t.amount) / 100, abs(t.amount) % 100) END")
+
+# Parquet type of amount: every 64-bit number of cents fits
+PARQUET_AMOUNT_PRECISION = 19
+
+
+
+def export_query(table, output_format, category=None, start=None, end=None):
+    """
+    Build the SELECT for an export.
+
+    Parameters:
+    - table (str): "expenses" or "income".
+    - output_format (str): One of EXPORT_FORMATS.
+    - category (str, optional): Only export this category.
+    - start (str, optional): First day, "YYYY-MM-DD" (included).
+    - end (str, optional): Day after the last, "YYYY-MM-DD" (excluded).
+
+    Returns:
+    - query (tuple): (sql, params).
+
+    Raises:
+    - ValueError: If the table or format is unknown.
+    """
+    check_transaction_table(table)
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError("Unknown export format {!r}; choose one of {}".format(output_format, ", ".join(EXPORT_FORMATS)))
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append("t.occurred_at >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("t.occurred_at < ?")
+        params.append(end)
+    if category is not None:
+        conditions.append("t.category_id = (SELECT id FROM categories WHERE name = ?)")
+        params.append(category)
+    sql = ("SELECT t.id, c.name, t.item_name, {}, t.occurred_at FROM {} AS t "
+           "JOIN categories AS c ON c.id = t.category_id").format(AMOUNT_SQL, table)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    # A date range is read through the occurred_at index in date order; otherwise in id order
+    sql += " ORDER BY t.occurred_at, t.id" if start is not None or end is not None else " ORDER BY t.id"
+    return sql, tuple(params)
+
+
+
+def iter_batches(connection, sql, params, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Run a query and yield its rows in lists of at most batch_size.
+    """
+    cursor = connection.cursor()
+    cursor.arraysize = batch_size
+    cursor.execute(sql, params)
+    while True:
+        batch = cursor.fetchmany()
+        if not batch:
+            return
+        yield batch
+
+
+
+def write_csv(batches, out):
+    """
+    Write batches as CSV with a header row.
+    """
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for batch in batches:
+        writer.writerows(batch)
+        count += len(batch)
+    return count
+
+
+
+def write_jsonl(batches, out):
+    """
+    Write batches as JSON Lines, one object per row.
+    """
+    encode = json.JSONEncoder().encode
+    count = 0
+    for batch in batches:
+        out.write("".join([encode(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in batch]))
+        count += len(batch)
+    return count
+
+
+
+def write_parquet(batches, path):
+    """
+    Write batches as a Parquet file, one row group per batch.
+
+    Raises:
+    - ValueError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow)")
+    schema = pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("category", pyarrow.string()),
+        ("item_name", pyarrow.string()),
+        ("amount", pyarrow.decimal128(PARQUET_AMOUNT_PRECISION, 2)),
+        ("occurred_at", pyarrow.string()),
+    ])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            columns = list(zip(*batch))
+            # Arrow parses the amount strings into decimals itself
+            arrays = [pyarrow.array(column, type=pyarrow.string()).cast(field.type) if field.name == "amount"
+                      else pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+
+
+def export(connection, table, output_format, path="-", category=None, start=None, end=None,
+           batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Export a transaction table to a file or to stdout.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): "expenses" or "income".
+    - output_format (str): "csv", "jsonl" or "parquet".
+    - path (str): Output file, or "-" for stdout (not for Parquet).
+    - category (str, optional): Only export this category.
+    - start (str, optional): First day, "YYYY-MM-DD" (included).
+    - end (str, optional): Day after the last, "YYYY-MM-DD" (excluded).
+    - batch_size (int): Rows fetched and written at a time.
+
+    Returns:
+    - count (int): Number of rows exported.
+
+    Raises:
+    - ValueError: If the table or format is unknown, or Parquet is asked for without pyarrow or a file.
+    - OSError: If the file cannot be written.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    sql, params = export_query(table, output_format, category, start, end)
+    batches = iter_batches(connection, sql, params, batch_size)
+    if output_format == "parquet":
+        if path == "-":
+            raise ValueError("Parquet export needs an output file")
+        return write_parquet(batches, path)
+    write = write_csv if output_format == "csv" else write_jsonl
+    if path == "-":
+        return write(batches, sys.stdout)
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        return write(batches, out)
@@ -0,0 +1,198 @@
+"""
+Progress and projected completion of financial goals.
+
+One query reads every goal with an aggregate of its contribution history
+(see migrations.add_goal_contributions): how much was saved after the
+opening amount and how many days ago the goal was started. The progress,
+remaining amount, saving rate and projected completion date of all goals
+are then computed together, as NumPy array operations when NumPy is
+installed and there are enough goals for it to pay off, in plain Python
+otherwise. Both give the same results.
+
+Goals with a zero or negative target have no progress or projection.
+"""
+
+# Importing necessary modules
+import math
+from collections import namedtuple
+from datetime import timedelta
+
+import periods
+from money import Money
+
+
+# Per-goal result. progress_percent and projected_completion are None when they cannot be worked out.
+GoalProgress = namedtuple("GoalProgress", ["id", "goal_name", "target_amount", "current_amount", "remaining",
+                                           "progress_percent", "daily_rate", "projected_completion", "status"])
+
+# status values
+REACHED = "reached"          # current amount at or above the target
+PROJECTED = "projected"      # saving towards the target; projected_completion is set
+STALLED = "stalled"          # nothing saved since the start, or too slowly to finish within MAX_PROJECTION_DAYS
+NO_TARGET = "no target"      # target of zero or less
+
+# Projections further out than this are reported as stalled
+MAX_PROJECTION_DAYS = 100 * 366
+
+# Below this many goals plain Python is faster than setting up arrays
+NUMPY_MIN_GOALS = 64
+
+# One row per goal: id, name, target, current, saved since the start, days since the start.
+# Contributions after the day projected from are left out.
+GOAL_HISTORY_QUERY = '''
+    SELECT g.id, g.goal_name, COALESCE(g.target_amount, 0), COALESCE(g.current_amount, 0),
+           COALESCE(h.saved, 0), COALESCE(julianday(:on) - julianday(date(h.started_at)), 0)
+    FROM financial_goals AS g
+    LEFT JOIN (SELECT goal_id, MIN(contributed_at) AS started_at,
+                      SUM(CASE WHEN opening THEN 0 ELSE amount END) AS saved
+               FROM goal_contributions
+               WHERE contributed_at < :on || ' 24:00:00'
+               GROUP BY goal_id) AS h ON h.goal_id = g.id
+    ORDER BY g.id'''
+
+
+
+def load_numpy():
+    """
+    Import NumPy if it is installed.
+
+    Returns:
+    - numpy (module or None): The module, or None without NumPy.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+
+def python_projections(rows):
+    """
+    Work out progress, remaining amount, daily rate and days left goal by goal.
+
+    Parameters:
+    - rows (list): Rows of GOAL_HISTORY_QUERY.
+
+    Returns:
+    - columns (tuple): Lists of progress percentages, remaining cents, daily rates
+      in cents and days left, one entry per row. The progress of a goal without
+      a target is 0, and so are days left when nothing remains or the rate is not positive.
+      Days left are capped at MAX_PROJECTION_DAYS + 1.
+    """
+    percents, remainings, rates, days_left = [], [], [], []
+    for _goal_id, _name, target, current, saved, elapsed in rows:
+        rate = saved / max(elapsed, 1.0)
+        remaining = max(target - current, 0) if target > 0 else 0
+        percents.append(current * 100 / target if target > 0 else 0.0)
+        remainings.append(remaining)
+        rates.append(rate)
+        days_left.append(min(math.ceil(remaining / rate), MAX_PROJECTION_DAYS + 1) if remaining > 0 and rate > 0 else 0)
+    return percents, remainings, rates, days_left
+
+
+
+def numpy_projections(numpy, rows):
+    """
+    The same as python_projections, computed as array operations over all goals at once.
+    """
+    count = len(rows)
+    target, current, saved, elapsed = (numpy.fromiter((row[column] for row in rows), dtype=numpy.float64, count=count)
+                                       for column in range(2, 6))
+    has_target = target > 0
+    rate = saved / numpy.maximum(elapsed, 1.0)
+    remaining = numpy.where(has_target, numpy.maximum(target - current, 0.0), 0.0)
+    percents = numpy.divide(current * 100, target, out=numpy.zeros(count), where=has_target)
+    days_left = numpy.minimum(numpy.ceil(numpy.divide(remaining, rate, out=numpy.zeros(count), where=(remaining > 0) & (rate > 0))),
+                              MAX_PROJECTION_DAYS + 1)
+    # tolist() turns whole arrays back into Python numbers at once
+    return percents.tolist(), remaining.astype(numpy.int64).tolist(), rate.tolist(), days_left.astype(numpy.int64).tolist()
+
+
+
+def goal_progress(connection, on=None, use_numpy=None):
+    """
+    Report progress and projected completion of every financial goal.
+
+    The saving rate of a goal is what was added after its opening amount,
+    divided by the days since it was started (at least one). The projected
+    completion is the day the remaining amount is reached at that rate.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - on (date or str, optional): The day to project from. Defaults to today.
+    - use_numpy (bool, optional): Force the NumPy or plain Python computation.
+      By default NumPy is used when installed and there are NUMPY_MIN_GOALS goals or more.
+
+    Returns:
+    - progress (list): GoalProgress tuples in goal id order, amounts as Money.
+
+    Raises:
+    - ValueError: If on is not a valid date, or use_numpy is True without NumPy installed.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    on = periods.to_date(on)
+    rows = connection.execute(GOAL_HISTORY_QUERY, {"on": on.isoformat()}).fetchall()
+
+    numpy = None
+    if use_numpy or (use_numpy is None and len(rows) >= NUMPY_MIN_GOALS):
+        numpy = load_numpy()
+        if numpy is None and use_numpy:
+            raise ValueError("NumPy is not installed")
+    columns = numpy_projections(numpy, rows) if numpy is not None and rows else python_projections(rows)
+
+    progress = []
+    for (goal_id, name, target, current, _saved, _elapsed), percent, remaining, rate, days_left in zip(rows, *columns):
+        completion = None
+        if target <= 0:
+            status, percent = NO_TARGET, None
+        elif remaining == 0:
+            status = REACHED
+        elif days_left == 0 or days_left > MAX_PROJECTION_DAYS:
+            status = STALLED
+        else:
+            status, completion = PROJECTED, on + timedelta(days=days_left)
+        progress.append(GoalProgress(goal_id, name, Money(target), Money(current), Money(remaining), percent,
+                                     Money(round(rate)), completion, status))
+    return progress
+
+
+
+def overall_progress(progress):
+    """
+    Total the goals that have a target.
+
+    Parameters:
+    - progress (list): GoalProgress tuples from goal_progress.
+
+    Returns:
+    - totals (tuple): (current_amount, target_amount, progress_percent) with the
+      amounts as Money; progress_percent is None when no goal has a target.
+    """
+    current = sum((line.current_amount for line in progress if line.target_amount > 0), Money(0))
+    target = sum((line.target_amount for line in progress if line.target_amount > 0), Money(0))
+    return current, target, (current * 100 / target if target > 0 else None)
+
+
+
+def format_goal_progress(line):
+    """
+    Format a goal's progress for display.
+
+    Parameters:
+    - line (GoalProgress): The goal's progress.
+
+    Returns:
+    - text (str): e.g. "Goal Name: Car, Target Amount: 5000.00, Current Amount: 1250.00,
+      Progress: 25.00%, Remaining: 3750.00, Expected by 2027-03-14 at 25.00 a day".
+    """
+    text = "Goal Name: {}, Target Amount: {}, Current Amount: {}".format(line.goal_name, line.target_amount,
+                                                                         line.current_amount)
+    if line.status == NO_TARGET:
+        return text + ", no target set"
+    text += ", Progress: {:.2f}%, Remaining: {}".format(line.progress_percent, line.remaining)
+    if line.status == REACHED:
+        return text + ", goal reached"
+    if line.status == PROJECTED:
+        return text + ", Expected by {} at {} a day".format(line.projected_completion.isoformat(), line.daily_rate)
+    return text + ", not enough saved yet to project a date"
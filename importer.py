@@ -0,0 +1,465 @@
+"""
+Bulk import of bank statements (CSV, OFX and QIF) into the expense tracker.
+
+Rows are streamed from the file, mapped to the expenses/income schema and
+written in chunks with executemany, one transaction per chunk, instead of
+one INSERT and commit per row.
+
+Usage:
+    python importer.py statement.csv [--table auto|expenses|income] [--rules rules.csv]
+"""
+
+# Importing necessary modules
+import argparse
+import csv
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+
+import categories
+import database
+import migrations
+import periods
+import query_cache
+from money import to_cents
+
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_CATEGORY = "Uncategorized"
+
+# Date formats tried in order when reading a statement
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y%m%d%H%M%S", "%Y%m%d", "%d/%m/%Y", "%m/%d/%Y", "%m/%d/%y")
+
+# QIF files are written by US software and always put the month first
+QIF_DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d")
+
+# Column names accepted in CSV headers, lower case
+CSV_COLUMNS = {
+    "category": ("category",),
+    "item_name": ("item_name", "item", "description", "name", "payee", "memo"),
+    "amount": ("amount", "value", "total"),
+    "occurred_at": ("occurred_at", "date", "transaction date", "posted"),
+}
+
+INSERT_QUERY = ("INSERT INTO {} (category_id, item_name, amount, occurred_at) "
+                "VALUES (?, ?, ?, COALESCE(?, " + periods.NOW_SQL + "))")
+
+# A transaction read from a statement. amount is signed cents: negative amounts
+# are money going out. category and occurred_at may be None.
+Record = namedtuple("Record", ["category", "item_name", "amount", "occurred_at"])
+
+# A signed amount once currency symbols and spaces are dropped: digits,
+# optionally grouped in threes by "," or ".", and one to two decimals after
+# the last "," or "."
+AMOUNT_PATTERN = re.compile(r"([-+]?)(\d{1,3}([.,])\d{3}(?:\3\d{3})*|\d*)(?:([.,])(\d{1,2}))?")
+
+# An OFX tag and the text up to the next tag. OFX 1.x (SGML) leaves most
+# tags unclosed and puts no line breaks anywhere in particular.
+OFX_TOKEN = re.compile(r"<(/?[A-Za-z0-9.]+)>([^<]*)")
+OFX_CHUNK_SIZE = 64 * 1024
+
+ImportResult = namedtuple("ImportResult", ["expenses", "income", "skipped", "seconds"])
+
+
+
+class CategoryRules:
+    """
+    Map item names to categories with an ordered list of patterns.
+
+    The first pattern found in the item name (case-insensitive) wins.
+    """
+
+    def __init__(self, rules=(), default=DEFAULT_CATEGORY):
+        """
+        Parameters:
+        - rules (iterable): (pattern, category) pairs. Patterns are regular expressions.
+        - default (str): Category used when no rule matches.
+        """
+        self.rules = [(re.compile(pattern, re.IGNORECASE), category) for pattern, category in rules]
+        self.default = default
+
+    @classmethod
+    def from_file(cls, path, default=DEFAULT_CATEGORY):
+        """
+        Load rules from a CSV file of pattern,category lines.
+
+        Parameters:
+        - path (str): Path to the rules file.
+        - default (str): Category used when no rule matches.
+
+        Returns:
+        - rules (CategoryRules): The loaded rules.
+        """
+        with open(path, newline="", encoding="utf-8") as rules_file:
+            rows = [row for row in csv.reader(rules_file) if row and not row[0].startswith("#")]
+        return cls([(row[0], row[1]) for row in rows if len(row) >= 2], default)
+
+    def categorize(self, item_name):
+        """
+        Find the category for an item name.
+
+        Parameters:
+        - item_name (str): Name of the transaction.
+
+        Returns:
+        - category (str): The matching category, or the default.
+        """
+        for pattern, category in self.rules:
+            if pattern.search(item_name):
+                return category
+        return self.default
+
+
+
+def parse_amount(text):
+    """
+    Parse an amount such as "1,234.50", "1.234,50", "-12.00", "R 99.99" or "(45.00)".
+
+    The decimal separator is the last "," or "." followed by one or two
+    digits; any other "," or "." must group thousands.
+
+    Parameters:
+    - text (str): The amount as written in the statement.
+
+    Returns:
+    - amount (int): The signed amount in cents.
+
+    Raises:
+    - ValueError: If the text is not an amount, or its separators are ambiguous (e.g. "1.234.50").
+    """
+    text = text.strip()
+    negative = text.startswith("(") and text.endswith(")")
+    match = AMOUNT_PATTERN.fullmatch(re.sub(r"[^0-9.,\-+]", "", text))
+    if not match or not (match.group(2) or match.group(5)):
+        raise ValueError("Not an amount: {!r}".format(text))
+    sign, whole, group_separator, decimal_separator, decimals = match.groups()
+    if group_separator and group_separator == decimal_separator:
+        raise ValueError("Ambiguous amount: {!r}".format(text))
+    amount = to_cents("{}{}.{}".format(sign, whole.replace(group_separator or ",", "") or "0", decimals or "0"))
+    return -abs(amount) if negative else amount
+
+
+
+@lru_cache(maxsize=4096)
+def parse_date(text, formats=DATE_FORMATS):
+    """
+    Parse a statement date into the format used by the occurred_at column.
+
+    Statements repeat the same few hundred dates, so results are cached.
+
+    Parameters:
+    - text (str): The date as written in the statement.
+    - formats (tuple): strptime formats to try in order.
+
+    Returns:
+    - occurred_at (str): Date as "YYYY-MM-DD HH:MM:SS", or None if the text is empty.
+
+    Raises:
+    - ValueError: If the date does not match any known format.
+    """
+    text = text.strip().replace("'", "/")
+    if not text:
+        return None
+    # OFX dates may carry fractional seconds and a timezone, e.g. 20240131120000.000[-5:EST]
+    text = re.split(r"[.\[]", text)[0] if text[:8].isdigit() else text
+    for date_format in formats:
+        try:
+            return datetime.strptime(text, date_format).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    raise ValueError("Unrecognised date: {!r}".format(text))
+
+
+
+def read_csv(path):
+    """
+    Stream records from a CSV file with a header row.
+
+    Parameters:
+    - path (str): Path to the CSV file.
+
+    Returns:
+    - generator: Yields Record tuples, or None for rows that could not be parsed.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as csv_file:
+        reader = csv.reader(csv_file)
+        header = [name.strip().lower() for name in next(reader, [])]
+        positions = {}
+        for field, names in CSV_COLUMNS.items():
+            for name in names:
+                if name in header:
+                    positions[field] = header.index(name)
+                    break
+        if "amount" not in positions or "item_name" not in positions:
+            raise ValueError("CSV file needs an amount column and an item name/description column.")
+
+        def column(row, field):
+            index = positions.get(field)
+            return row[index].strip() if index is not None and index < len(row) else ""
+
+        for row in reader:
+            try:
+                yield Record(column(row, "category") or None, column(row, "item_name"),
+                             parse_amount(column(row, "amount")), parse_date(column(row, "occurred_at")))
+            except (ValueError, IndexError):
+                yield None
+
+
+
+def ofx_tokens(ofx_file):
+    """
+    Split an OFX stream into tags, whatever its line breaks.
+
+    Parameters:
+    - ofx_file (file): The statement, opened as text.
+
+    Returns:
+    - generator: Yields (tag, value) tuples, tags in upper case; closing tags as "/TAG".
+    """
+    pending = ""
+    while True:
+        chunk = ofx_file.read(OFX_CHUNK_SIZE)
+        text = pending + chunk
+        # The value of the last tag may go on in the next chunk
+        end = max(text.rfind("<"), 0) if chunk else len(text)
+        for tag, value in OFX_TOKEN.findall(text, 0, end):
+            yield tag.upper(), value.strip()
+        if not chunk:
+            return
+        pending = text[end:]
+
+
+
+def ofx_record(block):
+    """
+    Turn the tags of a STMTTRN block into a Record, or None if it cannot be parsed.
+    """
+    try:
+        return Record(None, block.get("NAME") or block.get("MEMO", ""),
+                      parse_amount(block["TRNAMT"]), parse_date(block.get("DTPOSTED", "")))
+    except (KeyError, ValueError):
+        return None
+
+
+
+def read_ofx(path):
+    """
+    Stream records from an OFX (or QFX) bank statement.
+
+    Every STMTTRN block is one record, however the file is split into lines.
+
+    Parameters:
+    - path (str): Path to the OFX file.
+
+    Returns:
+    - generator: Yields Record tuples, or None for transactions that could not be parsed.
+    """
+    with open(path, encoding="utf-8", errors="replace") as ofx_file:
+        block = None
+        for tag, value in ofx_tokens(ofx_file):
+            if tag == "STMTTRN":
+                if block is not None:
+                    # The previous block was never closed
+                    yield None
+                block = {}
+            elif tag == "/STMTTRN":
+                if block is not None:
+                    yield ofx_record(block)
+                block = None
+            elif block is not None and not tag.startswith("/"):
+                block[tag] = value
+        if block is not None:
+            yield None
+
+
+
+def read_qif(path):
+    """
+    Stream records from a QIF file.
+
+    Parameters:
+    - path (str): Path to the QIF file.
+
+    Returns:
+    - generator: Yields Record tuples, or None for entries that could not be parsed.
+    """
+    with open(path, encoding="utf-8", errors="replace") as qif_file:
+        entry = {}
+        for line in qif_file:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("!"):
+                continue
+            if line == "^":
+                try:
+                    yield Record(entry.get("L") or None, entry.get("P") or entry.get("M", ""),
+                                 parse_amount(entry["T"]), parse_date(entry.get("D", ""), QIF_DATE_FORMATS))
+                except (KeyError, ValueError):
+                    yield None
+                entry = {}
+            else:
+                entry[line[0]] = line[1:].strip()
+
+
+
+READERS = {".csv": read_csv, ".ofx": read_ofx, ".qfx": read_ofx, ".qif": read_qif}
+
+
+
+def read_statement(path):
+    """
+    Pick a reader from the file extension and stream its records.
+
+    Parameters:
+    - path (str): Path to a .csv, .ofx, .qfx or .qif file.
+
+    Returns:
+    - generator: Yields Record tuples, or None for rows that could not be parsed.
+
+    Raises:
+    - ValueError: If the file type is not supported.
+    """
+    extension = path[path.rfind("."):].lower() if "." in path else ""
+    if extension not in READERS:
+        raise ValueError("Unsupported statement type: {!r}".format(path))
+    return READERS[extension](path)
+
+
+
+def import_records(connection, records, table="auto", rules=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write records to the expenses and income tables in batches.
+
+    Each chunk is inserted with executemany inside a single transaction, so
+    the cost of a commit is paid once per chunk instead of once per row.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - records (iterable): Record tuples; None entries are counted as skipped.
+    - table (str): "expenses", "income", or "auto" to send negative amounts to
+      expenses and the rest to income.
+    - rules (CategoryRules, optional): Categories for records without one.
+    - chunk_size (int): Number of records per transaction.
+
+    Returns:
+    - result (ImportResult): Rows written to each table, rows skipped and elapsed seconds.
+
+    Raises:
+    - ValueError: If table is not "auto", "expenses" or "income".
+    - sqlite3.Error: If a chunk cannot be written. Earlier chunks stay committed.
+    """
+    if table not in ("auto", "expenses", "income"):
+        raise ValueError("Unknown import table: {!r}".format(table))
+    rules = rules or CategoryRules()
+    expenses_query = INSERT_QUERY.format("expenses")
+    income_query = INSERT_QUERY.format("income")
+    expense_count = income_count = skipped = 0
+    start = time.perf_counter()
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        expense_rows = []
+        income_rows = []
+        for record in chunk:
+            if record is None:
+                skipped += 1
+                continue
+            category = record.category or rules.categorize(record.item_name)
+            target = table if table != "auto" else ("expenses" if record.amount < 0 else "income")
+            row = (category, record.item_name, abs(record.amount), record.occurred_at)
+            (expense_rows if target == "expenses" else income_rows).append(row)
+        try:
+            with connection:
+                # New categories are added in the same transaction as the rows using them.
+                # Each name is looked up once per chunk; a statement uses only a few.
+                ids = {name: categories.category_id(connection, name)
+                       for name in dict.fromkeys(row[0] for row in expense_rows + income_rows)}
+                for rows in (expense_rows, income_rows):
+                    rows[:] = [(ids[row[0]],) + row[1:] for row in rows]
+                connection.executemany(expenses_query, expense_rows)
+                connection.executemany(income_query, income_rows)
+        except sqlite3.Error:
+            # The rollback may have removed categories whose ids are cached
+            query_cache.invalidate(connection)
+            raise
+        query_cache.tables_changed(connection, "expenses", "income")
+        expense_count += len(expense_rows)
+        income_count += len(income_rows)
+    return ImportResult(expense_count, income_count, skipped, time.perf_counter() - start)
+
+
+
+def import_file(connection, path, table="auto", rules=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Import a CSV, OFX or QIF statement file.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - path (str): Path to the statement file.
+    - table (str): "expenses", "income" or "auto" (see import_records).
+    - rules (CategoryRules, optional): Categories for records without one.
+    - chunk_size (int): Number of records per transaction.
+
+    Returns:
+    - result (ImportResult): Rows written to each table, rows skipped and elapsed seconds.
+    """
+    return import_records(connection, read_statement(path), table, rules, chunk_size)
+
+
+
+def format_result(result):
+    """
+    Summarise an import for display.
+
+    Parameters:
+    - result (ImportResult): The import result.
+
+    Returns:
+    - text (str): Summary including rows per second.
+    """
+    rows = result.expenses + result.income
+    rate = rows / result.seconds if result.seconds > 0 else float(rows)
+    return "Imported {} expenses and {} income rows ({} skipped) in {:.2f}s ({:,.0f} rows/s).".format(
+        result.expenses, result.income, result.skipped, result.seconds, rate)
+
+
+
+def main(argv=None):
+    """
+    Import statement files from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Import bank statements into the expense tracker.")
+    parser.add_argument("files", nargs="+", help="CSV, OFX or QIF files to import")
+    parser.add_argument("--database", default="expense_tracker.db", help="SQLite database file")
+    parser.add_argument("--table", default="auto", choices=("auto", "expenses", "income"),
+                        help="Target table; auto sends negative amounts to expenses")
+    parser.add_argument("--rules", help="CSV file of pattern,category rules")
+    parser.add_argument("--default-category", default=DEFAULT_CATEGORY, help="Category when no rule matches")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per transaction")
+    args = parser.parse_args(argv)
+
+    if args.rules:
+        rules = CategoryRules.from_file(args.rules, args.default_category)
+    else:
+        rules = CategoryRules(default=args.default_category)
+
+    connection = database.connect(args.database)
+    try:
+        migrations.migrate(connection)
+        for path in args.files:
+            try:
+                result = import_file(connection, path, args.table, rules, args.chunk_size)
+                print("{}: {}".format(path, format_result(result)))
+            except (OSError, ValueError, sqlite3.Error) as e:
+                print("Error importing {}: {}".format(path, e))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+Per-statement query statistics and a slow-query log.
+
+A QueryStats collects, for every distinct SQL statement run on the
+connections it opens, how often it ran, its total and longest time and the
+rows it returned (or changed, for writes). Its connect method is used in
+place of database.connect:
+
+    query_stats = QueryStats(slow_ms=50, slow_log="slow_queries.log")
+    connection_pool = pool.ConnectionPool(database_name, connect=query_stats.connect)
+    ...
+    print(format_report(query_stats))
+
+The time of a statement includes fetching its rows, because SQLite does
+most of the work of a query while rows are stepped through, not when it is
+executed. Statements that take slow_ms or longer are kept in a short list,
+appended to the slow-query log file if there is one, and, when explain is
+on, their EXPLAIN QUERY PLAN is captured once per statement.
+
+Statements are grouped by their text with whitespace collapsed, so the same
+query with different parameters counts as one. executescript is not recorded.
+"""
+
+# Importing necessary modules
+import os
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+import database
+
+
+# Totals for one statement; rows are rows returned by queries and rows changed by writes
+StatementStats = namedtuple("StatementStats", ["sql", "count", "total_ms", "max_ms", "rows"])
+
+# One run of a statement that took slow_ms or longer. plan is the EXPLAIN QUERY PLAN text, or None.
+SlowQuery = namedtuple("SlowQuery", ["logged_at", "sql", "elapsed_ms", "rows", "plan"])
+
+DEFAULT_SLOW_MS = 100
+
+# Slow queries kept in memory for the report; the log file keeps them all
+MAX_SLOW_QUERIES = 50
+
+# Environment variables that set the slow-query threshold in milliseconds and the log file
+SLOW_MS_ENVIRONMENT_VARIABLE = "BUDGET_TRACKER_SLOW_MS"
+SLOW_LOG_ENVIRONMENT_VARIABLE = "BUDGET_TRACKER_SLOW_LOG"
+
+# Only these statements are explained; EXPLAIN of a write is not useful here
+EXPLAINED_STATEMENTS = ("SELECT", "WITH")
+
+
+
+def normalize(sql):
+    """
+    Collapse whitespace so the same statement written differently counts once.
+    """
+    return " ".join(sql.split())
+
+
+
+class QueryStats:
+    """
+    Statement statistics shared by all connections it opened, safe to use from several threads.
+    """
+
+    def __init__(self, slow_ms=None, slow_log=None, explain=False):
+        """
+        Parameters:
+        - slow_ms (float, optional): Log statements taking this many milliseconds or longer.
+          Defaults to the BUDGET_TRACKER_SLOW_MS environment variable, then DEFAULT_SLOW_MS.
+        - slow_log (str, optional): File slow queries are appended to. Defaults to the
+          BUDGET_TRACKER_SLOW_LOG environment variable; without either there is no log file.
+        - explain (bool): Capture EXPLAIN QUERY PLAN of slow queries.
+
+        Raises:
+        - ValueError: If the threshold is not a number.
+        """
+        if slow_ms is None:
+            slow_ms = float(os.environ.get(SLOW_MS_ENVIRONMENT_VARIABLE) or DEFAULT_SLOW_MS)
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log or os.environ.get(SLOW_LOG_ENVIRONMENT_VARIABLE) or None
+        self.explain = explain
+        self.lock = threading.Lock()
+        self.totals = {}          # normalized sql -> [count, total_ms, max_ms, rows]
+        self.plans = {}           # normalized sql -> EXPLAIN QUERY PLAN text
+        self.slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+
+    def connect(self, database_name, profile=None, **options):
+        """
+        Open an instrumented connection. Takes the same arguments as database.connect.
+
+        Returns:
+        - connection (InstrumentedConnection): The configured connection.
+
+        Raises:
+        - ValueError: If the profile name is unknown.
+        - sqlite3.Error: If the database cannot be opened or configured.
+        """
+        options["factory"] = InstrumentedConnection
+        connection = database.connect(database_name, profile, **options)
+        connection.query_stats = self
+        return connection
+
+    def record(self, connection, sql, parameters, elapsed, rows):
+        """
+        Add one run of a statement, logging it if it was slow.
+
+        Parameters:
+        - connection (sqlite3.Connection): The connection it ran on, used for EXPLAIN QUERY PLAN.
+        - sql (str): The statement.
+        - parameters (tuple, dict or None): Its parameters, or None for executemany.
+        - elapsed (float): Seconds spent executing it and fetching its rows.
+        - rows (int): Rows returned or changed.
+
+        Returns:
+        - None
+        """
+        key = normalize(sql)
+        elapsed_ms = elapsed * 1000
+        with self.lock:
+            totals = self.totals.get(key)
+            if totals is None:
+                totals = self.totals[key] = [0, 0.0, 0.0, 0]
+            totals[0] += 1
+            totals[1] += elapsed_ms
+            totals[2] = max(totals[2], elapsed_ms)
+            totals[3] += rows
+            if elapsed_ms < self.slow_ms:
+                return
+            need_plan = self.explain and key not in self.plans and parameters is not None \
+                and key.upper().startswith(EXPLAINED_STATEMENTS)
+
+        # The plan is read outside the lock, on the connection the statement ran on
+        if need_plan:
+            plan = explain_query_plan(connection, sql, parameters)
+            with self.lock:
+                self.plans[key] = plan
+        with self.lock:
+            slow_query = SlowQuery(datetime.now().isoformat(sep=" ", timespec="seconds"), key, elapsed_ms, rows,
+                                   self.plans.get(key))
+            self.slow_queries.append(slow_query)
+            if self.slow_log:
+                try:
+                    with open(self.slow_log, "a") as log:
+                        log.write(format_slow_query(slow_query) + "\n")
+                except OSError as e:
+                    print("Error writing slow query log:", e)
+
+    def statements(self, order_by="total_ms"):
+        """
+        Statistics of every statement run so far.
+
+        Parameters:
+        - order_by (str): StatementStats field to sort by, largest first.
+
+        Returns:
+        - statements (list): StatementStats tuples.
+        """
+        with self.lock:
+            statements = [StatementStats(sql, *totals) for sql, totals in self.totals.items()]
+        return sorted(statements, key=lambda statement: getattr(statement, order_by), reverse=True)
+
+    def slow(self):
+        """
+        The most recent slow queries, oldest first.
+
+        Returns:
+        - slow_queries (list): SlowQuery tuples.
+        """
+        with self.lock:
+            return list(self.slow_queries)
+
+    def reset(self):
+        """
+        Forget all statistics and slow queries. The log file is kept.
+
+        Returns:
+        - None
+        """
+        with self.lock:
+            self.totals.clear()
+            self.plans.clear()
+            self.slow_queries.clear()
+
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    A cursor that reports each statement it runs to its connection's QueryStats.
+
+    A statement is reported when its rows have all been fetched, when the
+    cursor runs another statement or is closed, or when it is garbage collected.
+    """
+
+    statement = None
+
+    def execute(self, sql, parameters=()):
+        self.finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self.start_statement(sql, parameters, time.perf_counter() - start)
+        # Writes and other statements without rows are done once executed
+        if self.description is None:
+            self.finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self.finish()
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self.start_statement(sql, None, time.perf_counter() - start)
+        self.finish()
+        return self
+
+    def start_statement(self, sql, parameters, elapsed):
+        self.statement = sql
+        self.parameters = parameters
+        self.elapsed = elapsed
+        self.rows = 0
+
+    def finish(self):
+        """
+        Report the current statement, if it has not been reported yet.
+        """
+        query_stats = self.connection.query_stats
+        if self.statement is None or query_stats is None:
+            # query_stats is set once connect has configured the connection
+            return
+        sql, self.statement = self.statement, None
+        rows = self.rows
+        if self.description is None and self.rowcount > 0:
+            rows = self.rowcount
+        query_stats.record(self.connection, sql, self.parameters, self.elapsed, rows)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self.statement is not None:
+            self.elapsed += time.perf_counter() - start
+            if row is None:
+                self.finish()
+            else:
+                self.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        if self.statement is not None:
+            self.elapsed += time.perf_counter() - start
+            self.rows += len(rows)
+            if len(rows) < size:
+                self.finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self.statement is not None:
+            self.elapsed += time.perf_counter() - start
+            self.rows += len(rows)
+            self.finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            if self.statement is not None:
+                self.elapsed += time.perf_counter() - start
+                self.finish()
+            raise
+        if self.statement is not None:
+            self.elapsed += time.perf_counter() - start
+            self.rows += 1
+        return row
+
+    def close(self):
+        self.finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self.finish()
+        except Exception:
+            # The connection may already be closed, or the interpreter shutting down
+            pass
+
+
+
+class InstrumentedConnection(database.Connection):
+    """
+    The connection class of QueryStats.connect: every statement runs on an InstrumentedCursor.
+    """
+
+    query_stats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+
+def explain_query_plan(connection, sql, parameters):
+    """
+    Read the query plan of a statement.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - sql (str): A SELECT statement.
+    - parameters (tuple or dict): Its parameters.
+
+    Returns:
+    - plan (str or None): One line per plan step, indented by depth, or None if it cannot be read.
+    """
+    try:
+        # sqlite3.Connection.execute uses a plain cursor, so the EXPLAIN itself is not recorded
+        steps = sqlite3.Connection.execute(connection, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    except sqlite3.Error:
+        return None
+    depths = {0: -1}
+    lines = []
+    for step_id, parent, _unused, detail in steps:
+        depths[step_id] = depths.get(parent, -1) + 1
+        lines.append("  " * depths[step_id] + detail)
+    return "\n".join(lines)
+
+
+
+def format_slow_query(slow_query):
+    """
+    Format a slow query for the log file and the report.
+
+    Returns:
+    - text (str): Time, duration, rows and statement on one line, then the indented plan if any.
+    """
+    text = "{} {:.1f} ms {} rows: {}".format(slow_query.logged_at, slow_query.elapsed_ms, slow_query.rows, slow_query.sql)
+    if slow_query.plan:
+        text += "\n" + "\n".join("    " + line for line in slow_query.plan.splitlines())
+    return text
+
+
+
+def format_report(query_stats, limit=20, width=100):
+    """
+    Format the statistics as text: the statements taking the most time, then the recent slow queries.
+
+    Parameters:
+    - query_stats (QueryStats): The statistics.
+    - limit (int): Show at most this many statements.
+    - width (int): Shorten statements to this many characters in the table.
+
+    Returns:
+    - text (str): The report.
+    """
+    statements = query_stats.statements()
+    count = sum(statement.count for statement in statements)
+    total_ms = sum(statement.total_ms for statement in statements)
+    lines = ["{:,} statements ({} distinct) in {:.1f} ms; slow query threshold {} ms".format(
+        count, len(statements), total_ms, query_stats.slow_ms)]
+    if statements:
+        lines.append("")
+        lines.append("{:>8} {:>11} {:>9} {:>9} {:>10}  {}".format("count", "total ms", "mean ms", "max ms", "rows", "statement"))
+        for statement in statements[:limit]:
+            sql = statement.sql if len(statement.sql) <= width else statement.sql[:width - 3] + "..."
+            lines.append("{:>8,} {:>11.2f} {:>9.2f} {:>9.2f} {:>10,}  {}".format(
+                statement.count, statement.total_ms, statement.total_ms / statement.count, statement.max_ms,
+                statement.rows, sql))
+        if len(statements) > limit:
+            lines.append("... and {} more".format(len(statements) - limit))
+    slow_queries = query_stats.slow()
+    if slow_queries:
+        lines.append("")
+        lines.append("Slow queries (most recent last):")
+        lines.extend(format_slow_query(slow_query) for slow_query in slow_queries)
+    return "\n".join(lines)
@@ -0,0 +1,699 @@
+"""
+Versioned schema migrations for the expense tracker database.
+
+The schema version is stored in PRAGMA user_version. Each migration runs in
+its own transaction together with the version bump, so a database is never
+left half upgraded.
+"""
+
+# Importing necessary module
+import sqlite3
+
+import categories
+import periods
+
+
+
+def create_initial_schema(cursor):
+    """
+    Migration 1: the original tables.
+
+    Uses CREATE TABLE IF NOT EXISTS so databases created before migrations
+    existed (user_version 0 with the tables already present) upgrade cleanly.
+    """
+    # Create table for expenses
+    cursor.execute('''CREATE TABLE IF NOT EXISTS expenses (
+                    id INTEGER PRIMARY KEY,
+                    category TEXT,
+                    item_name TEXT,
+                    amount REAL)''')
+    # Create table for income
+    cursor.execute('''CREATE TABLE IF NOT EXISTS income (
+                    id INTEGER PRIMARY KEY,
+                    category TEXT,
+                    item_name TEXT,
+                    amount REAL)''')
+    # Create table for budgets with a unique constraint
+    cursor.execute('''CREATE TABLE IF NOT EXISTS budgets (
+                    category TEXT PRIMARY KEY,
+                    budget REAL)''')
+    # Create table for financial goals
+    cursor.execute('''CREATE TABLE IF NOT EXISTS financial_goals (
+                    id INTEGER PRIMARY KEY,
+                    goal_name TEXT,
+                    target_amount REAL,
+                    current_amount REAL)''')
+
+
+
+def rebuild_table(cursor, table, create_sql, select_sql):
+    """
+    Rebuild a table with a new definition, keeping its rows.
+
+    SQLite cannot change column types or add columns with non-constant
+    defaults, so the table is recreated under a temporary name, filled from
+    the old table and renamed into place.
+
+    Parameters:
+    - cursor (sqlite3.Cursor): Cursor inside the migration transaction.
+    - table (str): Name of the table to rebuild.
+    - create_sql (str): CREATE TABLE statement for the new table, with {table} in place of the name.
+    - select_sql (str): SELECT over the old table returning rows in the new column order.
+
+    Returns:
+    - None
+    """
+    new_table = table + "_new"
+    cursor.execute(create_sql.format(table=new_table))
+    cursor.execute("INSERT INTO {} {}".format(new_table, select_sql))
+    cursor.execute("DROP TABLE {}".format(table))
+    cursor.execute("ALTER TABLE {} RENAME TO {}".format(new_table, table))
+
+
+
+def add_dates_and_indexes(cursor):
+    """
+    Migration 2: transaction timestamps and covering indexes.
+
+    Adds an occurred_at column to expenses and income (existing rows keep
+    NULL because their dates are unknown) and indexes so per-category sums and
+    period filters are answered from an index instead of a table scan.
+    """
+    for table in ("expenses", "income"):
+        rebuild_table(cursor, table, '''CREATE TABLE {table} (
+                        id INTEGER PRIMARY KEY,
+                        category TEXT,
+                        item_name TEXT,
+                        amount REAL,
+                        occurred_at TEXT DEFAULT CURRENT_TIMESTAMP)''',
+                      "SELECT id, category, item_name, amount, NULL FROM {}".format(table))
+        create_transaction_indexes(cursor, table)
+
+
+
+def category_column(by_id):
+    """
+    The category column of the transaction and derived tables: the name
+    before migration 10 (add_categories), the categories id after it.
+    """
+    return "category_id" if by_id else "category"
+
+
+
+def category_key(by_id, row=None):
+    """
+    The SQL expression a row's category is grouped and matched by.
+
+    Parameters:
+    - by_id (bool): Categories are referenced by id (see add_categories).
+    - row (str, optional): "NEW" or "OLD" inside a trigger; None for the table's own column.
+
+    Returns:
+    - sql (str): e.g. "COALESCE(NEW.category, '')" or "NEW.category_id".
+    """
+    column = (row + "." if row else "") + category_column(by_id)
+    return column if by_id else "COALESCE({}, '')".format(column)
+
+
+
+def create_transaction_indexes(cursor, table, by_id=False):
+    """
+    Create the covering indexes of a transaction table.
+
+    Parameters:
+    - cursor (sqlite3.Cursor): Cursor inside the migration transaction.
+    - table (str): "expenses" or "income".
+    - by_id (bool): Index category_id instead of the category name (see add_categories).
+
+    Returns:
+    - None
+    """
+    column = category_column(by_id)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_{0}_category_amount ON {0} ({1}, amount)".format(table, column))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_{0}_occurred_at ON {0} (occurred_at, {1}, amount)".format(table, column))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_{0}_category_occurred_at ON {0} ({1}, occurred_at, amount)".format(table, column))
+
+
+
+def convert_amounts_to_cents(cursor):
+    """
+    Migration 3: store every amount as INTEGER cents instead of REAL.
+
+    Existing values are rounded to the nearest cent. Sums over INTEGER
+    columns are exact and cheaper than floating point sums.
+    """
+    for table in ("expenses", "income"):
+        rebuild_table(cursor, table, '''CREATE TABLE {table} (
+                        id INTEGER PRIMARY KEY,
+                        category TEXT,
+                        item_name TEXT,
+                        amount INTEGER,
+                        occurred_at TEXT DEFAULT CURRENT_TIMESTAMP)''',
+                      "SELECT id, category, item_name, CAST(ROUND(amount * 100) AS INTEGER), occurred_at FROM {}".format(table))
+        create_transaction_indexes(cursor, table)
+    rebuild_table(cursor, "budgets", '''CREATE TABLE {table} (
+                    category TEXT PRIMARY KEY,
+                    budget INTEGER)''',
+                  "SELECT category, CAST(ROUND(budget * 100) AS INTEGER) FROM budgets")
+    rebuild_table(cursor, "financial_goals", '''CREATE TABLE {table} (
+                    id INTEGER PRIMARY KEY,
+                    goal_name TEXT,
+                    target_amount INTEGER,
+                    current_amount INTEGER)''',
+                  "SELECT id, goal_name, CAST(ROUND(target_amount * 100) AS INTEGER), "
+                  "CAST(ROUND(current_amount * 100) AS INTEGER) FROM financial_goals")
+
+
+
+
+def create_category_total_triggers(cursor, table, by_id=False):
+    """
+    Create the triggers that keep category_totals in step with a transaction table.
+
+    Parameters:
+    - cursor (sqlite3.Cursor): Cursor inside the migration transaction.
+    - table (str): "expenses" or "income".
+    - by_id (bool): Key the totals by category_id (see add_categories).
+
+    Returns:
+    - None
+    """
+    column = category_column(by_id)
+    add = '''INSERT INTO category_totals (kind, {column}, total, entries)
+                VALUES ('{table}', {new}, COALESCE(NEW.amount, 0), 1)
+                ON CONFLICT (kind, {column}) DO UPDATE
+                SET total = total + excluded.total, entries = entries + 1;'''.format(
+        table=table, column=column, new=category_key(by_id, "NEW"))
+    remove = '''UPDATE category_totals
+                SET total = total - COALESCE(OLD.amount, 0), entries = entries - 1
+                WHERE kind = '{table}' AND {column} = {old};
+            DELETE FROM category_totals
+                WHERE kind = '{table}' AND {column} = {old} AND entries = 0;'''.format(
+        table=table, column=column, old=category_key(by_id, "OLD"))
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_totals_insert AFTER INSERT ON {0} BEGIN {1} END".format(table, add))
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_totals_delete AFTER DELETE ON {0} BEGIN {1} END".format(table, remove))
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_totals_update AFTER UPDATE OF {1}, amount ON {0} "
+                   "BEGIN {2} {3} END".format(table, column, remove, add))
+
+
+
+def add_category_totals(cursor):
+    """
+    Migration 4: a category_totals table maintained by triggers.
+
+    Holds the running total and row count of every category of expenses and
+    income, so budget checks read one row per category instead of summing
+    the whole history.
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS category_totals (
+                    kind TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    entries INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (kind, category))''')
+    for table in ("expenses", "income"):
+        cursor.execute('''INSERT INTO category_totals (kind, category, total, entries)
+                        SELECT '{0}', COALESCE(category, ''), COALESCE(SUM(amount), 0), COUNT(*)
+                        FROM {0} GROUP BY COALESCE(category, '')'''.format(table))
+        create_category_total_triggers(cursor, table)
+
+
+
+def add_budget_periods(cursor):
+    """
+    Migration 5: monthly and weekly budget periods.
+
+    Budgets gain a period column (existing budgets become monthly) and the
+    transaction tables gain a (category, occurred_at, amount) index, so the
+    spending of one category in one period is a single index range scan.
+    """
+    cursor.execute("ALTER TABLE budgets ADD COLUMN period TEXT NOT NULL DEFAULT 'monthly' "
+                   "CHECK (period IN ('monthly', 'weekly'))")
+    for table in ("expenses", "income"):
+        create_transaction_indexes(cursor, table)
+
+
+def create_rollup_triggers(cursor, table, archived=False, by_id=False):
+    """
+    Create the triggers that keep monthly_rollups in step with a transaction table.
+
+    An insert folds the new row into its month. A delete or update cannot
+    undo a minimum or maximum, so the affected months are recomputed from
+    the rows of that month only.
+
+    Parameters:
+    - cursor (sqlite3.Cursor): Cursor inside the migration transaction.
+    - table (str): "expenses" or "income".
+    - archived (bool): Recompute months from their rows together with their
+      archived_summaries row (see add_archives).
+    - by_id (bool): Key the rollups by category_id (see add_categories).
+
+    Returns:
+    - None
+    """
+    add = '''INSERT INTO monthly_rollups (kind, period, {column}, total, entries, min_amount, max_amount)
+                VALUES ('{table}', substr(NEW.occurred_at, 1, 7), {key},
+                        COALESCE(NEW.amount, 0), 1, NEW.amount, NEW.amount)
+                ON CONFLICT (kind, period, {column}) DO UPDATE
+                SET total = total + excluded.total, entries = entries + 1,
+                    min_amount = MIN(COALESCE(min_amount, excluded.min_amount), COALESCE(excluded.min_amount, min_amount)),
+                    max_amount = MAX(COALESCE(max_amount, excluded.max_amount), COALESCE(excluded.max_amount, max_amount));'''
+    recompute = '''DELETE FROM monthly_rollups
+                WHERE kind = '{table}' AND period = substr({row}.occurred_at, 1, 7) AND {column} = {key};
+            INSERT INTO monthly_rollups (kind, period, {column}, total, entries, min_amount, max_amount)
+                SELECT '{table}', substr({row}.occurred_at, 1, 7), {source},
+                       COALESCE(SUM(amount), 0), COUNT(*), MIN(amount), MAX(amount)
+                FROM {table}
+                WHERE occurred_at >= substr({row}.occurred_at, 1, 7) || '-01'
+                  AND occurred_at < date(substr({row}.occurred_at, 1, 7) || '-01', '+1 month')
+                  AND {source} = {key}
+                GROUP BY {source};'''
+    if archived:
+        recompute = '''DELETE FROM monthly_rollups
+                WHERE kind = '{table}' AND period = substr({row}.occurred_at, 1, 7) AND {column} = {key};
+            INSERT INTO monthly_rollups (kind, period, {column}, total, entries, min_amount, max_amount)
+                SELECT '{table}', period, {column}, SUM(total), SUM(entries), MIN(min_amount), MAX(max_amount)
+                FROM (SELECT substr({row}.occurred_at, 1, 7) AS period, {source} AS {column},
+                             COALESCE(SUM(amount), 0) AS total, COUNT(*) AS entries,
+                             MIN(amount) AS min_amount, MAX(amount) AS max_amount
+                      FROM {table}
+                      WHERE occurred_at >= substr({row}.occurred_at, 1, 7) || '-01'
+                        AND occurred_at < date(substr({row}.occurred_at, 1, 7) || '-01', '+1 month')
+                        AND {source} = {key}
+                      GROUP BY {source}
+                      UNION ALL
+                      SELECT period, {column}, total, entries, min_amount, max_amount
+                      FROM archived_summaries
+                      WHERE kind = '{table}' AND period = substr({row}.occurred_at, 1, 7)
+                        AND {column} = {key})
+                GROUP BY period, {column};'''
+    column = category_column(by_id)
+    source = category_key(by_id)
+
+    def recompute_for(row):
+        return recompute.format(table=table, row=row, column=column, source=source, key=category_key(by_id, row))
+
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_rollups_insert AFTER INSERT ON {0} "
+                   "WHEN NEW.occurred_at IS NOT NULL BEGIN {1} END".format(
+                       table, add.format(table=table, column=column, key=category_key(by_id, "NEW"))))
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_rollups_delete AFTER DELETE ON {0} "
+                   "WHEN OLD.occurred_at IS NOT NULL BEGIN {1} END".format(table, recompute_for("OLD")))
+    # Recompute the old month when the row had a date and the new month when it has one
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_rollups_update_old AFTER UPDATE OF {1}, amount, occurred_at ON {0} "
+                   "WHEN OLD.occurred_at IS NOT NULL BEGIN {2} END".format(table, column, recompute_for("OLD")))
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_rollups_update_new AFTER UPDATE OF {1}, amount, occurred_at ON {0} "
+                   "WHEN NEW.occurred_at IS NOT NULL BEGIN {2} END".format(table, column, recompute_for("NEW")))
+
+
+
+# The monthly rollups of one table; format with the table and its category_key
+ROLLUP_SOURCE_QUERY = '''
+    SELECT '{0}', substr(occurred_at, 1, 7), {1},
+           COALESCE(SUM(amount), 0), COUNT(*), MIN(amount), MAX(amount)
+    FROM {0}
+    WHERE occurred_at IS NOT NULL
+    GROUP BY substr(occurred_at, 1, 7), {1}'''
+
+
+
+def add_monthly_rollups(cursor):
+    """
+    Migration 6: a monthly_rollups table maintained by triggers.
+
+    Holds the sum, count, smallest and largest amount of every category of
+    expenses and income per calendar month ("YYYY-MM"), so trend reports
+    read one row per month and category instead of every transaction. Rows
+    without a date are left out.
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS monthly_rollups (
+                    kind TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    entries INTEGER NOT NULL DEFAULT 0,
+                    min_amount INTEGER,
+                    max_amount INTEGER,
+                    PRIMARY KEY (kind, period, category))''')
+    for table in ("expenses", "income"):
+        cursor.execute("INSERT INTO monthly_rollups (kind, period, category, total, entries, min_amount, max_amount) "
+                       + ROLLUP_SOURCE_QUERY.format(table, category_key(False)))
+        create_rollup_triggers(cursor, table)
+
+
+
+def fts5_available(cursor):
+    """
+    Check whether this SQLite library was built with the FTS5 extension.
+    """
+    return any(option == "ENABLE_FTS5" for (option,) in cursor.execute("PRAGMA compile_options").fetchall())
+
+
+
+def create_search_triggers(cursor, table, by_id=False):
+    """
+    Create the triggers that keep a {table}_search index in step with its table.
+
+    Parameters:
+    - cursor (sqlite3.Cursor): Cursor inside the migration transaction.
+    - table (str): "expenses" or "income".
+    - by_id (bool): Index the name of the row's category_id (see add_categories).
+
+    Returns:
+    - None
+    """
+    category = "(SELECT name FROM categories WHERE id = {0}.category_id)" if by_id else "{0}.category"
+    add = "INSERT INTO {0}_search (rowid, item_name, category) VALUES (NEW.id, NEW.item_name, {1});"
+    remove = ("INSERT INTO {0}_search ({0}_search, rowid, item_name, category) "
+              "VALUES ('delete', OLD.id, OLD.item_name, {1});")
+    add = add.format(table, category.format("NEW"))
+    remove = remove.format(table, category.format("OLD"))
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_search_insert AFTER INSERT ON {0} BEGIN {1} END".format(table, add))
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_search_delete AFTER DELETE ON {0} BEGIN {1} END".format(table, remove))
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS {0}_search_update AFTER UPDATE OF item_name, {1} ON {0} "
+                   "BEGIN {2} {3} END".format(table, category_column(by_id), remove, add))
+
+
+
+def add_search_indexes(cursor):
+    """
+    Migration 7: full-text search over item names and categories.
+
+    Each transaction table gets an FTS5 index ({table}_search) that stores
+    only the index and reads the text back from the table itself
+    (content=), filled from the existing rows and kept in step by triggers.
+    SQLite builds without FTS5 skip this; search.py then falls back to LIKE.
+    """
+    if not fts5_available(cursor):
+        return
+    for table in ("expenses", "income"):
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS {0}_search USING fts5 ("
+                       "item_name, category, content='{0}', content_rowid='id', "
+                       "tokenize='unicode61 remove_diacritics 2')".format(table))
+        cursor.execute("INSERT INTO {0}_search ({0}_search) VALUES ('rebuild')".format(table))
+        create_search_triggers(cursor, table)
+
+
+
+def add_goal_contributions(cursor):
+    """
+    Migration 8: a history of contributions to each financial goal.
+
+    Every change to a goal's current_amount is recorded in
+    goal_contributions by a trigger, so goal_analytics can project when a
+    goal will be reached from how fast it has been filling. A new goal's
+    starting amount is recorded as its opening row, and existing goals get
+    one from their current amount.
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS goal_contributions (
+                    id INTEGER PRIMARY KEY,
+                    goal_id INTEGER NOT NULL,
+                    amount INTEGER NOT NULL,
+                    contributed_at TEXT NOT NULL,
+                    opening INTEGER NOT NULL DEFAULT 0)''')
+    # Covers the per-goal aggregate in goal_analytics
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_goal_contributions_goal "
+                   "ON goal_contributions (goal_id, opening, contributed_at, amount)")
+    cursor.execute("INSERT INTO goal_contributions (goal_id, amount, contributed_at, opening) "
+                   "SELECT id, COALESCE(current_amount, 0), {}, 1 FROM financial_goals".format(periods.NOW_SQL))
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS financial_goals_opening AFTER INSERT ON financial_goals BEGIN
+                    INSERT INTO goal_contributions (goal_id, amount, contributed_at, opening)
+                    VALUES (NEW.id, COALESCE(NEW.current_amount, 0), {}, 1);
+                END'''.format(periods.NOW_SQL))
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS financial_goals_contribution AFTER UPDATE OF current_amount ON financial_goals
+                WHEN COALESCE(NEW.current_amount, 0) <> COALESCE(OLD.current_amount, 0) BEGIN
+                    INSERT INTO goal_contributions (goal_id, amount, contributed_at)
+                    VALUES (NEW.id, COALESCE(NEW.current_amount, 0) - COALESCE(OLD.current_amount, 0), {});
+                END'''.format(periods.NOW_SQL))
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS financial_goals_delete AFTER DELETE ON financial_goals BEGIN
+                    DELETE FROM goal_contributions WHERE goal_id = OLD.id;
+                END''')
+
+
+
+def add_archives(cursor):
+    """
+    Migration 9: archiving closed years into separate files (see archive.py).
+
+    Archived transactions leave the expenses and income tables. What they
+    added up to stays behind in archived_summaries, one row per kind, month
+    and category like monthly_rollups, so category totals and trend reports
+    still cover them and rebuilding the derived tables does not lose them.
+    The archives table lists the archive file of every archived year. The
+    rollup triggers are recreated to take the summaries into account when a
+    month is recomputed.
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS archived_summaries (
+                    kind TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    entries INTEGER NOT NULL DEFAULT 0,
+                    min_amount INTEGER,
+                    max_amount INTEGER,
+                    PRIMARY KEY (kind, period, category))''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS archives (
+                    year INTEGER PRIMARY KEY,
+                    file_name TEXT NOT NULL,
+                    expenses INTEGER NOT NULL DEFAULT 0,
+                    income INTEGER NOT NULL DEFAULT 0,
+                    archived_at TEXT NOT NULL)''')
+    for table in ("expenses", "income"):
+        for trigger in ("delete", "update_old", "update_new"):
+            cursor.execute("DROP TRIGGER IF EXISTS {}_rollups_{}".format(table, trigger))
+        create_rollup_triggers(cursor, table, archived=True)
+
+
+
+# The triggers on expenses and income, without the table name
+TRANSACTION_TRIGGERS = ("totals_insert", "totals_delete", "totals_update", "rollups_insert", "rollups_delete",
+                        "rollups_update_old", "rollups_update_new", "search_insert", "search_delete", "search_update")
+
+
+
+def add_categories(cursor):
+    """
+    Migration 10: a categories table referenced by integer id.
+
+    Every category name is stored once in categories, and expenses, income,
+    budgets and the derived tables refer to it by category_id instead of
+    repeating the name, so rows are smaller and joins and GROUP BYs compare
+    integers. Transactions without a category get the category named "".
+    The default categories are added first, so categories added by the user
+    are remembered alongside them (see categories.py). The tables are
+    rebuilt with their indexes, totals, rollup and search triggers keyed by
+    id; the search indexes read category names through a view.
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS categories (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE)''')
+    cursor.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)",
+                       [(name,) for name in categories.DEFAULT_CATEGORIES])
+    cursor.execute('''INSERT OR IGNORE INTO categories (name)
+                    SELECT COALESCE(category, '') FROM expenses UNION SELECT COALESCE(category, '') FROM income
+                    UNION SELECT COALESCE(category, '') FROM budgets UNION SELECT category FROM category_totals
+                    UNION SELECT category FROM monthly_rollups UNION SELECT category FROM archived_summaries
+                    ORDER BY 1''')
+
+    # Triggers and search indexes would block renaming the rebuilt tables into place
+    for table in ("expenses", "income"):
+        for trigger in TRANSACTION_TRIGGERS:
+            cursor.execute("DROP TRIGGER IF EXISTS {}_{}".format(table, trigger))
+        cursor.execute("DROP TABLE IF EXISTS {}_search".format(table))
+
+    for table in ("expenses", "income"):
+        rebuild_table(cursor, table, '''CREATE TABLE {table} (
+                        id INTEGER PRIMARY KEY,
+                        category_id INTEGER NOT NULL REFERENCES categories (id),
+                        item_name TEXT,
+                        amount INTEGER,
+                        occurred_at TEXT DEFAULT CURRENT_TIMESTAMP)''',
+                      "SELECT t.id, c.id, t.item_name, t.amount, t.occurred_at FROM {} AS t "
+                      "JOIN categories AS c ON c.name = COALESCE(t.category, '') ORDER BY t.id".format(table))
+        create_transaction_indexes(cursor, table, by_id=True)
+    rebuild_table(cursor, "budgets", '''CREATE TABLE {table} (
+                    category_id INTEGER PRIMARY KEY REFERENCES categories (id),
+                    budget INTEGER,
+                    period TEXT NOT NULL DEFAULT 'monthly' CHECK (period IN ('monthly', 'weekly')))''',
+                  "SELECT c.id, b.budget, b.period FROM budgets AS b JOIN categories AS c ON c.name = COALESCE(b.category, '')")
+    rebuild_table(cursor, "category_totals", '''CREATE TABLE {table} (
+                    kind TEXT NOT NULL,
+                    category_id INTEGER NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    entries INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (kind, category_id))''',
+                  "SELECT t.kind, c.id, t.total, t.entries FROM category_totals AS t "
+                  "JOIN categories AS c ON c.name = t.category")
+    for summary_table in ("monthly_rollups", "archived_summaries"):
+        rebuild_table(cursor, summary_table, '''CREATE TABLE {table} (
+                        kind TEXT NOT NULL,
+                        period TEXT NOT NULL,
+                        category_id INTEGER NOT NULL,
+                        total INTEGER NOT NULL DEFAULT 0,
+                        entries INTEGER NOT NULL DEFAULT 0,
+                        min_amount INTEGER,
+                        max_amount INTEGER,
+                        PRIMARY KEY (kind, period, category_id))''',
+                      "SELECT s.kind, s.period, c.id, s.total, s.entries, s.min_amount, s.max_amount FROM {} AS s "
+                      "JOIN categories AS c ON c.name = s.category".format(summary_table))
+
+    search = fts5_available(cursor)
+    for table in ("expenses", "income"):
+        create_category_total_triggers(cursor, table, by_id=True)
+        create_rollup_triggers(cursor, table, archived=True, by_id=True)
+        if not search:
+            continue
+        cursor.execute("CREATE VIEW IF NOT EXISTS {0}_search_content AS "
+                       "SELECT t.id, t.item_name, c.name AS category FROM {0} AS t "
+                       "JOIN categories AS c ON c.id = t.category_id".format(table))
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS {0}_search USING fts5 ("
+                       "item_name, category, content='{0}_search_content', content_rowid='id', "
+                       "tokenize='unicode61 remove_diacritics 2')".format(table))
+        cursor.execute("INSERT INTO {0}_search ({0}_search) VALUES ('rebuild')".format(table))
+        create_search_triggers(cursor, table, by_id=True)
+
+
+
+def add_archive_runs(cursor):
+    """
+    Migration 11: number the runs that archive a year.
+
+    Every archive_year call copies a year's rows into its archive file
+    under a new run number before deleting them from the main database (see
+    archive.py). archives.last_run is the last run whose rows were deleted,
+    so rows of a later run in the file belong to a run that was interrupted
+    and are copied again rather than kept twice.
+    """
+    cursor.execute("ALTER TABLE archives ADD COLUMN last_run INTEGER NOT NULL DEFAULT 0")
+
+
+
+def use_local_time_default(cursor):
+    """
+    Migration 12: default occurred_at to local time.
+
+    The application stamps new rows with periods.NOW_SQL, the local time,
+    but the column default was CURRENT_TIMESTAMP, which is UTC, so inserts
+    that left occurred_at out were dated hours off. expenses and income are
+    rebuilt with the local time as their default. Their triggers and the
+    views the search indexes read are recreated; the search indexes
+    themselves stay valid, as no id or text changes.
+    """
+    for table in ("expenses", "income"):
+        search = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = ?",
+                                (table + "_search_content",)).fetchone()
+        for trigger in TRANSACTION_TRIGGERS:
+            cursor.execute("DROP TRIGGER IF EXISTS {}_{}".format(table, trigger))
+        cursor.execute("DROP VIEW IF EXISTS {}_search_content".format(table))
+        rebuild_table(cursor, table, '''CREATE TABLE {table} (
+                        id INTEGER PRIMARY KEY,
+                        category_id INTEGER NOT NULL REFERENCES categories (id),
+                        item_name TEXT,
+                        amount INTEGER,
+                        occurred_at TEXT DEFAULT (''' + periods.NOW_SQL + '''))''',
+                      "SELECT id, category_id, item_name, amount, occurred_at FROM {} ORDER BY id".format(table))
+        create_transaction_indexes(cursor, table, by_id=True)
+        create_category_total_triggers(cursor, table, by_id=True)
+        create_rollup_triggers(cursor, table, archived=True, by_id=True)
+        if search:
+            cursor.execute("CREATE VIEW {0}_search_content AS "
+                           "SELECT t.id, t.item_name, c.name AS category FROM {0} AS t "
+                           "JOIN categories AS c ON c.id = t.category_id".format(table))
+            create_search_triggers(cursor, table, by_id=True)
+
+
+
+def add_category_id_indexes(cursor):
+    """
+    Migration 13: index transactions by category in id order.
+
+    An index on category_id alone is ordered by (category_id, id), so the
+    transactions of one category can be read a page at a time by seeking on
+    the id (see reports.transaction_page) without sorting the category.
+    """
+    for table in ("expenses", "income"):
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_{0}_category_id ON {0} (category_id)".format(table))
+
+
+
+def use_local_time_for_archives(cursor):
+    """
+    Migration 14: archives.archived_at in local time like every other timestamp.
+
+    Years archived so far were stamped in UTC and are converted.
+    """
+    cursor.execute("UPDATE archives SET archived_at = datetime(archived_at, 'localtime')")
+
+
+
+# Ordered list of (version, description, function). Append new migrations to
+# the end; never renumber or edit one that has been released.
+MIGRATIONS = [
+    (1, "create initial tables", create_initial_schema),
+    (2, "add transaction dates and covering indexes", add_dates_and_indexes),
+    (3, "store amounts as integer cents", convert_amounts_to_cents),
+    (4, "add trigger-maintained category totals", add_category_totals),
+    (5, "add budget periods and per-category date indexes", add_budget_periods),
+    (6, "add trigger-maintained monthly rollups", add_monthly_rollups),
+    (7, "add full-text search indexes", add_search_indexes),
+    (8, "add goal contribution history", add_goal_contributions),
+    (9, "add archives of closed years", add_archives),
+    (10, "reference categories by integer id", add_categories),
+    (11, "number archive runs", add_archive_runs),
+    (12, "default transaction dates to local time", use_local_time_default),
+    (13, "index transactions by category in id order", add_category_id_indexes),
+    (14, "record archive times in local time", use_local_time_for_archives),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+
+def get_schema_version(connection):
+    """
+    Read the schema version of a database.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - version (int): The value of PRAGMA user_version.
+    """
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+
+def migrate(connection):
+    """
+    Upgrade a database to the latest schema version in place.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - applied (list): Versions of the migrations that were applied.
+
+    Raises:
+    - sqlite3.Error: If a migration fails. The failing migration is rolled back.
+    """
+    version = get_schema_version(connection)
+    if version == SCHEMA_VERSION:
+        # Already current: startup costs one PRAGMA read, no DDL and no commit
+        return []
+    if version > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            "Database schema version {} is newer than this application supports ({}).".format(version, SCHEMA_VERSION))
+    applied = []
+    for number, _description, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        cursor = connection.cursor()
+        try:
+            cursor.execute("BEGIN")
+            apply(cursor)
+            cursor.execute("PRAGMA user_version = {}".format(number))
+            connection.commit()
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+        applied.append(number)
+    return applied
@@ -0,0 +1,114 @@
+"""
+Money amounts stored as whole numbers of cents.
+
+All amount columns hold INTEGER cents, so sums in SQLite are exact integer
+arithmetic. Amounts are converted from what the user typed with to_cents and
+only turned back into a decimal string for display by Money.
+"""
+
+# Importing necessary module
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+CENTS_PER_UNIT = 100
+
+
+
+def to_cents(value):
+    """
+    Convert an amount in currency units to whole cents.
+
+    Parameters:
+    - value (str, int, float or Decimal): The amount, e.g. "12.34" or 12.34.
+
+    Returns:
+    - cents (int): The amount in cents, rounded half up.
+
+    Raises:
+    - ValueError: If the value is not a number.
+    """
+    if isinstance(value, Money):
+        return int(value)
+    try:
+        # str() keeps floats such as 0.1 from carrying binary rounding error
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError("Not a money amount: {!r}".format(value))
+    if not amount.is_finite():
+        raise ValueError("Not a money amount: {!r}".format(value))
+    return int((amount * CENTS_PER_UNIT).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+
+class Money(int):
+    """
+    An amount read from the database, in cents, that displays in currency units.
+
+    Money is an int, so it can be compared, summed and passed back to SQLite
+    unchanged; formatting it (str() or an f-string such as {amount:.2f})
+    shows the decimal amount.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Build a Money from an amount in currency units.
+
+        Parameters:
+        - value (str, int, float or Decimal): The amount, e.g. "12.34".
+
+        Returns:
+        - amount (Money): The amount.
+        """
+        return cls(to_cents(value))
+
+    def to_decimal(self):
+        """
+        Return the amount in currency units as an exact Decimal.
+        """
+        return Decimal(int(self)).scaleb(-2)
+
+    def __str__(self):
+        return format(self.to_decimal(), ".2f")
+
+    def __repr__(self):
+        return "Money('{}')".format(self)
+
+    def __format__(self, format_spec):
+        return format(self.to_decimal(), format_spec or ".2f")
+
+    def __add__(self, other):
+        result = int.__add__(self, other)
+        return Money(result) if isinstance(other, int) else result
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        result = int.__sub__(self, other)
+        return Money(result) if isinstance(other, int) else result
+
+    def __rsub__(self, other):
+        result = int.__rsub__(self, other)
+        return Money(result) if isinstance(other, int) else result
+
+    def __neg__(self):
+        return Money(-int(self))
+
+    def __abs__(self):
+        return Money(abs(int(self)))
+
+
+
+def money_or_none(cents):
+    """
+    Wrap a cents value read from the database, keeping NULL as None.
+
+    Parameters:
+    - cents (int or None): Value from an amount column.
+
+    Returns:
+    - amount (Money or None): The wrapped amount.
+    """
+    return None if cents is None else Money(cents)
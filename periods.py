@@ -0,0 +1,109 @@
+"""
+Budget periods and date ranges.
+
+Transactions carry an occurred_at timestamp stored as "YYYY-MM-DD HH:MM:SS"
+text, so a period is a half-open range of day strings [start, end) that the
+indexes on occurred_at can seek to directly.
+"""
+
+# Importing necessary modules
+from datetime import date, datetime, timedelta
+
+
+# Budget periods, in the order the UIs offer them
+PERIODS = ("monthly", "weekly")
+
+DEFAULT_PERIOD = "monthly"
+
+# SQL expression for the current local time, in the occurred_at format
+NOW_SQL = "datetime('now', 'localtime')"
+
+
+
+def check_period(period):
+    """
+    Make sure a budget period is one of PERIODS.
+
+    Parameters:
+    - period (str): "monthly" or "weekly".
+
+    Returns:
+    - period (str): The validated period.
+
+    Raises:
+    - ValueError: If the period is unknown.
+    """
+    if period not in PERIODS:
+        raise ValueError("Unknown budget period {!r}; choose one of {}".format(period, ", ".join(PERIODS)))
+    return period
+
+
+
+def to_date(on=None):
+    """
+    Turn a date, datetime or "YYYY-MM-DD..." string into a date.
+
+    Parameters:
+    - on (date, datetime or str, optional): The day. Defaults to today.
+
+    Returns:
+    - day (date): The day.
+
+    Raises:
+    - ValueError: If a string is not a valid date.
+    """
+    if on is None:
+        return date.today()
+    if isinstance(on, datetime):
+        return on.date()
+    if isinstance(on, date):
+        return on
+    return datetime.strptime(on[:10], "%Y-%m-%d").date()
+
+
+
+def period_range(period, on=None):
+    """
+    Find the period that contains a day.
+
+    Months start on the 1st and weeks on Monday.
+
+    Parameters:
+    - period (str): "monthly" or "weekly".
+    - on (date, datetime or str, optional): A day in the period. Defaults to today.
+
+    Returns:
+    - range (tuple): (start, end) as "YYYY-MM-DD" strings; start is included, end is not.
+
+    Raises:
+    - ValueError: If the period or the day is invalid.
+    """
+    check_period(period)
+    day = to_date(on)
+    if period == "weekly":
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=7)
+    else:
+        start = day.replace(day=1)
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+
+def parse_day(text):
+    """
+    Parse a date typed by the user into the occurred_at format.
+
+    Parameters:
+    - text (str): Date as "YYYY-MM-DD". May be empty.
+
+    Returns:
+    - occurred_at (str): "YYYY-MM-DD 00:00:00", or None if the text is empty.
+
+    Raises:
+    - ValueError: If the text is not a valid date.
+    """
+    text = text.strip()
+    if not text:
+        return None
+    return datetime.strptime(text, "%Y-%m-%d").strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,240 @@
+"""
+A pool of SQLite connections shared by threads.
+
+Code borrows a connection for the length of a with block:
+
+    with pool.connection() as connection:
+        ExpenseRepository(connection).add(...)
+
+A thread that already holds a connection gets the same one back in nested
+blocks. Idle connections are kept for reuse up to max_size, checked with
+a cheap query before being handed out again, and closed by close().
+Leaving the outermost block commits an open transaction, or rolls it back
+if the block raised.
+"""
+
+# Importing necessary modules
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import database
+import query_cache
+
+
+DEFAULT_MAX_SIZE = 8
+
+# Prepared statements kept per connection (sqlite3's default is 128)
+DEFAULT_CACHED_STATEMENTS = 256
+
+# Idle connections older than this many seconds are checked before reuse
+DEFAULT_HEALTH_CHECK_AGE = 30
+
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """
+    No connection became free in time.
+    """
+
+
+
+class PoolClosed(sqlite3.ProgrammingError):
+    """
+    The pool has been closed.
+    """
+
+
+
+class ConnectionPool:
+    """
+    Hand out connections to threads, at most max_size at a time.
+    """
+
+    def __init__(self, database_name, max_size=DEFAULT_MAX_SIZE, profile=None,
+                 cached_statements=DEFAULT_CACHED_STATEMENTS, timeout=30, health_check_age=DEFAULT_HEALTH_CHECK_AGE,
+                 connect=database.connect):
+        """
+        Parameters:
+        - database_name (str): The name of the SQLite database.
+        - max_size (int): Most connections open at once.
+        - profile (ConnectionProfile or str, optional): Connection profile (see database.connect).
+        - cached_statements (int): Size of each connection's prepared statement cache.
+        - timeout (float): Seconds to wait for a free connection.
+        - health_check_age (float): Check idle connections older than this before reuse.
+        - connect (callable): Opens connections; takes the arguments of database.connect.
+
+        Raises:
+        - ValueError: If max_size is less than 1 or the profile is unknown.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.database_name = database_name
+        self.max_size = max_size
+        self.profile = database.get_profile(profile) if not isinstance(profile, database.ConnectionProfile) else profile
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.health_check_age = health_check_age
+        self.connect = connect
+        self.idle = []           # (connection, released_at) pairs, most recently used last
+        self.size = 0            # connections open, idle or in use
+        self.closed = False
+        self.local = threading.local()
+        self.condition = threading.Condition()
+        self.created = self.reused = self.replaced = 0
+
+    def open_connection(self):
+        """
+        Open a new connection with the pool's profile and statement cache size.
+        """
+        return self.connect(self.database_name, self.profile, check_same_thread=False,
+                            cached_statements=self.cached_statements)
+
+    def healthy(self, connection):
+        """
+        Check that a connection still answers a query.
+        """
+        try:
+            connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """
+        Take a connection from the pool, opening one if there is room.
+
+        Returns:
+        - connection (sqlite3.Connection): A connection for this thread's exclusive use.
+
+        Raises:
+        - PoolTimeout: If max_size connections are in use for longer than the timeout.
+        - PoolClosed: If the pool has been closed.
+        - sqlite3.Error: If a new connection cannot be opened.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise PoolClosed("connection pool is closed")
+                if self.idle:
+                    connection, released_at = self.idle.pop()
+                    break
+                if self.size < self.max_size:
+                    self.size += 1
+                    connection = released_at = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    raise PoolTimeout("no free database connection after {} seconds".format(self.timeout))
+
+        # Opening and checking happen outside the lock
+        replaced = created = False
+        try:
+            if connection is not None and time.monotonic() - released_at > self.health_check_age:
+                if not self.healthy(connection):
+                    connection.close()
+                    connection = None
+                    replaced = True
+            if connection is None:
+                connection = self.open_connection()
+                created = True
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                if replaced:
+                    self.replaced += 1
+                self.condition.notify()
+            raise
+        # The counters are read by stats() from other threads
+        with self.condition:
+            if replaced:
+                self.replaced += 1
+            if created:
+                self.created += 1
+            else:
+                self.reused += 1
+        return connection
+
+    def release(self, connection):
+        """
+        Give a connection back, closing it if the pool is closed.
+
+        Parameters:
+        - connection (sqlite3.Connection): A connection from acquire().
+
+        Returns:
+        - None
+        """
+        if connection.in_transaction:
+            connection.rollback()
+        with self.condition:
+            if self.closed:
+                self.size -= 1
+                connection.close()
+            else:
+                self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for a with block.
+
+        Nested blocks in the same thread share one connection. When the
+        outermost block ends, an open transaction is committed, or rolled
+        back if the block raised, and the connection goes back to the pool.
+
+        Returns:
+        - context manager yielding a sqlite3.Connection.
+        """
+        held = getattr(self.local, "held", None)
+        if held is not None:
+            yield held
+            return
+
+        connection = self.acquire()
+        self.local.held = connection
+        try:
+            yield connection
+            if connection.in_transaction:
+                connection.commit()
+                # The block wrote without committing; which tables is not known here
+                query_cache.invalidate(connection)
+        finally:
+            self.local.held = None
+            self.release(connection)
+
+    def stats(self):
+        """
+        Describe the pool.
+
+        Returns:
+        - stats (dict): open, idle and in-use counts and how many connections
+          were created, reused and replaced after a failed health check.
+        """
+        with self.condition:
+            return {"open": self.size, "idle": len(self.idle), "in_use": self.size - len(self.idle),
+                    "max_size": self.max_size, "created": self.created, "reused": self.reused, "replaced": self.replaced}
+
+    def close(self):
+        """
+        Close idle connections now and the others as they are released.
+
+        Returns:
+        - None
+        """
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+            self.condition.notify_all()
+        for connection, _released_at in idle:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,261 @@
+"""
+In-process cache of aggregate query results.
+
+The budget and goal screens run the same SUM queries each time they are
+opened, usually with nothing written in between. The repositories keep
+those results here, keyed by query and parameters, one LRU cache per
+database file shared by every connection to it.
+
+Each cached result is stamped with the generation of the tables it was
+read from. Every write path in the repositories bumps the generation of
+the table it writes (see tables_changed), so a result read before the
+write no longer matches and is recomputed on the next call. Writes made
+outside this process, or on another connection that was committed later,
+are caught with PRAGMA data_version, which changes whenever another
+connection commits to the database: the whole cache is dropped then.
+
+Only connections opened with database.connect are cached; others, and
+in-memory databases, always run their queries.
+"""
+
+# Importing necessary modules
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+
+class QueryCache:
+    """
+    A size-bounded LRU cache of query results with per-table generations.
+
+    Cached values are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Parameters:
+        - max_entries (int): Most results kept; the least recently used go first.
+
+        Raises:
+        - ValueError: If max_entries is less than 1.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # key -> (stamp, value), least recently used first
+        self.generations = {}          # table -> generation
+        self.epoch = 0                 # bumped by invalidate() to outdate every table at once
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stamp(self, tables):
+        """
+        The current generations of some tables. Call with the lock held.
+        """
+        return (self.epoch,) + tuple(self.generations.get(table, 0) for table in tables)
+
+    def get_or_compute(self, key, tables, compute):
+        """
+        Return the cached result for key, or compute and cache it.
+
+        The query runs outside the lock. Its result is only kept if none of
+        the tables changed while it ran.
+
+        Parameters:
+        - key (tuple): Query name and parameters.
+        - tables (tuple): Tables the result is read from.
+        - compute (callable): Runs the query; called with no arguments.
+
+        Returns:
+        - value: The cached or computed result.
+        """
+        with self.lock:
+            stamp = self.stamp(tables)
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self.lock:
+            if self.stamp(tables) == stamp:
+                self.entries[key] = (stamp, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def bump(self, *tables):
+        """
+        Mark tables as changed, outdating every result read from them.
+
+        Returns:
+        - None
+        """
+        with self.lock:
+            for table in tables:
+                self.generations[table] = self.generations.get(table, 0) + 1
+
+    def invalidate(self):
+        """
+        Drop every cached result.
+
+        Returns:
+        - None
+        """
+        with self.lock:
+            self.epoch += 1
+            self.entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Describe the cache.
+
+        Returns:
+        - stats (dict): hits, misses, hit_ratio, entries, max_entries, evictions
+          and invalidations (times the whole cache was dropped).
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / lookups if lookups else None,
+                    "entries": len(self.entries), "max_entries": self.max_entries,
+                    "evictions": self.evictions, "invalidations": self.invalidations}
+
+
+
+# One cache per database file, and per connection [cache, last data_version]
+caches = {}
+connection_states = weakref.WeakKeyDictionary()
+registry_lock = threading.Lock()
+
+
+
+def database_path(connection):
+    """
+    The file of a connection's main database, or "" for an in-memory database.
+    """
+    for _seq, name, path in connection.execute("PRAGMA database_list"):
+        if name == "main":
+            return path or ""
+    return ""
+
+
+
+def data_version(connection):
+    """
+    A number that changes when another connection commits to the database.
+    """
+    return connection.execute("PRAGMA data_version").fetchone()[0]
+
+
+
+def for_connection(connection):
+    """
+    Find the cache of a connection's database, first dropping it if another
+    connection has committed since this one last looked.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - cache (QueryCache or None): None if the connection is not cached.
+    """
+    try:
+        state = connection_states.get(connection)
+    except TypeError:
+        # A plain sqlite3.Connection, not opened with database.connect
+        return None
+    if state is None:
+        path = database_path(connection)
+        cache = None
+        if path:
+            with registry_lock:
+                cache = caches.setdefault(os.path.realpath(path), QueryCache())
+            # Results cached through other connections may predate writes this one can already see
+            cache.invalidate()
+        state = connection_states[connection] = [cache, data_version(connection)]
+        return cache
+
+    cache = state[0]
+    if cache is not None:
+        version = data_version(connection)
+        if version != state[1]:
+            state[1] = version
+            cache.invalidate()
+    return cache
+
+
+
+def cached(connection, key, tables, compute):
+    """
+    Return a query result from the connection's cache, computing it on a miss.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - key (tuple): Query name and parameters.
+    - tables (tuple): Tables the result is read from.
+    - compute (callable): Runs the query; called with no arguments.
+
+    Returns:
+    - value: The query result.
+    """
+    cache = for_connection(connection)
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(key, tables, compute)
+
+
+
+def tables_changed(connection, *tables):
+    """
+    Record a write to some tables. Call after every insert, update or delete.
+
+    Parameters:
+    - connection (sqlite3.Connection): The connection that wrote.
+    - tables (str): Names of the changed tables.
+
+    Returns:
+    - None
+    """
+    cache = for_connection(connection)
+    if cache is not None:
+        cache.bump(*tables)
+
+
+
+def invalidate(connection):
+    """
+    Drop every cached result of a connection's database, e.g. after a bulk
+    import or a rebuild of the derived tables.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - None
+    """
+    cache = for_connection(connection)
+    if cache is not None:
+        cache.invalidate()
+
+
+
+def stats(connection):
+    """
+    Hit and miss counters of a connection's cache (see QueryCache.stats).
+
+    Returns:
+    - stats (dict or None): None if the connection is not cached.
+    """
+    cache = for_connection(connection)
+    return cache.stats() if cache is not None else None
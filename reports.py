@@ -0,0 +1,299 @@
+"""
+Report queries shared by the Tkinter and text UIs.
+
+Transactions and budgets refer to their category by id (see categories.py);
+the queries join the categories table to report names and look a category
+filter up by name.
+"""
+
+# Importing necessary modules
+from collections import namedtuple
+from itertools import groupby
+from operator import itemgetter
+
+import periods
+from money import Money, money_or_none
+
+
+# Tables that hold categorised transactions
+TRANSACTION_TABLES = ("expenses", "income")
+
+# Number of rows read per page by list views
+PAGE_SIZE = 200
+
+# Transactions with their category names; format with the table and the
+# WHERE condition and ordering
+TRANSACTIONS_QUERY = ("SELECT t.id, c.name, t.item_name, t.amount, t.occurred_at FROM {} AS t "
+                      "JOIN categories AS c ON c.id = t.category_id WHERE {}")
+
+PAGE_QUERY = TRANSACTIONS_QUERY + " LIMIT ?"
+
+# Limits a transactions query to the category named by a parameter
+CATEGORY_FILTER = " AND t.category_id = (SELECT id FROM categories WHERE name = ?)"
+
+
+
+def check_transaction_table(table):
+    """
+    Make sure a table name is one of the transaction tables.
+
+    Parameters:
+    - table (str): Name of the table ("expenses" or "income").
+
+    Returns:
+    - table (str): The validated table name.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    """
+    if table not in TRANSACTION_TABLES:
+        raise ValueError("Unknown transaction table: {!r}".format(table))
+    return table
+
+
+
+def grouped_by_category(connection, table):
+    """
+    Group the rows of a transaction table by category in a single query.
+
+    The rows are read in one ordered pass (ORDER BY category name) and split into
+    groups as they stream out of the cursor, instead of running one
+    SELECT ... WHERE category=? per category.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): Name of the table ("expenses" or "income").
+
+    Returns:
+    - generator: Yields (category, rows) tuples in category order, where rows is a
+      list of (id, category, item_name, amount) tuples with amount in cents.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    cursor = connection.cursor()
+    cursor.execute("SELECT t.id, c.name, t.item_name, t.amount FROM {} AS t "
+                   "JOIN categories AS c ON c.id = t.category_id ORDER BY c.name, t.id".format(table))
+    for category, rows in groupby(cursor, key=itemgetter(1)):
+        yield category, list(rows)
+
+
+
+def transaction_page(connection, table, after_id=0, before_id=None, limit=PAGE_SIZE, category=None):
+    """
+    Read one page of a transaction table with keyset pagination.
+
+    Pages are found by seeking on the primary key (WHERE id > ? LIMIT ?)
+    rather than with OFFSET, so reading any page costs the same no matter how
+    far into the table it is.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): Name of the table ("expenses" or "income").
+    - after_id (int): Return the rows following this id.
+    - before_id (int, optional): Return the rows preceding this id instead.
+    - limit (int): Maximum number of rows to return.
+    - category (str, optional): Only read this category.
+
+    Returns:
+    - rows (list): (id, category, item_name, amount, occurred_at) tuples in id order.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    condition, params = "", ()
+    if category is not None:
+        # Seeks on idx_{table}_category_id, which is in id order within a category
+        condition, params = CATEGORY_FILTER, (category,)
+    cursor = connection.cursor()
+    if before_id is not None:
+        cursor.execute(PAGE_QUERY.format(table, "t.id < ?" + condition + " ORDER BY t.id DESC"),
+                       (before_id,) + params + (limit,))
+        return cursor.fetchall()[::-1]
+    cursor.execute(PAGE_QUERY.format(table, "t.id > ?" + condition + " ORDER BY t.id"), (after_id,) + params + (limit,))
+    return cursor.fetchall()
+
+
+
+def transactions_between(connection, table, start, end, category=None):
+    """
+    Read the transactions of a date range, oldest first.
+
+    The range is a seek on the occurred_at index, so only the rows in the
+    range are read however long the history is. Rows without a date (added
+    before dates were recorded) are never in a range.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): Name of the table ("expenses" or "income").
+    - start (str): First day of the range, "YYYY-MM-DD" (included).
+    - end (str): Day after the range, "YYYY-MM-DD" (excluded).
+    - category (str, optional): Only read this category.
+
+    Returns:
+    - rows (list): (id, category, item_name, amount, occurred_at) tuples.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    condition = "t.occurred_at >= ? AND t.occurred_at < ?"
+    params = (start, end)
+    if category is not None:
+        condition += CATEGORY_FILTER
+        params += (category,)
+    cursor = connection.cursor()
+    cursor.execute(TRANSACTIONS_QUERY.format(table, condition + " ORDER BY t.occurred_at, t.id"), params)
+    return cursor.fetchall()
+
+
+
+def period_totals(connection, table, start, end, category=None):
+    """
+    Total a date range per category.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): Name of the table ("expenses" or "income").
+    - start (str): First day of the range, "YYYY-MM-DD" (included).
+    - end (str): Day after the range, "YYYY-MM-DD" (excluded).
+    - category (str, optional): Only total this category.
+
+    Returns:
+    - totals (list): (category, total, entries) tuples ordered by category, totals as Money.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    query = ("SELECT c.name, p.total, p.entries "
+             "FROM (SELECT t.category_id, SUM(t.amount) AS total, COUNT(*) AS entries FROM {} AS t "
+             "WHERE t.occurred_at >= ? AND t.occurred_at < ?")
+    params = (start, end)
+    if category is not None:
+        query += CATEGORY_FILTER
+        params += (category,)
+    cursor = connection.cursor()
+    cursor.execute((query + " GROUP BY t.category_id) AS p JOIN categories AS c ON c.id = p.category_id "
+                    "ORDER BY c.name").format(table), params)
+    return [(category_name, Money(total), entries) for category_name, total, entries in cursor]
+
+
+
+# One row of the budget-vs-actual report. budget and difference are None for
+# categories that have spending this month but no budget set. start and end
+# bound the period the actual expenses were summed over.
+BudgetLine = namedtuple("BudgetLine", ["category", "budget", "actual", "difference", "period", "start", "end"])
+
+
+# Each budget is compared with the expenses of its own period, read with a
+# range scan of idx_expenses_category_occurred_at. Categories without a
+# budget are reported with this month's spending.
+BUDGET_REPORT_QUERY = '''
+    SELECT c.name, b.budget, b.period, (
+        SELECT COALESCE(SUM(e.amount), 0)
+        FROM expenses AS e
+        WHERE e.category_id = b.category_id
+          AND e.occurred_at >= CASE b.period WHEN 'weekly' THEN :week_start ELSE :month_start END
+          AND e.occurred_at < CASE b.period WHEN 'weekly' THEN :week_end ELSE :month_end END)
+    FROM budgets AS b
+    JOIN categories AS c ON c.id = b.category_id
+    {budget_where}
+    UNION ALL
+    SELECT c.name, NULL, 'monthly', s.total
+    FROM (SELECT e.category_id, SUM(e.amount) AS total
+          FROM expenses AS e
+          WHERE e.occurred_at >= :month_start AND e.occurred_at < :month_end {where}
+            AND NOT EXISTS (SELECT 1 FROM budgets AS b WHERE b.category_id = e.category_id)
+          GROUP BY e.category_id) AS s
+    JOIN categories AS c ON c.id = s.category_id
+    ORDER BY 1'''
+
+
+
+def budget_report(connection, category=None, on=None):
+    """
+    Compare the budget of every category with its expenses in the current period.
+
+    A monthly budget is compared with the expenses of the month containing
+    the day `on`, a weekly budget with those of its week (Monday to Sunday).
+    Only the rows of those periods are read. Categories that have expenses
+    this month but no budget are included with a budget of None.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - category (str, optional): Only report on this category.
+    - on (date or str, optional): A day in the periods to report on. Defaults to today.
+
+    Returns:
+    - report (list): List of BudgetLine tuples ordered by category, with amounts as Money.
+
+    Raises:
+    - ValueError: If `on` is not a valid date.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    ranges = dict((period, periods.period_range(period, on)) for period in periods.PERIODS)
+    params = {
+        "month_start": ranges["monthly"][0], "month_end": ranges["monthly"][1],
+        "week_start": ranges["weekly"][0], "week_end": ranges["weekly"][1],
+        "category": category,
+    }
+    if category is None:
+        query = BUDGET_REPORT_QUERY.format(where="", budget_where="")
+    else:
+        category_id = "(SELECT id FROM categories WHERE name = :category)"
+        query = BUDGET_REPORT_QUERY.format(where="AND e.category_id = " + category_id,
+                                           budget_where="WHERE b.category_id = " + category_id)
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    report = []
+    for category_name, budget, period, actual in cursor:
+        budget = money_or_none(budget)
+        actual = Money(actual)
+        difference = None if budget is None else budget - actual
+        start, end = ranges[period]
+        report.append(BudgetLine(category_name, budget, actual, difference, period, start, end))
+    return report
+
+
+
+def budget_status(line):
+    """
+    Describe whether a category is under, over or exactly on budget.
+
+    Parameters:
+    - line (BudgetLine): A row of the budget report.
+
+    Returns:
+    - message (str): Human readable budget status.
+    """
+    if line.difference is None:
+        return f"Category '{line.category}' has no budget set."
+    if line.difference > 0:
+        return f"Category '{line.category}' is under its {line.period} budget by ${line.difference:.2f}."
+    if line.difference < 0:
+        return f"Category '{line.category}' is over its {line.period} budget by ${abs(line.difference):.2f}."
+    return f"Category '{line.category}' is exactly on its {line.period} budget."
+
+
+
+def format_budget_line(line):
+    """
+    Format a row of the budget report for display.
+
+    Parameters:
+    - line (BudgetLine): A row of the budget report.
+
+    Returns:
+    - text (str): The formatted row.
+    """
+    if line.budget is None:
+        return f"Category: {line.category}, Budget: none, Actual Expense this month: {line.actual:.2f}"
+    return (f"Category: {line.category}, Budget: {line.budget:.2f} {line.period}, "
+            f"Actual Expense since {line.start}: {line.actual:.2f}, Difference: {line.difference:.2f}")
@@ -0,0 +1,448 @@
+"""
+Data-access layer shared by the Tkinter and text UIs.
+
+Every query the front-ends run lives here, behind one repository class per
+table. SQL strings are module constants so sqlite3's statement cache reuses
+the prepared statements, rows come back as named tuples with amounts as
+Money, and each repository offers batched writes. Amounts passed in are in
+currency units (e.g. 12.5 or "12.50") or Money.
+
+Aggregate results (totals, budget reports, goals) are kept in query_cache
+until one of the tables they read is written through a repository.
+
+Categories are passed in and returned by name. The tables store their id
+(see categories.py), looked up in memory on writes and joined on reads.
+"""
+
+# Importing necessary modules
+from collections import namedtuple
+
+import archive
+import categories
+import goal_analytics
+import periods
+import query_cache
+import reports
+import search
+import totals
+from money import Money, money_or_none, to_cents
+
+
+Transaction = namedtuple("Transaction", ["id", "category", "item_name", "amount", "occurred_at"])
+
+Budget = namedtuple("Budget", ["category", "budget", "period"])
+
+Goal = namedtuple("Goal", ["id", "goal_name", "target_amount", "current_amount"])
+
+
+
+def transaction_from_row(row):
+    """
+    Build a Transaction from an (id, category, item_name, amount[, occurred_at]) row.
+    """
+    return Transaction(row[0], row[1], row[2], money_or_none(row[3]), row[4] if len(row) > 4 else None)
+
+
+
+def finish_write(connection, table, commit):
+    """
+    Commit a write if asked and mark its table changed in the query cache.
+
+    The table is marked before the commit, so reads on this connection see
+    the new rows, and again after it, so a result another connection read
+    in between is not kept.
+    """
+    query_cache.tables_changed(connection, table)
+    if commit:
+        connection.commit()
+        query_cache.tables_changed(connection, table)
+
+
+
+class TransactionRepository:
+    """
+    Queries on a transaction table. Use ExpenseRepository or IncomeRepository.
+    """
+
+    table = None
+
+    def __init__(self, connection):
+        """
+        Parameters:
+        - connection (sqlite3.Connection): Connection object to the SQLite database.
+        """
+        self.connection = connection
+        self.insert_query = ("INSERT INTO {} (category_id, item_name, amount, occurred_at) "
+                             "VALUES (?, ?, ?, COALESCE(?, {}))".format(self.table, periods.NOW_SQL))
+        self.select_query = ("SELECT t.id, c.name, t.item_name, t.amount, t.occurred_at FROM {} AS t "
+                             "JOIN categories AS c ON c.id = t.category_id ORDER BY t.id".format(self.table))
+
+    def add(self, category, item_name, amount, occurred_at=None, commit=True):
+        """
+        Add one transaction.
+
+        Parameters:
+        - category (str): Category of the transaction.
+        - item_name (str): Name of the item.
+        - amount (float, str or Money): Amount in currency units.
+        - occurred_at (str, optional): "YYYY-MM-DD HH:MM:SS"; defaults to now.
+        - commit (bool): Commit the transaction straight away.
+
+        Returns:
+        - id (int): Id of the new row.
+
+        Raises:
+        - ValueError: If the amount is not a number.
+        - sqlite3.Error: If the row cannot be written.
+        """
+        amount = to_cents(amount)
+        cursor = self.connection.execute(self.insert_query, (categories.category_id(self.connection, category),
+                                                             item_name, amount, occurred_at))
+        finish_write(self.connection, self.table, commit)
+        return cursor.lastrowid
+
+    def add_many(self, rows, commit=True):
+        """
+        Add many transactions with a single executemany in one transaction.
+
+        Parameters:
+        - rows (iterable): (category, item_name, amount) or
+          (category, item_name, amount, occurred_at) tuples, amounts in currency units.
+        - commit (bool): Commit once all rows are written.
+
+        Returns:
+        - count (int): Number of rows written.
+
+        Raises:
+        - ValueError: If an amount is not a number. Nothing is written.
+        - sqlite3.Error: If the rows cannot be written. Nothing is committed.
+        """
+        parameters = [(row[0], row[1], to_cents(row[2]), row[3] if len(row) > 3 else None) for row in rows]
+        try:
+            parameters = [(categories.category_id(self.connection, category), item_name, amount, occurred_at)
+                          for category, item_name, amount, occurred_at in parameters]
+            self.connection.executemany(self.insert_query, parameters)
+        except Exception:
+            if commit:
+                self.connection.rollback()
+            raise
+        finish_write(self.connection, self.table, commit)
+        return len(parameters)
+
+    def all(self, category=None):
+        """
+        Stream every transaction in id order.
+
+        Parameters:
+        - category (str, optional): Only read this category, a page at a time (see page).
+
+        Returns:
+        - generator: Yields Transaction tuples.
+        """
+        if category is None:
+            for row in self.connection.execute(self.select_query):
+                yield transaction_from_row(row)
+            return
+        after_id = 0
+        while True:
+            transactions = self.page(after_id, category=category)
+            yield from transactions
+            if len(transactions) < reports.PAGE_SIZE:
+                return
+            after_id = transactions[-1].id
+
+    def page(self, after_id=0, before_id=None, limit=reports.PAGE_SIZE, category=None):
+        """
+        Read one page of transactions with keyset pagination (see reports.transaction_page).
+
+        Returns:
+        - transactions (list): Transaction tuples in id order.
+        """
+        return [transaction_from_row(row) for row in
+                reports.transaction_page(self.connection, self.table, after_id, before_id, limit, category)]
+
+    def between(self, start, end, category=None, include_archived=False):
+        """
+        Read the transactions of a date range (see reports.transactions_between).
+
+        With include_archived, archived years in the range are read from
+        their archive files as well (see archive.transactions_between).
+
+        Returns:
+        - transactions (list): Transaction tuples, oldest first.
+        """
+        read = archive.transactions_between if include_archived else reports.transactions_between
+        return [transaction_from_row(row) for row in read(self.connection, self.table, start, end, category)]
+
+    def in_period(self, period, on=None, category=None):
+        """
+        Read the transactions of the month or week containing a day.
+
+        Parameters:
+        - period (str): "monthly" or "weekly".
+        - on (date or str, optional): A day in the period. Defaults to today.
+        - category (str, optional): Only read this category.
+
+        Returns:
+        - transactions (list): Transaction tuples, oldest first.
+        """
+        start, end = periods.period_range(period, on)
+        return self.between(start, end, category)
+
+    def period_totals(self, start, end, category=None):
+        """
+        Total a date range per category (see reports.period_totals).
+
+        Returns:
+        - totals (list): (category, total, entries) tuples ordered by category.
+        """
+        return query_cache.cached(self.connection, ("period_totals", self.table, start, end, category), (self.table,),
+                                  lambda: reports.period_totals(self.connection, self.table, start, end, category))
+
+    def by_category(self):
+        """
+        Group every transaction by category in one ordered pass.
+
+        Returns:
+        - generator: Yields (category, transactions) tuples in category order.
+        """
+        for category, rows in reports.grouped_by_category(self.connection, self.table):
+            yield category, [transaction_from_row(row) for row in rows]
+
+    def search(self, text, limit=search.DEFAULT_LIMIT):
+        """
+        Full-text search of item names and categories (see search.search).
+
+        Returns:
+        - hits (list): SearchHit tuples, best match first.
+        """
+        return search.search(self.connection, self.table, text, limit)
+
+    def total(self, category):
+        """
+        Total amount of a category, read from the category_totals table.
+
+        Returns:
+        - total (Money): The total.
+        """
+        return query_cache.cached(self.connection, ("total", self.table, category), (self.table,),
+                                  lambda: totals.category_total(self.connection, self.table, category))
+
+
+
+class ExpenseRepository(TransactionRepository):
+    """
+    Queries on the expenses table.
+    """
+
+    table = "expenses"
+
+
+
+class IncomeRepository(TransactionRepository):
+    """
+    Queries on the income table.
+    """
+
+    table = "income"
+
+
+
+class BudgetRepository:
+    """
+    Queries on the budgets table.
+    """
+
+    SET_QUERY = "INSERT OR REPLACE INTO budgets (category_id, budget, period) VALUES (?, ?, ?)"
+    SELECT_QUERY = ("SELECT c.name, b.budget, b.period FROM budgets AS b "
+                    "JOIN categories AS c ON c.id = b.category_id ORDER BY c.name")
+
+    def __init__(self, connection):
+        """
+        Parameters:
+        - connection (sqlite3.Connection): Connection object to the SQLite database.
+        """
+        self.connection = connection
+
+    def set(self, category, budget, period=periods.DEFAULT_PERIOD, commit=True):
+        """
+        Set or replace the budget of a category.
+
+        Parameters:
+        - category (str): The category.
+        - budget (float, str or Money): Budget per period in currency units.
+        - period (str): "monthly" or "weekly".
+        - commit (bool): Commit the transaction straight away.
+
+        Returns:
+        - None
+
+        Raises:
+        - ValueError: If the budget is not a number or the period is unknown.
+        """
+        parameters = (to_cents(budget), periods.check_period(period))
+        self.connection.execute(self.SET_QUERY, (categories.category_id(self.connection, category),) + parameters)
+        finish_write(self.connection, "budgets", commit)
+
+    def set_many(self, budgets, commit=True):
+        """
+        Set the budgets of many categories in one transaction.
+
+        Parameters:
+        - budgets (iterable): (category, budget) or (category, budget, period) tuples,
+          budgets in currency units. The period defaults to monthly.
+        - commit (bool): Commit once all budgets are written.
+
+        Returns:
+        - count (int): Number of budgets written.
+        """
+        parameters = [(row[0], to_cents(row[1]), periods.check_period(row[2] if len(row) > 2 else periods.DEFAULT_PERIOD))
+                      for row in budgets]
+        parameters = [(categories.category_id(self.connection, category), budget, period)
+                      for category, budget, period in parameters]
+        self.connection.executemany(self.SET_QUERY, parameters)
+        finish_write(self.connection, "budgets", commit)
+        return len(parameters)
+
+    def all(self):
+        """
+        Read every budget.
+
+        Returns:
+        - budgets (list): Budget tuples ordered by category.
+        """
+        return [Budget(category, money_or_none(budget), period)
+                for category, budget, period in self.connection.execute(self.SELECT_QUERY)]
+
+    def report(self, category=None, on=None):
+        """
+        Budget against this period's expenses for every category, or for one (see reports.budget_report).
+
+        Returns:
+        - report (list): BudgetLine tuples ordered by category.
+        """
+        # Keyed by day, so the report moves on to the next period at midnight
+        on = periods.to_date(on)
+        return query_cache.cached(self.connection, ("budget_report", category, on), ("budgets", "expenses"),
+                                  lambda: reports.budget_report(self.connection, category, on))
+
+
+
+class GoalRepository:
+    """
+    Queries on the financial_goals table.
+    """
+
+    INSERT_QUERY = "INSERT INTO financial_goals (goal_name, target_amount, current_amount) VALUES (?, ?, ?)"
+    SELECT_QUERY = "SELECT id, goal_name, target_amount, current_amount FROM financial_goals ORDER BY id"
+    UPDATE_TARGET_QUERY = "UPDATE financial_goals SET target_amount = ? WHERE id = ?"
+    CONTRIBUTE_QUERY = "UPDATE financial_goals SET current_amount = COALESCE(current_amount, 0) + ? WHERE id = ?"
+    TOTALS_QUERY = "SELECT COALESCE(SUM(current_amount), 0), COALESCE(SUM(target_amount), 0) FROM financial_goals"
+
+    def __init__(self, connection):
+        """
+        Parameters:
+        - connection (sqlite3.Connection): Connection object to the SQLite database.
+        """
+        self.connection = connection
+
+    def add(self, goal_name, target_amount, current_amount, commit=True):
+        """
+        Add a financial goal.
+
+        Parameters:
+        - goal_name (str): Name of the goal.
+        - target_amount (float, str or Money): Target in currency units.
+        - current_amount (float, str or Money): Amount saved so far in currency units.
+        - commit (bool): Commit the transaction straight away.
+
+        Returns:
+        - id (int): Id of the new goal.
+        """
+        cursor = self.connection.execute(self.INSERT_QUERY, (goal_name, to_cents(target_amount), to_cents(current_amount)))
+        finish_write(self.connection, "financial_goals", commit)
+        return cursor.lastrowid
+
+    def add_many(self, goals, commit=True):
+        """
+        Add many financial goals in one transaction.
+
+        Parameters:
+        - goals (iterable): (goal_name, target_amount, current_amount) tuples in currency units.
+        - commit (bool): Commit once all goals are written.
+
+        Returns:
+        - count (int): Number of goals written.
+        """
+        parameters = [(name, to_cents(target), to_cents(current)) for name, target, current in goals]
+        self.connection.executemany(self.INSERT_QUERY, parameters)
+        finish_write(self.connection, "financial_goals", commit)
+        return len(parameters)
+
+    def all(self):
+        """
+        Read every financial goal.
+
+        Returns:
+        - goals (list): Goal tuples in id order.
+        """
+        return query_cache.cached(self.connection, ("goals",), ("financial_goals",), lambda: [
+            Goal(goal_id, name, money_or_none(target), money_or_none(current))
+            for goal_id, name, target, current in self.connection.execute(self.SELECT_QUERY)])
+
+    def update_target(self, goal_id, target_amount, commit=True):
+        """
+        Change the target amount of a goal.
+
+        Parameters:
+        - goal_id (int): Id of the goal.
+        - target_amount (float, str or Money): New target in currency units.
+        - commit (bool): Commit the transaction straight away.
+
+        Returns:
+        - updated (bool): False if there is no goal with that id.
+        """
+        cursor = self.connection.execute(self.UPDATE_TARGET_QUERY, (to_cents(target_amount), goal_id))
+        finish_write(self.connection, "financial_goals", commit)
+        return cursor.rowcount > 0
+
+    def contribute(self, goal_id, amount, commit=True):
+        """
+        Add to (or, with a negative amount, take from) the current amount of a goal.
+
+        The change is recorded in goal_contributions by a trigger.
+
+        Parameters:
+        - goal_id (int): Id of the goal.
+        - amount (float, str or Money): Amount saved in currency units.
+        - commit (bool): Commit the transaction straight away.
+
+        Returns:
+        - updated (bool): False if there is no goal with that id.
+        """
+        cursor = self.connection.execute(self.CONTRIBUTE_QUERY, (to_cents(amount), goal_id))
+        finish_write(self.connection, "financial_goals", commit)
+        return cursor.rowcount > 0
+
+    def progress(self, on=None):
+        """
+        Progress and projected completion of every goal (see goal_analytics.goal_progress).
+
+        Returns:
+        - progress (list): GoalProgress tuples in goal id order.
+        """
+        # goal_contributions is only written by triggers on financial_goals
+        on = periods.to_date(on)
+        return query_cache.cached(self.connection, ("goal_progress", on), ("financial_goals",),
+                                  lambda: goal_analytics.goal_progress(self.connection, on))
+
+    def totals(self):
+        """
+        Sum the current and target amounts of every goal in one query.
+
+        Returns:
+        - totals (tuple): (total_current_amount, total_target_amount) as Money.
+        """
+        current, target = query_cache.cached(self.connection, ("goal_totals",), ("financial_goals",),
+                                             lambda: self.connection.execute(self.TOTALS_QUERY).fetchone())
+        return Money(current), Money(target)
@@ -0,0 +1,189 @@
+"""
+Monthly rollups of expenses and income for trend reports.
+
+The monthly_rollups table holds one row per kind, month and category with
+the sum, count, smallest and largest amount. Triggers keep it current as
+transactions are added, changed or removed (see migrations.add_monthly_rollups),
+so spending-per-month and year-over-year reports read a few hundred rollup
+rows instead of the whole history.
+
+Usage:
+    python rollups.py --check
+    python rollups.py --rebuild
+"""
+
+# Importing necessary modules
+import argparse
+import sqlite3
+from collections import namedtuple
+
+import database
+import migrations
+from money import Money, money_or_none
+from reports import check_transaction_table
+
+
+# One month of one category. period is "YYYY-MM"; amounts are Money.
+Rollup = namedtuple("Rollup", ["period", "category", "total", "entries", "smallest", "largest"])
+
+# One month of one category compared with the same month a year earlier
+YearOverYear = namedtuple("YearOverYear", ["month", "category", "total", "previous_total", "change"])
+
+# Archived months count through their summaries (see archive.py).
+# Categories are keyed by id (see migrations.add_categories).
+ACTUAL_ROLLUPS_QUERY = '''
+    SELECT kind, period, category_id, SUM(total), SUM(entries), MIN(min_amount), MAX(max_amount)
+    FROM (SELECT kind, period, category_id, total, entries, min_amount, max_amount FROM archived_summaries
+          UNION ALL {})
+    GROUP BY kind, period, category_id'''.format(
+    " UNION ALL ".join(migrations.ROLLUP_SOURCE_QUERY.format(table, migrations.category_key(True))
+                       for table in ("expenses", "income")))
+
+
+
+def monthly_trend(connection, table, category=None, start=None, end=None):
+    """
+    Read the monthly totals of a transaction table.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): "expenses" or "income".
+    - category (str, optional): Only read this category.
+    - start (str, optional): First month to read, "YYYY-MM" (included).
+    - end (str, optional): Last month to read, "YYYY-MM" (included).
+
+    Returns:
+    - rollups (list): Rollup tuples ordered by month and category.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    query = ("SELECT r.period, c.name, r.total, r.entries, r.min_amount, r.max_amount FROM monthly_rollups AS r "
+             "JOIN categories AS c ON c.id = r.category_id "
+             "WHERE r.kind = ? AND r.period >= ? AND r.period <= ?")
+    params = (table, start or "", end or "9999-12")
+    if category is not None:
+        query += " AND r.category_id = (SELECT id FROM categories WHERE name = ?)"
+        params += (category or "",)
+    cursor = connection.cursor()
+    cursor.execute(query + " ORDER BY r.period, c.name", params)
+    return [Rollup(period, category_name, Money(total), entries, money_or_none(smallest), money_or_none(largest))
+            for period, category_name, total, entries, smallest, largest in cursor]
+
+
+
+def year_over_year(connection, table, year, category=None):
+    """
+    Compare every month of a year with the same month of the year before.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): "expenses" or "income".
+    - year (int): The year to report on.
+    - category (str, optional): Only report on this category.
+
+    Returns:
+    - report (list): YearOverYear tuples ordered by month and category. Months
+      with no entries in one of the years count as zero.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    year = int(year)
+    totals = {}
+    for rollup in monthly_trend(connection, table, category, "{:04d}-01".format(year - 1), "{:04d}-12".format(year)):
+        key = (rollup.period[5:], rollup.category)
+        current, previous = totals.get(key, (Money(0), Money(0)))
+        if rollup.period.startswith(str(year)):
+            current = rollup.total
+        else:
+            previous = rollup.total
+        totals[key] = (current, previous)
+    return [YearOverYear(month, category_name, current, previous, current - previous)
+            for (month, category_name), (current, previous) in sorted(totals.items())]
+
+
+
+def check_rollups(connection):
+    """
+    Compare monthly_rollups with rollups recomputed from the raw tables.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - mismatches (list): (kind, period, category) tuples for every month and
+      category that differs. Empty when consistent.
+
+    Raises:
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    cursor = connection.cursor()
+    cursor.execute('''
+        WITH actual (kind, period, category_id, total, entries, min_amount, max_amount) AS ({})
+        , stored AS (SELECT kind, period, category_id, total, entries, min_amount, max_amount FROM monthly_rollups)
+        SELECT kind, period, COALESCE(c.name, m.category_id)
+        FROM (SELECT kind, period, category_id FROM (SELECT * FROM actual EXCEPT SELECT * FROM stored)
+              UNION
+              SELECT kind, period, category_id FROM (SELECT * FROM stored EXCEPT SELECT * FROM actual)) AS m
+        LEFT JOIN categories AS c ON c.id = m.category_id
+        ORDER BY 1, 2, 3'''.format(ACTUAL_ROLLUPS_QUERY))
+    return cursor.fetchall()
+
+
+
+def rebuild_rollups(connection):
+    """
+    Recompute monthly_rollups from the raw tables in one transaction.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - None
+
+    Raises:
+    - sqlite3.Error: If the rebuild fails. The old rollups are kept.
+    """
+    with connection:
+        connection.execute("DELETE FROM monthly_rollups")
+        connection.execute("INSERT INTO monthly_rollups (kind, period, category_id, total, entries, min_amount, max_amount) "
+                           + ACTUAL_ROLLUPS_QUERY)
+
+
+
+def main(argv=None):
+    """
+    Check or rebuild the monthly rollups from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Check or rebuild the monthly rollup table.")
+    parser.add_argument("--database", default="expense_tracker.db", help="SQLite database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--check", action="store_true", help="Report months whose rollups are out of date")
+    action.add_argument("--rebuild", action="store_true", help="Recompute every rollup from the raw tables")
+    args = parser.parse_args(argv)
+
+    connection = database.connect(args.database)
+    try:
+        migrations.migrate(connection)
+        if args.rebuild:
+            rebuild_rollups(connection)
+            print("Monthly rollups rebuilt.")
+        mismatches = check_rollups(connection)
+        for kind, period, category in mismatches:
+            print("{} / {} / {!r}: out of date".format(kind, period, category))
+        if not mismatches:
+            print("Monthly rollups are consistent.")
+        return 1 if mismatches else 0
+    except sqlite3.Error as e:
+        print("Error checking monthly rollups:", e)
+        return 1
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
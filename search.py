@@ -0,0 +1,141 @@
+"""
+Full-text search over the item names and categories of expenses and income.
+
+Searches use the FTS5 indexes expenses_search and income_search (see
+migrations.add_search_indexes and add_categories): every word typed is matched as a prefix,
+all words must match, and results are ranked with bm25, item name matches
+weighing more than category matches. Ranking scores every match, so for
+words found in a large part of the ledger asking for the newest matches
+instead (ranked=False) is much faster. When SQLite was built without FTS5
+the same search runs as a LIKE scan instead.
+"""
+
+# Importing necessary modules
+import re
+from collections import namedtuple
+
+from money import money_or_none
+from reports import check_transaction_table
+
+
+DEFAULT_LIMIT = 50
+
+# A matching transaction. rank is the bm25 score (lower is better), None without FTS5.
+SearchHit = namedtuple("SearchHit", ["id", "category", "item_name", "amount", "occurred_at", "rank"])
+
+# bm25 weights of the item_name and category columns
+COLUMN_WEIGHTS = (2.0, 1.0)
+
+
+
+def search_terms(text):
+    """
+    Split search text into words.
+
+    Parameters:
+    - text (str): What the user typed, e.g. "uber eat".
+
+    Returns:
+    - words (list): The words, lower case.
+
+    Raises:
+    - ValueError: If the text has no letters or digits.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        raise ValueError("Enter at least one word to search for.")
+    return words
+
+
+
+def match_expression(words, prefix=True):
+    """
+    Build an FTS5 MATCH expression that requires every word.
+
+    Each word is quoted, so FTS5 operators typed by the user are searched
+    for as plain text.
+
+    Parameters:
+    - words (list): Words from search_terms.
+    - prefix (bool): Match words that start with each word, e.g. "ube" finds "Uber".
+
+    Returns:
+    - expression (str): The MATCH expression.
+    """
+    return " ".join('"{}"{}'.format(word, "*" if prefix else "") for word in words)
+
+
+
+def has_search_index(connection, table):
+    """
+    Check whether the FTS5 index of a table exists.
+    """
+    return connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                              (table + "_search",)).fetchone() is not None
+
+
+
+def search(connection, table, text, limit=DEFAULT_LIMIT, prefix=True, ranked=True):
+    """
+    Find the transactions whose item name or category contains every word of a text.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): "expenses" or "income".
+    - text (str): Words to search for.
+    - limit (int): Maximum number of results.
+    - prefix (bool): Match word prefixes as well as whole words.
+    - ranked (bool): Best match first; False returns the newest matches first.
+
+    Returns:
+    - hits (list): SearchHit tuples, amounts as Money.
+
+    Raises:
+    - ValueError: If the table is not a transaction table or the text has no words.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    words = search_terms(text)
+    cursor = connection.cursor()
+    if has_search_index(connection, table):
+        # The limit is applied inside the index before joining the table rows
+        if ranked:
+            matches = ("SELECT rowid, bm25({0}_search, ?, ?) AS score FROM {0}_search WHERE {0}_search MATCH ? "
+                       "ORDER BY score LIMIT ?").format(table)
+            parameters = COLUMN_WEIGHTS + (match_expression(words, prefix), limit)
+        else:
+            matches = ("SELECT rowid, NULL AS score FROM {0}_search WHERE {0}_search MATCH ? "
+                       "ORDER BY rowid DESC LIMIT ?").format(table)
+            parameters = (match_expression(words, prefix), limit)
+        cursor.execute('''
+            SELECT t.id, c.name, t.item_name, t.amount, t.occurred_at, m.score
+            FROM ({1}) AS m
+            JOIN {0} AS t ON t.id = m.rowid
+            JOIN categories AS c ON c.id = t.category_id
+            ORDER BY {2}'''.format(table, matches, "m.score" if ranked else "t.id DESC"), parameters)
+    else:
+        conditions = " AND ".join(["(t.item_name LIKE ? OR c.name LIKE ?)"] * len(words))
+        # LIKE matches the words anywhere, so prefix makes no difference here
+        patterns = []
+        for word in words:
+            patterns += ["%{}%".format(word)] * 2
+        cursor.execute("SELECT t.id, c.name, t.item_name, t.amount, t.occurred_at, NULL FROM {} AS t "
+                       "JOIN categories AS c ON c.id = t.category_id WHERE {} "
+                       "ORDER BY t.id DESC LIMIT ?".format(table, conditions), patterns + [limit])
+    return [SearchHit(row_id, category, item_name, money_or_none(amount), occurred_at, rank)
+            for row_id, category, item_name, amount, occurred_at, rank in cursor]
+
+
+
+def format_hit(hit):
+    """
+    Format a search result for display.
+
+    Parameters:
+    - hit (SearchHit): The result.
+
+    Returns:
+    - text (str): The formatted result.
+    """
+    return "Category: {}, Item Name: {}, Amount: {}, Date: {}".format(hit.category, hit.item_name, hit.amount,
+                                                                        hit.occurred_at or "unknown")
@@ -0,0 +1,83 @@
+"""
+Tests for the HTTP/JSON API (api_server.py).
+"""
+
+# Importing necessary modules
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import api_server
+import migrations
+
+
+
+class DispatchTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.api = api_server.BudgetAPI(os.path.join(self.directory, "expense_tracker.db"), workers=1)
+        with self.api.pool.connection() as connection:
+            migrations.migrate(connection)
+
+
+    def tearDown(self):
+        self.api.close()
+        shutil.rmtree(self.directory)
+
+
+    def dispatch(self, method, path, body=None):
+        try:
+            return asyncio.run(self.api.dispatch(method, path, {}, body or {}))
+        except api_server.HTTPError as e:
+            return e.status, {"error": str(e)}
+
+
+    def test_add_expense(self):
+        status, payload = self.dispatch("POST", "/expenses", {"category": "Housing", "item_name": "Rent",
+                                                              "amount": "950.00", "date": "2024-01-01"})
+        self.assertEqual((status, payload), (201, {"id": 1}))
+
+
+    def test_fields_of_the_wrong_type_are_bad_requests(self):
+        valid = {"category": "Housing", "item_name": "Rent", "amount": 950, "date": "2024-01-01"}
+        for name, value in (("date", 123), ("item_name", ["Rent"]), ("amount", {"value": 1}), ("amount", True),
+                            ("category", None), ("category", 5)):
+            status, payload = self.dispatch("POST", "/expenses", dict(valid, **{name: value}))
+            self.assertEqual(status, 400, (name, value))
+            self.assertIn(name, payload["error"])
+        self.assertEqual(self.dispatch("POST", "/goals/contribute", {"goal_id": "1", "amount": 5})[0], 400)
+
+
+    def test_unexpected_errors_are_answered_with_500(self):
+        for error in (AttributeError, KeyError, TypeError):
+            def broken(connection, query, body):
+                raise error("broken handler")
+
+            self.api.routes[("GET", "/health")] = broken
+            log = io.StringIO()
+            with contextlib.redirect_stderr(log):
+                status, payload = self.dispatch("GET", "/health")
+            self.assertEqual(status, 500, error)
+            self.assertIn(error.__name__, payload["error"])
+            self.assertIn("broken handler", log.getvalue())
+
+
+    def test_values_that_do_not_parse_are_bad_requests(self):
+        status, payload = self.dispatch("POST", "/expenses", {"category": "Housing", "item_name": "Rent",
+                                                              "amount": "lots", "date": "2024-02-30"})
+        self.assertEqual(status, 400)
+
+
+    def test_handler_errors_keep_their_status(self):
+        self.assertEqual(self.dispatch("POST", "/goals/contribute", {"goal_id": 42, "amount": 5})[0], 404)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
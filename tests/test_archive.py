@@ -0,0 +1,101 @@
+"""
+Tests for archiving closed years (archive.py).
+"""
+
+# Importing necessary modules
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import archive
+import database
+import migrations
+import totals
+from repository import ExpenseRepository
+
+
+
+class ArchiveYearTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "expense_tracker.db")
+        self.connection = database.connect(self.path)
+        migrations.migrate(self.connection)
+        self.expenses = ExpenseRepository(self.connection)
+
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+
+    def archived_rows(self):
+        connection = sqlite3.connect(os.path.join(self.directory, "expense_tracker_2023.db"))
+        try:
+            return connection.execute("SELECT category, item_name, amount FROM expenses ORDER BY id").fetchall()
+        finally:
+            connection.close()
+
+
+    def test_archiving_a_year_twice_keeps_every_row(self):
+        self.expenses.add("Food and Dining", "Groceries", "20.00", "2023-03-01 10:00:00")
+        self.expenses.add("Housing", "Rent", "30.00", "2023-04-01 10:00:00")
+        self.assertEqual(archive.archive_year(self.connection, 2023), {"expenses": 2, "income": 0})
+        # The main database is empty again, so the late entry gets id 1 like the first one did
+        self.expenses.add("Food and Dining", "Late receipt", "10.00", "2023-12-31 18:00:00")
+        self.assertEqual(archive.archive_year(self.connection, 2023), {"expenses": 1, "income": 0})
+
+        self.assertEqual(self.archived_rows(), [("Food and Dining", "Groceries", 2000), ("Housing", "Rent", 3000),
+                                                ("Food and Dining", "Late receipt", 1000)])
+        self.assertEqual(archive.list_archives(self.connection)[0].expenses, 3)
+        entries = [entries for _category, _total, entries in totals.category_totals(self.connection, "expenses")]
+        self.assertEqual(sum(entries), 3)
+        self.assertEqual(totals.check_category_totals(self.connection), [])
+        rows = archive.transactions_between(self.connection, "expenses", "2023-01-01", "2024-01-01")
+        self.assertEqual(sorted(row[3] for row in rows), [1000, 2000, 3000])
+
+
+    def test_an_interrupted_archive_is_copied_again_without_duplicates(self):
+        self.expenses.add("Food and Dining", "Groceries", "20.00", "2023-03-01 10:00:00")
+        self.expenses.add("Housing", "Rent", "30.00", "2023-04-01 10:00:00")
+        # Fail the second transaction, after the rows were committed to the archive file
+        self.connection.execute("CREATE TRIGGER fail_summaries BEFORE INSERT ON archived_summaries "
+                                "BEGIN SELECT RAISE(ABORT, 'interrupted'); END")
+        with self.assertRaises(sqlite3.IntegrityError):
+            archive.archive_year(self.connection, 2023)
+        # The copies were committed on their own; the rows are still in the main database
+        self.assertEqual(len(self.archived_rows()), 2)
+        self.assertEqual(len(list(self.expenses.all())), 2)
+        self.connection.execute("DROP TRIGGER fail_summaries")
+
+        self.assertEqual(archive.archive_year(self.connection, 2023), {"expenses": 2, "income": 0})
+        self.assertEqual(self.archived_rows(), [("Food and Dining", "Groceries", 2000), ("Housing", "Rent", 3000)])
+        self.assertEqual(list(self.expenses.all()), [])
+        self.assertEqual(totals.check_category_totals(self.connection), [])
+
+
+    def test_files_keyed_by_source_id_are_upgraded(self):
+        self.expenses.add("Housing", "Rent", "30.00", "2023-04-01 10:00:00")
+        archive.archive_year(self.connection, 2023)
+        # An archive file written before rows had ids of their own
+        legacy = sqlite3.connect(os.path.join(self.directory, "expense_tracker_2023.db"))
+        legacy.executescript('''DROP TABLE expenses;
+                                CREATE TABLE expenses (id INTEGER PRIMARY KEY, category TEXT, item_name TEXT,
+                                                       amount INTEGER, occurred_at TEXT);
+                                INSERT INTO expenses VALUES (1, 'Housing', 'Rent', 3000, '2023-04-01 10:00:00');''')
+        legacy.close()
+        self.expenses.add("Utilities", "Power", "5.00", "2023-05-01 10:00:00")
+        archive.archive_year(self.connection, 2023)
+
+        self.assertEqual(self.archived_rows(), [("Housing", "Rent", 3000), ("Utilities", "Power", 500)])
+        rows = archive.transactions_between(self.connection, "expenses", "2023-01-01", "2024-01-01")
+        self.assertEqual([row[0] for row in rows], [1, 1])
+
+
+
+if __name__ == "__main__":
+    unittest.main()
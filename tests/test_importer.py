@@ -0,0 +1,94 @@
+"""
+Tests for reading bank statements (importer.py).
+"""
+
+# Importing necessary modules
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import importer
+
+
+
+# Two transactions on one line, the way some banks write OFX 1.x files
+ONE_LINE_OFX = ("OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+                "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105<TRNAMT>-12.50<NAME>Coffee</STMTTRN>"
+                "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240106<TRNAMT>1500.00<NAME>Salary</STMTTRN>"
+                "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240107<NAME>No amount</STMTTRN>"
+                "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+
+EXPECTED = [importer.Record(None, "Coffee", -1250, "2024-01-05 00:00:00"),
+            importer.Record(None, "Salary", 150000, "2024-01-06 00:00:00"),
+            None]
+
+
+
+class ReadOfxTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def write(self, text):
+        path = os.path.join(self.directory, "statement.ofx")
+        with open(path, "w", encoding="utf-8") as ofx_file:
+            ofx_file.write(text)
+        return path
+
+
+    def test_transactions_on_one_line(self):
+        self.assertEqual(list(importer.read_ofx(self.write(ONE_LINE_OFX))), EXPECTED)
+
+
+    def test_tags_split_across_chunks(self):
+        path = self.write(ONE_LINE_OFX)
+        for size in (1, 7, 64):
+            with mock.patch.object(importer, "OFX_CHUNK_SIZE", size):
+                self.assertEqual(list(importer.read_ofx(path)), EXPECTED)
+
+
+    def test_xml_with_a_tag_per_line(self):
+        text = ("<OFX>\n<STMTTRN>\n<TRNAMT>-3.00</TRNAMT>\n<DTPOSTED>20240201</DTPOSTED>\n"
+                "<MEMO>Bread</MEMO>\n</STMTTRN>\n<STMTTRN>\n<TRNAMT>-4.00</TRNAMT>\n</OFX>\n")
+        self.assertEqual(list(importer.read_ofx(self.write(text))),
+                         [importer.Record(None, "Bread", -300, "2024-02-01 00:00:00"), None])
+
+
+
+
+class ParseAmountTest(unittest.TestCase):
+
+
+    def test_decimal_separator_is_detected(self):
+        for text, cents in (("1,234.50", 123450), ("1.234,50", 123450), ("1 234,50", 123450), ("12,5", 1250),
+                            ("1,234", 123400), ("R 99.99", 9999), ("-12.00", -1200), ("(45.00)", -4500)):
+            self.assertEqual(importer.parse_amount(text), cents, text)
+
+
+    def test_ambiguous_amounts_are_rejected(self):
+        for text in ("1.234.50", "1,234.567", "1,2345", "", "R"):
+            with self.assertRaises(ValueError, msg=text):
+                importer.parse_amount(text)
+
+
+    def test_ambiguous_rows_are_skipped(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "statement.csv")
+        with open(path, "w", encoding="utf-8") as csv_file:
+            csv_file.write('date,description,amount\n2024-01-05,Coffee,"-1.234,50"\n2024-01-06,Typo,-1.234.50\n')
+        self.assertEqual(list(importer.read_csv(path)),
+                         [importer.Record(None, "Coffee", -123450, "2024-01-05 00:00:00"), None])
+
+
+
+if __name__ == "__main__":
+    unittest.main()
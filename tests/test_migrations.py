@@ -0,0 +1,170 @@
+"""
+Tests for the schema migrations (migrations.py).
+"""
+
+# Importing necessary modules
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import database
+import migrations
+import rollups
+import search
+import totals
+
+
+
+# The tables as the app created them before there were migrations (user_version 0)
+BASELINE_SCHEMA = '''
+    CREATE TABLE expenses (id INTEGER PRIMARY KEY, category TEXT, item_name TEXT, amount REAL);
+    CREATE TABLE income (id INTEGER PRIMARY KEY, category TEXT, item_name TEXT, amount REAL);
+    CREATE TABLE budgets (category TEXT PRIMARY KEY, budget REAL);
+    CREATE TABLE financial_goals (id INTEGER PRIMARY KEY, goal_name TEXT, target_amount REAL, current_amount REAL);
+'''
+
+EXPENSES = [(1, "Food and Dining", "Groceries", 19.99), (2, "Housing", "Rent", 950.0), (3, None, "Cash", 0.1),
+            (4, "Pets", "Dog food", 12.5), (5, "Food and Dining", "Coffee", 2.35)]
+INCOME = [(1, None, "Salary", 1500.0), (2, "Freelance", "Website", 300.75)]
+BUDGETS = [("Food and Dining", 100.5), ("Pets", 20.0)]
+GOALS = [(1, "Holiday", 1000.0, 250.25)]
+
+# What the rows read back as: categories by name, amounts in cents
+EXPECTED_EXPENSES = [(1, "Food and Dining", "Groceries", 1999, None), (2, "Housing", "Rent", 95000, None),
+                     (3, "", "Cash", 10, None), (4, "Pets", "Dog food", 1250, None),
+                     (5, "Food and Dining", "Coffee", 235, None)]
+EXPECTED_INCOME = [(1, "", "Salary", 150000, None), (2, "Freelance", "Website", 30075, None)]
+
+TRANSACTIONS_QUERY = ("SELECT t.id, c.name, t.item_name, t.amount, t.occurred_at FROM {} AS t "
+                      "JOIN categories AS c ON c.id = t.category_id ORDER BY t.id")
+TOTALS_QUERY = ("SELECT t.kind, c.name, t.total, t.entries FROM category_totals AS t "
+                "JOIN categories AS c ON c.id = t.category_id ORDER BY 1, 2")
+BUDGETS_QUERY = ("SELECT c.name, b.budget, b.period FROM budgets AS b "
+                 "JOIN categories AS c ON c.id = b.category_id ORDER BY 1")
+
+
+
+def schema(connection):
+    """
+    Every table, index, trigger and view with its SQL.
+    """
+    return connection.execute("SELECT type, name, tbl_name, sql FROM sqlite_master "
+                              "WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name").fetchall()
+
+
+
+class MigrateTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def connect(self, name):
+        connection = database.connect(os.path.join(self.directory, name))
+        self.addCleanup(connection.close)
+        return connection
+
+
+    def baseline_database(self):
+        connection = sqlite3.connect(os.path.join(self.directory, "baseline.db"))
+        connection.executescript(BASELINE_SCHEMA)
+        connection.executemany("INSERT INTO expenses VALUES (?, ?, ?, ?)", EXPENSES)
+        connection.executemany("INSERT INTO income VALUES (?, ?, ?, ?)", INCOME)
+        connection.executemany("INSERT INTO budgets VALUES (?, ?)", BUDGETS)
+        connection.executemany("INSERT INTO financial_goals VALUES (?, ?, ?, ?)", GOALS)
+        connection.commit()
+        connection.close()
+        return self.connect("baseline.db")
+
+
+    def fresh_database(self):
+        """
+        A new database with the same rows written after migrating, so its triggers fill the derived tables.
+        """
+        connection = self.connect("fresh.db")
+        migrations.migrate(connection)
+        for table, rows in (("expenses", EXPENSES), ("income", INCOME)):
+            for row_id, category, item_name, amount in rows:
+                connection.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (category or "",))
+                connection.execute("INSERT INTO {} (id, category_id, item_name, amount, occurred_at) "
+                                   "VALUES (?, (SELECT id FROM categories WHERE name = ?), ?, ?, NULL)".format(table),
+                                   (row_id, category or "", item_name, round(amount * 100)))
+        connection.executemany("INSERT INTO budgets (category_id, budget) "
+                               "VALUES ((SELECT id FROM categories WHERE name = ?), ?)",
+                               [(category, round(budget * 100)) for category, budget in BUDGETS])
+        connection.commit()
+        return connection
+
+
+    def test_baseline_database_upgrades_to_the_fresh_schema(self):
+        connection = self.baseline_database()
+        self.assertEqual(migrations.get_schema_version(connection), 0)
+        self.assertEqual(migrations.migrate(connection), [number for number, _description, _apply in migrations.MIGRATIONS])
+        self.assertEqual(migrations.get_schema_version(connection), migrations.SCHEMA_VERSION)
+        self.assertEqual(schema(connection), schema(self.fresh_database()))
+
+
+    def test_baseline_values_and_totals_survive(self):
+        connection = self.baseline_database()
+        migrations.migrate(connection)
+        fresh = self.fresh_database()
+
+        self.assertEqual(connection.execute(TRANSACTIONS_QUERY.format("expenses")).fetchall(), EXPECTED_EXPENSES)
+        self.assertEqual(connection.execute(TRANSACTIONS_QUERY.format("income")).fetchall(), EXPECTED_INCOME)
+        self.assertEqual(connection.execute(BUDGETS_QUERY).fetchall(),
+                         [("Food and Dining", 10050, "monthly"), ("Pets", 2000, "monthly")])
+        self.assertEqual(connection.execute("SELECT id, goal_name, target_amount, current_amount FROM financial_goals").fetchall(),
+                         [(1, "Holiday", 100000, 25025)])
+        self.assertEqual(connection.execute("SELECT goal_id, amount, opening FROM goal_contributions").fetchall(),
+                         [(1, 25025, 1)])
+
+        # The derived tables match what the triggers build from the same rows
+        self.assertEqual(connection.execute(TOTALS_QUERY).fetchall(), fresh.execute(TOTALS_QUERY).fetchall())
+        self.assertEqual(totals.check_category_totals(connection), [])
+        self.assertEqual(rollups.check_rollups(connection), [])
+        self.assertEqual(connection.execute(BUDGETS_QUERY).fetchall(), fresh.execute(BUDGETS_QUERY).fetchall())
+        if search.has_search_index(connection, "expenses"):
+            self.assertEqual([hit.id for hit in search.search(connection, "expenses", "dog")], [4])
+
+
+    def test_triggers_keep_working_after_the_upgrade(self):
+        connection = self.baseline_database()
+        migrations.migrate(connection)
+        connection.execute("UPDATE expenses SET amount = 500, category_id = (SELECT id FROM categories WHERE name = 'Pets') "
+                           "WHERE id = 2")
+        connection.execute("DELETE FROM expenses WHERE id = 1")
+        connection.execute("INSERT INTO income (category_id, item_name, amount) VALUES (1, 'Bonus', 1000)")
+        connection.commit()
+        self.assertEqual(totals.check_category_totals(connection), [])
+        self.assertEqual(rollups.check_rollups(connection), [])
+        # Left out, occurred_at defaults to a timestamp
+        self.assertIsNotNone(connection.execute("SELECT occurred_at FROM income WHERE item_name = 'Bonus'").fetchone()[0])
+
+
+    def test_current_database_is_not_touched(self):
+        connection = self.connect("current.db")
+        migrations.migrate(connection)
+        statements = []
+        connection.set_trace_callback(statements.append)
+        self.assertEqual(migrations.migrate(connection), [])
+        connection.set_trace_callback(None)
+        self.assertEqual(statements, ["PRAGMA user_version"])
+
+
+    def test_newer_database_is_refused(self):
+        connection = self.connect("newer.db")
+        connection.execute("PRAGMA user_version = {}".format(migrations.SCHEMA_VERSION + 1))
+        with self.assertRaises(sqlite3.DatabaseError):
+            migrations.migrate(connection)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
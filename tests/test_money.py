@@ -0,0 +1,109 @@
+"""
+Tests for money amounts in cents (money.py).
+"""
+
+# Importing necessary modules
+import unittest
+from decimal import Decimal
+
+from money import Money, money_or_none, to_cents
+
+
+
+class ToCentsTest(unittest.TestCase):
+
+
+    def test_amounts_in_every_accepted_type(self):
+        self.assertEqual(to_cents("12.34"), 1234)
+        self.assertEqual(to_cents(" 12.34 "), 1234)
+        self.assertEqual(to_cents(12), 1200)
+        self.assertEqual(to_cents(Decimal("12.34")), 1234)
+        self.assertEqual(to_cents(Money(1234)), 1234)
+
+
+    def test_floats_convert_without_binary_error(self):
+        self.assertEqual(to_cents(0.1), 10)
+        self.assertEqual(to_cents(19.99), 1999)
+        # 1.005 is stored as 1.00499999..., but str() gives the typed value back
+        self.assertEqual(to_cents(1.005), 101)
+
+
+    def test_rounds_half_up(self):
+        self.assertEqual(to_cents("0.005"), 1)
+        self.assertEqual(to_cents("0.004"), 0)
+        self.assertEqual(to_cents("2.675"), 268)
+        self.assertEqual(to_cents("2.665"), 267)
+        self.assertEqual(to_cents("1.2349"), 123)
+
+
+    def test_negative_amounts_round_away_from_zero(self):
+        self.assertEqual(to_cents("-12.34"), -1234)
+        self.assertEqual(to_cents("-0.005"), -1)
+        self.assertEqual(to_cents("-0.004"), 0)
+        self.assertEqual(to_cents(-2.675), -268)
+
+
+    def test_bad_input_raises_value_error(self):
+        for value in ("", "abc", "12,34", "1.2.3", "nan", "NaN", "inf", "-Infinity", None, float("nan"), float("inf")):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    to_cents(value)
+
+
+
+class MoneyTest(unittest.TestCase):
+
+
+    def test_formats_in_currency_units(self):
+        self.assertEqual(str(Money(1234)), "12.34")
+        self.assertEqual(str(Money(5)), "0.05")
+        self.assertEqual(str(Money(0)), "0.00")
+        self.assertEqual(str(Money(-1234)), "-12.34")
+        self.assertEqual(str(Money(-5)), "-0.05")
+        self.assertEqual(repr(Money(1234)), "Money('12.34')")
+
+
+    def test_format_specs(self):
+        amount = Money(123456)
+        self.assertEqual(f"{amount}", "1234.56")
+        self.assertEqual(f"{amount:.2f}", "1234.56")
+        self.assertEqual(f"{amount:,.2f}", "1,234.56")
+        self.assertEqual(f"{amount:>10}", "   1234.56")
+        self.assertEqual(f"{Money(-50):.1f}", "-0.5")
+
+
+    def test_to_decimal_is_exact(self):
+        self.assertEqual(Money(1999).to_decimal(), Decimal("19.99"))
+        self.assertEqual(Money(-1).to_decimal(), Decimal("-0.01"))
+
+
+    def test_parse(self):
+        self.assertEqual(Money.parse("19.99"), 1999)
+        self.assertIsInstance(Money.parse("19.99"), Money)
+        with self.assertRaises(ValueError):
+            Money.parse("abc")
+
+
+    def test_arithmetic_keeps_money(self):
+        total = Money(1999) + Money(1)
+        self.assertIsInstance(total, Money)
+        self.assertEqual(str(total), "20.00")
+        self.assertIsInstance(sum([Money(100), Money(250)]), Money)
+        self.assertEqual(str(sum([Money(100), Money(250)])), "3.50")
+        self.assertEqual(str(Money(100) - Money(250)), "-1.50")
+        self.assertEqual(str(500 - Money(250)), "2.50")
+        self.assertEqual(str(-Money(250)), "-2.50")
+        self.assertEqual(str(abs(Money(-250))), "2.50")
+        # Mixing in a float leaves Money behind
+        self.assertNotIsInstance(Money(100) + 0.5, Money)
+
+
+    def test_money_or_none(self):
+        self.assertIsNone(money_or_none(None))
+        self.assertEqual(money_or_none(1234), Money(1234))
+        self.assertIsInstance(money_or_none(0), Money)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Tests for the connection pool (pool.py).
+"""
+
+# Importing necessary modules
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import database
+import migrations
+import pool
+
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "expense_tracker.db")
+        connection = database.connect(self.path)
+        migrations.migrate(connection)
+        connection.close()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def make_pool(self, **options):
+        connection_pool = pool.ConnectionPool(self.path, **options)
+        self.addCleanup(connection_pool.close)
+        return connection_pool
+
+
+    def goal_names(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            return [name for name, in connection.execute("SELECT goal_name FROM financial_goals ORDER BY id")]
+        finally:
+            connection.close()
+
+
+    def test_nested_blocks_share_a_connection(self):
+        connection_pool = self.make_pool()
+        with connection_pool.connection() as outer:
+            with connection_pool.connection() as inner:
+                self.assertIs(inner, outer)
+            self.assertEqual(connection_pool.stats()["in_use"], 1)
+        stats = connection_pool.stats()
+        self.assertEqual((stats["created"], stats["in_use"], stats["idle"]), (1, 0, 1))
+
+
+    def test_connection_is_reused(self):
+        connection_pool = self.make_pool()
+        with connection_pool.connection() as first:
+            pass
+        with connection_pool.connection() as second:
+            self.assertIs(second, first)
+        self.assertEqual(connection_pool.stats()["reused"], 1)
+
+
+    def test_outermost_block_commits(self):
+        connection_pool = self.make_pool()
+        with connection_pool.connection() as connection:
+            with connection_pool.connection() as nested:
+                nested.execute("INSERT INTO financial_goals (goal_name, target_amount, current_amount) "
+                               "VALUES ('Holiday', 100000, 0)")
+            # Leaving the nested block does not commit
+            self.assertTrue(connection.in_transaction)
+            self.assertEqual(self.goal_names(), [])
+        self.assertEqual(self.goal_names(), ["Holiday"])
+
+
+    def test_error_rolls_back(self):
+        connection_pool = self.make_pool()
+        with self.assertRaises(RuntimeError):
+            with connection_pool.connection() as connection:
+                connection.execute("INSERT INTO financial_goals (goal_name, target_amount, current_amount) "
+                                   "VALUES ('Holiday', 100000, 0)")
+                raise RuntimeError("failed halfway")
+        self.assertEqual(self.goal_names(), [])
+        with connection_pool.connection() as connection:
+            self.assertFalse(connection.in_transaction)
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM financial_goals").fetchone()[0], 0)
+
+
+    def test_times_out_when_every_connection_is_in_use(self):
+        connection_pool = self.make_pool(max_size=1, timeout=0.1)
+        held, done = threading.Event(), threading.Event()
+
+        def hold():
+            with connection_pool.connection():
+                held.set()
+                done.wait(5)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        try:
+            self.assertTrue(held.wait(5))
+            with self.assertRaises(pool.PoolTimeout):
+                connection_pool.acquire()
+        finally:
+            done.set()
+            thread.join()
+        # Once released, the connection can be borrowed again
+        with connection_pool.connection():
+            self.assertEqual(connection_pool.stats()["open"], 1)
+
+
+    def test_waiting_thread_gets_the_released_connection(self):
+        connection_pool = self.make_pool(max_size=1, timeout=5)
+        connection = connection_pool.acquire()
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(connection_pool.acquire()))
+        thread.start()
+        connection_pool.release(connection)
+        thread.join(5)
+        self.assertEqual(acquired, [connection])
+        connection_pool.release(connection)
+
+
+    def test_stale_connection_is_replaced(self):
+        connection_pool = self.make_pool(health_check_age=0)
+        stale = connection_pool.acquire()
+        connection_pool.release(stale)
+        stale.close()
+        with connection_pool.connection() as connection:
+            self.assertIsNot(connection, stale)
+            self.assertEqual(connection.execute("SELECT 1").fetchone(), (1,))
+        stats = connection_pool.stats()
+        self.assertEqual((stats["replaced"], stats["created"], stats["open"]), (1, 2, 1))
+
+
+    def test_fresh_idle_connection_is_not_checked(self):
+        connection_pool = self.make_pool(health_check_age=60)
+        checked = []
+        connection_pool.healthy = lambda connection: checked.append(connection) or True
+        with connection_pool.connection():
+            pass
+        with connection_pool.connection():
+            pass
+        self.assertEqual(checked, [])
+
+
+    def test_closed_pool_refuses_connections(self):
+        connection_pool = self.make_pool()
+        connection = connection_pool.acquire()
+        connection_pool.close()
+        with self.assertRaises(pool.PoolClosed):
+            connection_pool.acquire()
+        # Connections still out are closed when they come back
+        connection_pool.release(connection)
+        self.assertEqual(connection_pool.stats()["open"], 0)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Tests for the aggregate query cache (query_cache.py), through the repositories.
+"""
+
+# Importing necessary modules
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import database
+import migrations
+import query_cache
+from repository import BudgetRepository, ExpenseRepository, GoalRepository
+
+
+
+class QueryCacheTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "expense_tracker.db")
+        self.connection = database.connect(self.path)
+        migrations.migrate(self.connection)
+        self.expenses = ExpenseRepository(self.connection)
+        self.expenses.add("Food", "Groceries", "10.00")
+
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        self.assertEqual(str(self.expenses.total("Food")), "10.00")
+        hits = query_cache.stats(self.connection)["hits"]
+        self.assertEqual(str(self.expenses.total("Food")), "10.00")
+        self.assertEqual(query_cache.stats(self.connection)["hits"], hits + 1)
+
+
+    def test_write_through_repository_invalidates(self):
+        self.assertEqual(str(self.expenses.total("Food")), "10.00")
+        self.expenses.add("Food", "Coffee", "2.50")
+        self.assertEqual(str(self.expenses.total("Food")), "12.50")
+
+
+    def test_write_invalidates_results_read_from_several_tables(self):
+        budgets = BudgetRepository(self.connection)
+        budgets.set("Food", "100.00")
+        self.assertEqual(str(budgets.report("Food")[0].actual), "10.00")
+        self.expenses.add("Food", "Coffee", "2.50")
+        self.assertEqual(str(budgets.report("Food")[0].actual), "12.50")
+
+
+    def test_uncommitted_write_is_seen_by_its_connection(self):
+        self.assertEqual(str(self.expenses.total("Food")), "10.00")
+        self.expenses.add("Food", "Coffee", "2.50", commit=False)
+        self.assertEqual(str(self.expenses.total("Food")), "12.50")
+        self.connection.commit()
+        self.assertEqual(str(self.expenses.total("Food")), "12.50")
+
+
+    def test_commit_from_another_connection_invalidates(self):
+        goals = GoalRepository(self.connection)
+        goals.add("Holiday", "1000.00", "100.00")
+        self.assertEqual(str(self.expenses.total("Food")), "10.00")
+        self.assertEqual(str(goals.totals()[0]), "100.00")
+
+        # A plain connection writes without telling the cache; PRAGMA data_version gives it away
+        other = sqlite3.connect(self.path)
+        try:
+            other.execute("INSERT INTO expenses (category_id, item_name, amount) "
+                          "SELECT category_id, 'Coffee', 250 FROM expenses WHERE id = 1")
+            other.execute("UPDATE financial_goals SET current_amount = 30000")
+            other.commit()
+        finally:
+            other.close()
+        self.assertEqual(str(self.expenses.total("Food")), "12.50")
+        self.assertEqual(str(goals.totals()[0]), "300.00")
+
+
+    def test_commit_through_another_cached_connection_invalidates(self):
+        self.assertEqual(str(self.expenses.total("Food")), "10.00")
+        other = database.connect(self.path)
+        try:
+            ExpenseRepository(other).add("Food", "Coffee", "2.50")
+            self.assertEqual(str(ExpenseRepository(other).total("Food")), "12.50")
+        finally:
+            other.close()
+        self.assertEqual(str(self.expenses.total("Food")), "12.50")
+
+
+    def test_rollback_invalidates(self):
+        self.expenses.add("Food", "Coffee", "2.50", commit=False)
+        # Cached while the uncommitted row is visible
+        self.assertEqual(str(self.expenses.total("Food")), "12.50")
+        self.connection.rollback()
+        self.assertEqual(str(self.expenses.total("Food")), "10.00")
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+"""
+Per-category running totals of expenses and income.
+
+The category_totals table is kept current by triggers on the expenses and
+income tables (see migrations.add_category_totals), so looking up what a
+category has spent is a primary key lookup whatever the size of the history.
+
+Usage:
+    python totals.py --check
+    python totals.py --rebuild
+"""
+
+# Importing necessary modules
+import sqlite3
+
+import database
+import migrations
+import query_cache
+from money import Money, money_or_none
+from reports import check_transaction_table
+
+
+# Archived transactions count through their summaries (see archive.py).
+# Categories are keyed by id (see migrations.add_categories).
+ACTUAL_TOTALS_QUERY = '''
+    SELECT kind, category_id, SUM(total) AS total, SUM(entries) AS entries
+    FROM (SELECT kind, category_id, SUM(total) AS total, SUM(entries) AS entries
+          FROM archived_summaries GROUP BY kind, category_id
+          UNION ALL
+          SELECT 'expenses', category_id, COALESCE(SUM(amount), 0), COUNT(*)
+          FROM expenses GROUP BY category_id
+          UNION ALL
+          SELECT 'income', category_id, COALESCE(SUM(amount), 0), COUNT(*)
+          FROM income GROUP BY category_id)
+    GROUP BY kind, category_id'''
+
+
+
+def category_total(connection, table, category):
+    """
+    Look up the total amount recorded for a category.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): "expenses" or "income".
+    - category (str): The category.
+
+    Returns:
+    - total (Money): Total of the category, zero if it has no entries.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    row = connection.execute("SELECT total FROM category_totals "
+                             "WHERE kind = ? AND category_id = (SELECT id FROM categories WHERE name = ?)",
+                             (table, category or "")).fetchone()
+    return Money(row[0] if row else 0)
+
+
+
+def category_totals(connection, table):
+    """
+    Read the totals of every category of a transaction table.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+    - table (str): "expenses" or "income".
+
+    Returns:
+    - totals (list): (category, total, entries) tuples ordered by category, totals as Money.
+
+    Raises:
+    - ValueError: If the table is not a transaction table.
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    check_transaction_table(table)
+    cursor = connection.execute("SELECT c.name, t.total, t.entries FROM category_totals AS t "
+                                "JOIN categories AS c ON c.id = t.category_id WHERE t.kind = ? ORDER BY c.name", (table,))
+    return [(category, Money(total), entries) for category, total, entries in cursor]
+
+
+
+def check_category_totals(connection):
+    """
+    Compare category_totals with totals recomputed from the raw tables.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - mismatches (list): (kind, category, stored_total, stored_entries, actual_total,
+      actual_entries) tuples for every category that differs. Empty when consistent.
+
+    Raises:
+    - sqlite3.Error: If there is an error reading from the database.
+    """
+    cursor = connection.cursor()
+    cursor.execute('''
+        WITH actual AS ({})
+        SELECT kind, COALESCE(c.name, m.category_id), stored_total, stored_entries, actual_total, actual_entries
+        FROM (SELECT a.kind, a.category_id, t.total AS stored_total, t.entries AS stored_entries,
+                     a.total AS actual_total, a.entries AS actual_entries
+              FROM actual AS a
+              LEFT JOIN category_totals AS t ON t.kind = a.kind AND t.category_id = a.category_id
+              WHERE t.total IS NOT a.total OR t.entries IS NOT a.entries
+              UNION ALL
+              SELECT t.kind, t.category_id, t.total, t.entries, NULL, NULL
+              FROM category_totals AS t
+              WHERE NOT EXISTS (SELECT 1 FROM actual AS a WHERE a.kind = t.kind AND a.category_id = t.category_id)) AS m
+        LEFT JOIN categories AS c ON c.id = m.category_id
+        ORDER BY 1, 2'''.format(ACTUAL_TOTALS_QUERY))
+    return cursor.fetchall()
+
+
+
+def rebuild_category_totals(connection):
+    """
+    Recompute category_totals from the raw tables in one transaction.
+
+    Parameters:
+    - connection (sqlite3.Connection): Connection object to the SQLite database.
+
+    Returns:
+    - None
+
+    Raises:
+    - sqlite3.Error: If the rebuild fails. The old totals are kept.
+    """
+    with connection:
+        connection.execute("DELETE FROM category_totals")
+        connection.execute("INSERT INTO category_totals (kind, category_id, total, entries) " + ACTUAL_TOTALS_QUERY)
+    query_cache.invalidate(connection)
+
+
+
+def main(argv=None):
+    """
+    Check or rebuild the category totals from the command line.
+    """
+    # Imported here: the UIs import this module and should not load argparse
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the per-category totals table.")
+    parser.add_argument("--database", default="expense_tracker.db", help="SQLite database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--check", action="store_true", help="Report categories whose totals are out of date")
+    action.add_argument("--rebuild", action="store_true", help="Recompute every total from the raw tables")
+    args = parser.parse_args(argv)
+
+    connection = database.connect(args.database)
+    try:
+        migrations.migrate(connection)
+        if args.rebuild:
+            rebuild_category_totals(connection)
+            print("Category totals rebuilt.")
+        mismatches = check_category_totals(connection)
+        for kind, category, stored_total, stored_entries, actual_total, actual_entries in mismatches:
+            print("{} / {!r}: stored {} ({} entries), actual {} ({} entries)".format(
+                kind, category, money_or_none(stored_total), stored_entries, money_or_none(actual_total), actual_entries))
+        if not mismatches:
+            print("Category totals are consistent.")
+        return 1 if mismatches else 0
+    except sqlite3.Error as e:
+        print("Error checking category totals:", e)
+        return 1
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())